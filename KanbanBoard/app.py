@@ -1,18 +1,76 @@
+from datetime import timedelta
 from flask import Flask
 from flask_restx import Api
 from dotenv import load_dotenv
 import os
-from database.database import db, jwt, init_db
+from database.database import db, jwt, init_db, engine_options
 
 def create_app():
     """Фабрика приложений"""
     load_dotenv()
     
     app = Flask(__name__)
+    database_uri = os.getenv('DB_CONNECTION_STRING')
     app.config.update({
-        'SQLALCHEMY_DATABASE_URI': os.getenv('DB_CONNECTION_STRING'),
+        'SQLALCHEMY_DATABASE_URI': database_uri,
         'SQLALCHEMY_TRACK_MODIFICATIONS': False,
-        'JWT_SECRET_KEY': os.getenv('JWT_SECRET')
+        # Пул соединений и pre-ping (DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT,
+        # DB_POOL_RECYCLE, DB_POOL_PRE_PING)
+        'SQLALCHEMY_ENGINE_OPTIONS': engine_options(database_uri),
+        # PRAGMA для SQLite, применяются к каждому соединению
+        'SQLITE_JOURNAL_MODE': os.getenv('SQLITE_JOURNAL_MODE', 'WAL'),
+        'SQLITE_SYNCHRONOUS': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'SQLITE_BUSY_TIMEOUT': int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000)),
+        'JWT_SECRET_KEY': os.getenv('JWT_SECRET'),
+        # Время жизни токенов, секунды; отозванные токены хранятся в REVOCATION_STORE
+        'JWT_ACCESS_TOKEN_EXPIRES': timedelta(seconds=int(os.getenv('JWT_ACCESS_TOKEN_EXPIRES', 900))),
+        'JWT_REFRESH_TOKEN_EXPIRES': timedelta(seconds=int(os.getenv('JWT_REFRESH_TOKEN_EXPIRES', 30 * 24 * 3600))),
+        'REVOCATION_STORE': os.getenv('REVOCATION_STORE'),
+        # Кэш проверок доступа к проектам (размер и время жизни в секундах)
+        'AUTH_CACHE_SIZE': int(os.getenv('AUTH_CACHE_SIZE', 10000)),
+        'AUTH_CACHE_TTL': int(os.getenv('AUTH_CACHE_TTL', 60)),
+        # Лента событий доски: размер очереди подписчика, политика переполнения
+        # (resync/disconnect) и класс брокера для доставки между процессами
+        'EVENTS_QUEUE_SIZE': int(os.getenv('EVENTS_QUEUE_SIZE', 100)),
+        'EVENTS_OVERFLOW_POLICY': os.getenv('EVENTS_OVERFLOW_POLICY', 'resync'),
+        'EVENTS_BROKER': os.getenv('EVENTS_BROKER'),
+        # Запись логов задач: sync - в транзакции запроса, async - фоновыми пачками
+        # (размер очереди, размер пачки и интервал сброса в секундах)
+        'AUDIT_LOG_MODE': os.getenv('AUDIT_LOG_MODE', 'sync'),
+        'AUDIT_QUEUE_SIZE': int(os.getenv('AUDIT_QUEUE_SIZE', 10000)),
+        'AUDIT_BATCH_SIZE': int(os.getenv('AUDIT_BATCH_SIZE', 500)),
+        'AUDIT_FLUSH_INTERVAL': float(os.getenv('AUDIT_FLUSH_INTERVAL', 1.0)),
+        # Хеширование паролей: метод werkzeug, пул процессов (0 - в потоке запроса),
+        # максимум задач в пуле и ожидание места в нем, секунды
+        'PASSWORD_HASH_METHOD': os.getenv('PASSWORD_HASH_METHOD', 'scrypt'),
+        'PASSWORD_POOL_SIZE': int(os.getenv('PASSWORD_POOL_SIZE', 0)),
+        'PASSWORD_POOL_QUEUE': int(os.getenv('PASSWORD_POOL_QUEUE', 0)) or None,
+        'PASSWORD_POOL_TIMEOUT': float(os.getenv('PASSWORD_POOL_TIMEOUT', 10)),
+        # Попытки входа за окно LOGIN_RATE_WINDOW секунд на имя пользователя и на IP
+        'LOGIN_RATE_LIMIT_USER': int(os.getenv('LOGIN_RATE_LIMIT_USER', 10)),
+        'LOGIN_RATE_LIMIT_IP': int(os.getenv('LOGIN_RATE_LIMIT_IP', 50)),
+        'LOGIN_RATE_WINDOW': int(os.getenv('LOGIN_RATE_WINDOW', 60)),
+        # Фоновые задания удаления: thread - поток процесса, inline - в запросе;
+        # строк за транзакцию и пауза между порциями, секунды
+        'JOBS_MODE': os.getenv('JOBS_MODE', 'thread'),
+        'JOB_CHUNK_SIZE': int(os.getenv('JOB_CHUNK_SIZE', 1000)),
+        'JOB_CHUNK_PAUSE': float(os.getenv('JOB_CHUNK_PAUSE', 0)),
+        # Метрики маршрутов на GET /metrics (выключены по умолчанию; доступ -
+        # по токену Bearer и/или с адресов из списка через запятую); в разработке -
+        # предупреждения о N+1 (повторов одного оператора за запрос, 0 - выкл.)
+        # и доля запросов, профилируемых cProfile в PROFILE_DIR
+        'METRICS_ENABLED': os.getenv('METRICS_ENABLED', '0').lower() in ('1', 'true', 'yes'),
+        'METRICS_TOKEN': os.getenv('METRICS_TOKEN'),
+        'METRICS_ALLOWED_IPS': [ip.strip() for ip in os.getenv('METRICS_ALLOWED_IPS', '').split(',') if ip.strip()],
+        'NPLUSONE_THRESHOLD': int(os.getenv('NPLUSONE_THRESHOLD', 0)),
+        'PROFILE_SAMPLE_RATE': float(os.getenv('PROFILE_SAMPLE_RATE', 0)),
+        'PROFILE_DIR': os.getenv('PROFILE_DIR'),
+        # Списки сериализуются скомпилированными функциями моделей (и orjson)
+        'FAST_SERIALIZATION': os.getenv('FAST_SERIALIZATION', '0').lower() in ('1', 'true', 'yes'),
+        # Миграции схемы при создании приложения (иначе - flask init-db при развертывании)
+        'AUTO_MIGRATE': os.getenv('AUTO_MIGRATE', '0').lower() in ('1', 'true', 'yes'),
+        # Swagger UI на /docs/ и спецификация /swagger.json (строится при первом запросе)
+        'API_DOCS': os.getenv('API_DOCS', '1').lower() not in ('0', 'false', 'no')
     })
     
     # Инициализация API
@@ -20,7 +78,7 @@ def create_app():
         title='Kanban Board API',
         version='1.0',
         description='API для управления канбан-доской',
-        doc='/docs/',
+        doc='/docs/' if app.config['API_DOCS'] else False,
         authorizations={
             'Bearer Auth': {
                 'type': 'apiKey',
@@ -35,6 +93,25 @@ def create_app():
     # Инициализация базы данных
     init_db(app)
     
+    from services.access import init_access
+    from services.events import init_events
+    from services.audit import init_audit
+    from services.passwords import init_passwords
+    from services.ratelimit import init_rate_limits
+    from services.tokens import init_tokens
+    from services.jobs import init_jobs
+    from services.instrumentation import init_instrumentation
+    from services.serialization import init_serialization
+    init_access(app)
+    init_events(app)
+    init_audit(app)
+    init_passwords(app)
+    init_rate_limits(app)
+    init_tokens(app)
+    init_jobs(app)
+    init_instrumentation(app)
+    init_serialization(app)
+    
     # Регистрация маршрутов
     from routers.auth import auth_ns
     from routers.projects import projects_ns
@@ -42,6 +119,7 @@ def create_app():
     from routers.tasks import tasks_ns
     from routers.task_logs import task_logs_ns
     from routers.project_members import members_ns
+    from routers.jobs import jobs_ns
     
     api.add_namespace(auth_ns)
     api.add_namespace(projects_ns)
@@ -49,12 +127,19 @@ def create_app():
     api.add_namespace(tasks_ns)
     api.add_namespace(task_logs_ns)
     api.add_namespace(members_ns)
+    api.add_namespace(jobs_ns)
     
     app.api = api
-    api.init_app(app)
+    # add_specs учитывается только в init_app
+    api.init_app(app, add_specs=app.config['API_DOCS'])
+    
+    from commands import register_commands
+    register_commands(app)
     
     return app
 
 if __name__ == '__main__':
+    # Сервер разработки; для продакшена - flask init-db и gunicorn -c gunicorn.conf.py wsgi:app
+    os.environ.setdefault('AUTO_MIGRATE', '1')
     app = create_app()
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=5000, debug=os.getenv('FLASK_DEBUG', '1') == '1')
\ No newline at end of file
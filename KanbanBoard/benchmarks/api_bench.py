@@ -0,0 +1,286 @@
+"""Бенчмарк API на синтетических данных: запросы/с, p50/p99 и SQL-запросы по маршрутам.
+
+Создает временную SQLite-базу, собирает приложение через create_app(),
+заполняет его database/seed.py (несколько огромных досок и много
+маленьких при --skew около 1) и прогоняет сценарии по реальным маршрутам:
+доска, колонки, задачи колонки, задача, логи, участники, проекты, поиск
+и изменение задачи - для самой большой и самой маленькой доски.
+
+Режимы: client - последовательно через тестовый клиент Flask (стоимость
+обработки без сети), http - встроенный многопоточный сервер werkzeug и
+--concurrency клиентских потоков. Число SQL-запросов на запрос берется из
+services/instrumentation.py.
+
+--output сохраняет результаты в JSON; --baseline сравнивает с сохраненным
+прогоном и завершается с кодом 1, если запросы/с упали или p99 выросла
+больше чем на --tolerance либо выросло число SQL-запросов. С
+--update-baseline текущий прогон записывается как новая база.
+
+Запуск из каталога KanbanBoard:
+    python benchmarks/api_bench.py --tasks 20000 --baseline benchmarks/api_baseline.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+JWT_SECRET = 'api-bench-secret-key-with-enough-length'
+
+
+def build_app(path):
+    """Приложение на временной базе; настройки - через окружение, как в create_app()"""
+    os.environ.update({
+        'DB_CONNECTION_STRING': f'sqlite:///{path}',
+        'JWT_SECRET': JWT_SECRET,
+        'METRICS_ENABLED': '1',
+        'JOBS_MODE': 'inline',
+        # Предупреждения N+1 и профилирование не должны влиять на замер
+        'NPLUSONE_THRESHOLD': '0',
+        'PROFILE_SAMPLE_RATE': '0'
+    })
+    from app import create_app
+    return create_app()
+
+
+def scenarios(app, args):
+    """Заполнение базы; возвращает список (имя, метод, путь, тело, токен)"""
+    from sqlalchemy import func
+    from database import db
+    from database.migrations import upgrade_schema
+    from database.seed import seed_data
+    from models import Project, Column, Task
+    from services.tokens import issue_tokens
+
+    with app.app_context():
+        upgrade_schema()
+        counts = seed_data(users=args.users, projects=args.projects, columns=args.columns, members=args.members,
+                           tasks=args.tasks, logs=args.logs, skew=args.skew, random_seed=args.random_seed)
+        sizes = (db.session.query(Column.ProjectID, func.count(Task.TaskID))
+                 .outerjoin(Task, Task.ColumnID == Column.ColumnID)
+                 .group_by(Column.ProjectID).order_by(func.count(Task.TaskID).desc(), Column.ProjectID).all())
+        result = []
+        for label, (project_id, _) in (('large', sizes[0]), ('small', sizes[-1])):
+            owner_id = db.session.query(Project.OwnerID).filter_by(ProjectID=project_id).scalar()
+            token = issue_tokens(owner_id)['access_token']
+            column_id = (db.session.query(Column.ColumnID).filter_by(ProjectID=project_id)
+                         .order_by(Column.ColumnID).limit(1).scalar())
+            task_id = (db.session.query(Task.TaskID).join(Column, Column.ColumnID == Task.ColumnID)
+                       .filter(Column.ProjectID == project_id).order_by(Task.TaskID).limit(1).scalar())
+            result += [
+                (f'board_{label}', 'GET', f'/projects/{project_id}/board', None, token),
+                (f'columns_{label}', 'GET', f'/columns/project/{project_id}', None, token),
+                (f'members_{label}', 'GET', f'/project_members/project/{project_id}', None, token),
+                (f'search_{label}', 'GET', f'/projects/{project_id}/search?q=%D0%97%D0%B0%D0%B4%D0%B0%D1%87%D0%B0',
+                 None, token),
+                (f'projects_{label}', 'GET', '/projects/?limit=50', None, token),
+            ]
+            if task_id is not None:
+                result += [
+                    (f'tasks_{label}', 'GET', f'/tasks/column/{column_id}?limit=50', None, token),
+                    (f'task_{label}', 'GET', f'/tasks/{task_id}', None, token),
+                    (f'logs_{label}', 'GET', f'/task_logs/task/{task_id}', None, token),
+                    (f'task_update_{label}', 'PUT', f'/tasks/{task_id}',
+                     {'Description': f'Изменено бенчмарком {task_id}'}, token),
+                ]
+        db.session.remove()
+    print('data: ' + ', '.join(f'{table} {count}' for table, count in counts.items())
+          + f'; largest board {sizes[0][1]} tasks, smallest {sizes[-1][1]}')
+    return result
+
+
+class QuietHandler(WSGIRequestHandler):
+    """Обработчик встроенного сервера без журнала запросов"""
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def percentile(latencies, q):
+    return latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000 if latencies else 0.0
+
+
+def client_call(app):
+    client = app.test_client()
+
+    def call(method, path, body, token):
+        response = client.open(path, method=method, json=body, headers={'Authorization': f'Bearer {token}'})
+        response.get_data()
+        return response.status_code
+    return call
+
+
+def http_call(base):
+    def call(method, path, body, token):
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(base + path, data=data, method=method,
+                                         headers={'Authorization': f'Bearer {token}',
+                                                  'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as exc:
+            return exc.code
+    return call
+
+
+def run_scenario(call, scenario, requests, concurrency, warmup):
+    """Замер одного сценария; запросы делятся между потоками поровну"""
+    from services.instrumentation import instrumentation
+
+    _, method, path, body, token = scenario
+    for _ in range(warmup):
+        call(method, path, body, token)
+    instrumentation.reset()
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+
+    def worker(count):
+        local, failed = [], 0
+        for _ in range(count):
+            started = time.perf_counter()
+            status = call(method, path, body, token)
+            local.append(time.perf_counter() - started)
+            if status >= 400:
+                failed += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    shares = [requests // concurrency + (1 if i < requests % concurrency else 0) for i in range(concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(worker, shares))
+    elapsed = time.perf_counter() - started
+
+    # Маршрут сценария - единственный, вызывавшийся после reset()
+    stats = list(instrumentation.routes.values())
+    queries = sum(s.queries.sum for s in stats)
+    handled = sum(s.queries.count for s in stats)
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 0.50),
+        'p99_ms': percentile(latencies, 0.99),
+        'mean_ms': statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        'sql_per_request': queries / handled if handled else 0.0
+    }
+
+
+def compare(results, baseline, tolerance, names=None):
+    """Список описаний регрессий относительно базового прогона; names - выбранные сценарии"""
+    regressions = []
+    for name, base in baseline['endpoints'].items():
+        if names is not None and name not in names:
+            continue
+        current = results['endpoints'].get(name)
+        if current is None:
+            regressions.append(f'{name}: сценарий отсутствует')
+            continue
+        if current['rps'] < base['rps'] * (1 - tolerance):
+            regressions.append(f"{name}: rps {current['rps']:.1f} < {base['rps']:.1f}")
+        if current['p99_ms'] > base['p99_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {current['p99_ms']:.2f} ms > {base['p99_ms']:.2f} ms")
+        # Число запросов детерминировано: любое увеличение - регрессия
+        if current['sql_per_request'] > base['sql_per_request'] + 0.01:
+            regressions.append(f"{name}: SQL {current['sql_per_request']:.2f} > {base['sql_per_request']:.2f}")
+        if current['errors'] > base['errors']:
+            regressions.append(f"{name}: ошибок {current['errors']} > {base['errors']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mode', choices=('client', 'http'), default='client')
+    parser.add_argument('--concurrency', type=int, default=8, help='клиентских потоков в режиме http')
+    parser.add_argument('--requests', type=int, default=200, help='запросов на сценарий')
+    parser.add_argument('--warmup', type=int, default=10, help='запросов прогрева на сценарий')
+    parser.add_argument('--only', help='сценарии через запятую (по умолчанию все)')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--projects', type=int, default=50)
+    parser.add_argument('--columns', type=int, default=5)
+    parser.add_argument('--members', type=int, default=5)
+    parser.add_argument('--tasks', type=int, default=20000)
+    parser.add_argument('--logs', type=int, default=3, help='средних логов на задачу')
+    parser.add_argument('--skew', type=float, default=1.0, help='показатель Ципфа распределения задач')
+    parser.add_argument('--random-seed', type=int, default=42)
+    parser.add_argument('--output', help='файл для результатов в JSON')
+    parser.add_argument('--baseline', help='JSON базового прогона для проверки регрессий')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='допустимое ухудшение rps и p99 (доля)')
+    parser.add_argument('--update-baseline', action='store_true', help='записать прогон в --baseline')
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    server = None
+    try:
+        app = build_app(path)
+        selected = scenarios(app, args)
+        names = set(args.only.split(',')) if args.only else None
+        if names:
+            selected = [scenario for scenario in selected if scenario[0] in names]
+        concurrency = 1
+        if args.mode == 'http':
+            server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            call = http_call(f'http://127.0.0.1:{server.server_port}')
+            concurrency = args.concurrency
+        else:
+            call = client_call(app)
+
+        results = {
+            'mode': args.mode,
+            'params': {name: getattr(args, name) for name in ('concurrency', 'requests', 'users', 'projects',
+                                                               'columns', 'members', 'tasks', 'logs', 'skew',
+                                                               'random_seed')},
+            'endpoints': {}
+        }
+        for scenario in selected:
+            result = run_scenario(call, scenario, args.requests, concurrency, args.warmup)
+            results['endpoints'][scenario[0]] = result
+            print(f"{scenario[0]:20} rps={result['rps']:9.1f}  p50={result['p50_ms']:7.2f} ms  "
+                  f"p99={result['p99_ms']:7.2f} ms  sql={result['sql_per_request']:5.2f}  errors={result['errors']}")
+    finally:
+        if server is not None:
+            server.shutdown()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if not args.baseline:
+        return
+    if args.update_baseline or not os.path.exists(args.baseline):
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f'Базовый прогон записан в {args.baseline}')
+        return
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    if (baseline.get('mode'), baseline.get('params')) != (results['mode'], results['params']):
+        print('Внимание: режим или параметры отличаются от базового прогона')
+    regressions = compare(results, baseline, args.tolerance, names)
+    for line in regressions:
+        print('РЕГРЕССИЯ ' + line)
+    if regressions:
+        sys.exit(1)
+    print('Регрессий нет')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""Нагрузочный тест продакшен-профиля: запросы/с и p99 при разном числе воркеров.
+
+Для каждого значения --workers запускает gunicorn (gunicorn.conf.py, wsgi:app)
+на временной SQLite-базе с синтетическими данными и в течение --duration
+секунд нагружает его чтением доски из --concurrency потоков.
+
+Запуск из каталога KanbanBoard:
+    python benchmarks/load_test.py --workers 1,2,4 --duration 10
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+from database import db
+from database.migrations import upgrade_schema
+from models import User, Project, ProjectMember, Column, Task
+
+JWT_SECRET = 'load-test-secret-key-with-enough-length'
+
+
+def seed(path, projects, columns, tasks):
+    """Схема и данные во временной базе; возвращает (токен, список URL)"""
+    app = Flask(__name__)
+    app.config.update({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+        'JWT_SECRET_KEY': JWT_SECRET
+    })
+    db.init_app(app)
+    JWTManager(app)
+    with app.app_context():
+        upgrade_schema()
+        conn = db.session.connection()
+        conn.execute(User.__table__.insert(), [{'UserID': 1, 'Username': 'load', 'Email': 'load@example.com',
+                                                'PasswordHash': 'x'}])
+        conn.execute(Project.__table__.insert(), [{'ProjectID': p, 'Name': f'p{p}', 'OwnerID': 1}
+                                                   for p in range(1, projects + 1)])
+        conn.execute(ProjectMember.__table__.insert(), [{'ProjectID': p, 'UserID': 1, 'Role': 'owner'}
+                                                         for p in range(1, projects + 1)])
+        conn.execute(Column.__table__.insert(), [
+            {'ColumnID': (p - 1) * columns + i, 'Name': f'c{i}', 'OrderIndex': i, 'ProjectID': p, 'Position': str(i)}
+            for p in range(1, projects + 1) for i in range(1, columns + 1)
+        ])
+        now = datetime.utcnow()
+        rnd = random.Random(1)
+        conn.execute(Task.__table__.insert(), [
+            {'TaskID': t, 'Title': f't{t}', 'ColumnID': rnd.randint(1, projects * columns), 'CreatedBy': 1,
+             'CreatedAt': now - timedelta(seconds=t), 'Position': f'{t:08d}'.rstrip('0') + '1'}
+            for t in range(1, tasks + 1)
+        ])
+        db.session.commit()
+        token = create_access_token(identity='1')
+    urls = []
+    for p in range(1, projects + 1):
+        urls.append(f'/projects/{p}/board')
+        urls.append(f'/columns/project/{p}')
+        urls.extend(f'/tasks/column/{(p - 1) * columns + i}?limit=50' for i in range(1, columns + 1))
+    urls.extend(f'/tasks/{t}' for t in range(1, min(tasks, 200) + 1))
+    return token, urls
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(base, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(base + '/swagger.json', timeout=1).read()
+            return
+        except (urllib.error.URLError, ConnectionError, OSError):
+            time.sleep(0.2)
+    raise RuntimeError('Сервер не запустился')
+
+
+def run_load(base, token, urls, concurrency, duration):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def worker(seed):
+        rnd = random.Random(seed)
+        local, failed = [], 0
+        while time.perf_counter() < stop_at:
+            request = urllib.request.Request(base + rnd.choice(urls), headers={'Authorization': f'Bearer {token}'})
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    response.read()
+                local.append(time.perf_counter() - started)
+            except (urllib.error.URLError, ConnectionError, OSError):
+                failed += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    def percentile(q):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000 if latencies else 0.0
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': len(latencies) / elapsed,
+        'p50_ms': percentile(0.50),
+        'p99_ms': percentile(0.99),
+        'mean_ms': statistics.fmean(latencies) * 1000 if latencies else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', default='1,2,4', help='список числа воркеров через запятую')
+    parser.add_argument('--threads', type=int, default=8, help='потоков на воркер')
+    parser.add_argument('--concurrency', type=int, default=32, help='одновременных клиентов')
+    parser.add_argument('--duration', type=float, default=10, help='секунд на каждый замер')
+    parser.add_argument('--projects', type=int, default=10)
+    parser.add_argument('--columns', type=int, default=5)
+    parser.add_argument('--tasks', type=int, default=5000)
+    parser.add_argument('--output', help='файл для результатов в JSON')
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    results = []
+    try:
+        token, urls = seed(path, args.projects, args.columns, args.tasks)
+        for workers in [int(w) for w in args.workers.split(',')]:
+            port = free_port()
+            env = dict(os.environ, DB_CONNECTION_STRING=f'sqlite:///{path}', JWT_SECRET=JWT_SECRET,
+                       WEB_CONCURRENCY=str(workers), GUNICORN_THREADS=str(args.threads),
+                       GUNICORN_BIND=f'127.0.0.1:{port}', GUNICORN_ACCESS_LOG='/dev/null')
+            server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+                                      cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                base = f'http://127.0.0.1:{port}'
+                wait_ready(base)
+                result = run_load(base, token, urls, args.concurrency, args.duration)
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+            result['workers'] = workers
+            results.append(result)
+            print(f"workers={workers:<3} rps={result['rps']:9.1f}  p50={result['p50_ms']:7.2f} ms  "
+                  f"p99={result['p99_ms']:7.2f} ms  errors={result['errors']}")
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
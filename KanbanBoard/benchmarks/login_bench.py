@@ -0,0 +1,135 @@
+"""Пропускная способность входа: логины/с на ядро для разных политик хеширования.
+
+Для каждой политики (--methods) измеряет:
+  verify/s  - проверки пароля в одном процессе (одно ядро) без HTTP;
+  logins/s  - полные запросы POST /auth/login из --concurrency потоков
+              при пуле проверки из --pool процессов; per core = logins/s / pool.
+
+Запуск из каталога KanbanBoard:
+    python benchmarks/login_bench.py --methods scrypt,pbkdf2:sha256:600000 --duration 5
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_METHODS = 'scrypt:32768:8:1,scrypt:16384:8:1,pbkdf2:sha256:600000,pbkdf2:sha256:100000'
+JWT_SECRET = 'login-bench-secret-key-with-enough-length'
+PASSWORD = 'correct horse battery staple'
+
+
+def verify_rate(method, duration):
+    """Проверок пароля в секунду в текущем процессе"""
+    from werkzeug.security import generate_password_hash, check_password_hash
+    pwhash = generate_password_hash(PASSWORD, method=method)
+    count = 0
+    stop_at = time.perf_counter() + duration
+    started = time.perf_counter()
+    while time.perf_counter() < stop_at:
+        check_password_hash(pwhash, PASSWORD)
+        count += 1
+    return count / (time.perf_counter() - started)
+
+
+def seed(path, users, method):
+    """Схема и пользователи во временной базе (хеши по заданной политике)"""
+    from flask import Flask
+    from werkzeug.security import generate_password_hash
+    from database import db
+    from database.migrations import upgrade_schema
+    from models import User, Project, Column
+
+    app = Flask(__name__)
+    app.config.update({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'SQLALCHEMY_TRACK_MODIFICATIONS': False})
+    db.init_app(app)
+    pwhash = generate_password_hash(PASSWORD, method=method)
+    with app.app_context():
+        upgrade_schema()
+        conn = db.session.connection()
+        conn.execute(User.__table__.insert(), [
+            {'UserID': i + 1, 'Username': f'user{i}', 'Email': f'user{i}@example.com', 'PasswordHash': pwhash}
+            for i in range(users)
+        ])
+        # Проект с колонкой: при непустой таблице колонок начальные данные не создаются
+        conn.execute(Project.__table__.insert(), [{'ProjectID': 1, 'Name': 'p', 'OwnerID': 1}])
+        conn.execute(Column.__table__.insert(), [{'ColumnID': 1, 'Name': 'c', 'OrderIndex': 1, 'ProjectID': 1}])
+        db.session.commit()
+
+
+def login_rate(method, pool, concurrency, duration):
+    """Успешных входов в секунду через приложение"""
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    os.environ.update({
+        'DB_CONNECTION_STRING': f'sqlite:///{path}',
+        'JWT_SECRET': JWT_SECRET,
+        'PASSWORD_HASH_METHOD': method,
+        'PASSWORD_POOL_SIZE': str(pool),
+        'LOGIN_RATE_LIMIT_USER': '0',
+        'LOGIN_RATE_LIMIT_IP': '0'
+    })
+    from app import create_app
+    from services.passwords import hasher
+    try:
+        seed(path, concurrency, method)
+        app = create_app()
+        # Прогрев пула: процессы запускаются при первом обращении
+        app.test_client().post('/auth/login', json={'Username': 'user0', 'Password': PASSWORD})
+
+        counts, errors = [0] * concurrency, [0] * concurrency
+        stop_at = time.perf_counter() + duration
+
+        def worker(i):
+            client = app.test_client()
+            while time.perf_counter() < stop_at:
+                response = client.post('/auth/login', json={'Username': f'user{i}', 'Password': PASSWORD})
+                if response.status_code == 200:
+                    counts[i] += 1
+                else:
+                    errors[i] += 1
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sum(counts) / (time.perf_counter() - started), sum(errors)
+    finally:
+        hasher.shutdown()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--methods', default=DEFAULT_METHODS, help='политики через запятую')
+    parser.add_argument('--pool', type=int, default=os.cpu_count() or 1, help='процессов в пуле проверки')
+    parser.add_argument('--concurrency', type=int, default=8, help='одновременных клиентов')
+    parser.add_argument('--duration', type=float, default=5, help='секунд на каждый замер')
+    parser.add_argument('--output', help='файл для результатов в JSON')
+    args = parser.parse_args()
+
+    results = []
+    for method in args.methods.split(','):
+        single = verify_rate(method, args.duration)
+        logins, errors = login_rate(method, args.pool, args.concurrency, args.duration)
+        result = {'method': method, 'verify_per_sec': single, 'logins_per_sec': logins,
+                  'logins_per_sec_per_core': logins / args.pool, 'errors': errors}
+        results.append(result)
+        print(f"{method:<24} verify/s={single:8.1f}  logins/s={logins:8.1f}  "
+              f"per core={result['logins_per_sec_per_core']:7.1f}  errors={errors}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
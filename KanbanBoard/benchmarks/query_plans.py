@@ -0,0 +1,163 @@
+"""Планы и время горячих запросов до и после миграции с индексами.
+
+Создает временную SQLite-базу со схемой без индексов (как у баз,
+созданных через db.create_all()), заполняет ее синтетическими данными,
+выводит EXPLAIN QUERY PLAN и среднее время запросов, затем применяет
+миграции и повторяет замеры.
+
+Запуск из каталога KanbanBoard:
+    python benchmarks/query_plans.py --tasks 200000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import select, text
+from database import db
+from database.crud import get_projects_for_user
+from database.migrations import upgrade_schema
+from models import User, Project, ProjectMember, Column, Task, TaskLog
+
+
+def build_app(path):
+    app = Flask(__name__)
+    app.config.update({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False
+    })
+    db.init_app(app)
+    return app
+
+
+def create_legacy_schema():
+    """Схема без индексов, как до введения миграций"""
+    db.create_all()
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.drop(db.engine, checkfirst=True)
+
+
+def seed(users, projects, columns_per_project, tasks, logs_per_task):
+    rnd = random.Random(42)
+    now = datetime.utcnow()
+    conn = db.session.connection()
+    conn.execute(User.__table__.insert(), [
+        {'UserID': i, 'Username': f'user{i}', 'Email': f'user{i}@example.com', 'PasswordHash': 'x'}
+        for i in range(1, users + 1)
+    ])
+    conn.execute(Project.__table__.insert(), [
+        {'ProjectID': i, 'Name': f'project{i}', 'OwnerID': rnd.randint(1, users)}
+        for i in range(1, projects + 1)
+    ])
+    conn.execute(ProjectMember.__table__.insert(), [
+        {'ProjectID': p, 'UserID': u, 'Role': 'member'}
+        for p in range(1, projects + 1)
+        for u in rnd.sample(range(1, users + 1), min(users, 5))
+    ])
+    conn.execute(Column.__table__.insert(), [
+        {'ColumnID': (p - 1) * columns_per_project + i, 'Name': f'col{i}', 'OrderIndex': i, 'ProjectID': p}
+        for p in range(1, projects + 1)
+        for i in range(1, columns_per_project + 1)
+    ])
+    total_columns = projects * columns_per_project
+    batch = []
+    for task_id in range(1, tasks + 1):
+        batch.append({
+            'TaskID': task_id, 'Title': f'task{task_id}', 'ColumnID': rnd.randint(1, total_columns),
+            'CreatedBy': rnd.randint(1, users), 'CreatedAt': now - timedelta(minutes=task_id)
+        })
+        if len(batch) == 10000:
+            conn.execute(Task.__table__.insert(), batch)
+            batch = []
+    if batch:
+        conn.execute(Task.__table__.insert(), batch)
+    batch = []
+    for task_id in range(1, tasks + 1):
+        for n in range(logs_per_task):
+            batch.append({
+                'TaskID': task_id, 'UserID': 1, 'Action': 'move', 'Message': 'move',
+                'CreatedAt': now - timedelta(minutes=n)
+            })
+        if len(batch) >= 10000:
+            conn.execute(TaskLog.__table__.insert(), batch)
+            batch = []
+    if batch:
+        conn.execute(TaskLog.__table__.insert(), batch)
+    db.session.commit()
+
+
+def hot_queries(users, projects, columns_per_project, tasks):
+    """Запросы из обработчиков routers/*"""
+    project_id = projects // 2 or 1
+    column_id = (project_id - 1) * columns_per_project + 1
+    return [
+        ('membership check', select(ProjectMember.Role).filter_by(ProjectID=project_id, UserID=1)),
+        ('tasks by column', select(Task).filter_by(ColumnID=column_id)),
+        ('columns by project', select(Column).filter_by(ProjectID=project_id).order_by(Column.OrderIndex)),
+        ('logs by task', select(TaskLog).filter_by(TaskID=tasks // 2 or 1).order_by(TaskLog.CreatedAt.desc())),
+        ('projects by owner', select(Project).filter_by(OwnerID=users // 2 or 1)),
+        ('projects of user', get_projects_for_user(users // 2 or 1)
+         .order_by(Project.ProjectID).limit(100).statement),
+    ]
+
+
+def measure(queries, repeat):
+    conn = db.session.connection()
+    results = {}
+    for name, query in queries:
+        sql = str(query.compile(db.engine, compile_kwargs={'literal_binds': True}))
+        plan = [row[-1] for row in conn.execute(text(f'EXPLAIN QUERY PLAN {sql}'))]
+        started = time.perf_counter()
+        for _ in range(repeat):
+            conn.execute(query).fetchall()
+        elapsed_ms = (time.perf_counter() - started) / repeat * 1000
+        results[name] = (plan, elapsed_ms)
+    return results
+
+
+def report(title, results):
+    print(f'\n=== {title}')
+    for name, (plan, elapsed_ms) in results.items():
+        print(f'{name:<20} {elapsed_ms:9.3f} ms   ' + ' | '.join(plan))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--projects', type=int, default=2000)
+    parser.add_argument('--columns', type=int, default=5, help='колонок на проект')
+    parser.add_argument('--tasks', type=int, default=200000)
+    parser.add_argument('--logs', type=int, default=3, help='логов на задачу')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        app = build_app(path)
+        with app.app_context():
+            create_legacy_schema()
+            seed(args.users, args.projects, args.columns, args.tasks, args.logs)
+            queries = hot_queries(args.users, args.projects, args.columns, args.tasks)
+
+            report('До миграции', measure(queries, args.repeat))
+            db.session.remove()
+
+            applied = upgrade_schema()
+            with db.engine.begin() as conn:
+                conn.execute(text('ANALYZE'))
+            report(f'После миграции (версии {applied})', measure(queries, args.repeat))
+            db.session.remove()
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Скорость сериализации списков: marshal_list_with против скомпилированных моделей.
+
+Создает временную SQLite-базу с --tasks задачами одной колонки и выводит
+строки/с для выборки и сериализации списка задач тремя способами:
+ORM-объекты + marshal + json (как было), кортежи колонок + marshal + json
+(как без FAST_SERIALIZATION) и кортежи + скомпилированная модель +
+services/serialization.dumps (orjson, если установлен).
+
+Запуск из каталога KanbanBoard:
+    python benchmarks/serialization_bench.py --tasks 500 --repeat 200
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask_restx import marshal
+from database import db
+from database.migrations import upgrade_schema
+from models import User, Project, Column, Task
+from routers.tasks import task_model
+from services import serialization
+from services.ranking import evenly_spaced
+
+
+def build_app(path):
+    app = Flask(__name__)
+    app.config.update({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False
+    })
+    db.init_app(app)
+    return app
+
+
+def seed(tasks):
+    now = datetime.utcnow()
+    conn = db.session.connection()
+    conn.execute(User.__table__.insert(), [{'UserID': 1, 'Username': 'owner', 'Email': 'owner@example.com',
+                                            'PasswordHash': 'x'}])
+    conn.execute(Project.__table__.insert(), [{'ProjectID': 1, 'Name': 'bench', 'OwnerID': 1}])
+    conn.execute(Column.__table__.insert(), [{'ColumnID': 1, 'Name': 'col', 'OrderIndex': 1, 'ProjectID': 1}])
+    conn.execute(Task.__table__.insert(), [
+        {'TaskID': i + 1, 'Title': f'Задача {i}', 'Description': 'Описание задачи ' * 4, 'ColumnID': 1,
+         'Position': position, 'CreatedBy': 1, 'CreatedAt': now - timedelta(minutes=i), 'UpdatedAt': now}
+        for i, position in enumerate(evenly_spaced(tasks))
+    ])
+    db.session.commit()
+
+
+def orm_marshal():
+    rows = Task.query.filter_by(ColumnID=1).order_by(Task.CreatedAt, Task.TaskID).all()
+    return json.dumps(marshal(rows, task_model)).encode()
+
+
+def tuples_marshal():
+    rows = (db.session.query(*serialization.model_columns(task_model, Task))
+            .filter(Task.ColumnID == 1).order_by(Task.CreatedAt, Task.TaskID).all())
+    return json.dumps(marshal([row._asdict() for row in rows], task_model)).encode()
+
+
+serialize = serialization.compile_model(task_model)
+
+
+def tuples_compiled():
+    rows = (db.session.query(*serialization.model_columns(task_model, Task))
+            .filter(Task.ColumnID == 1).order_by(Task.CreatedAt, Task.TaskID).all())
+    return serialization.dumps([serialize(row) for row in rows])
+
+
+def measure(func, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+        # Объекты не копятся в identity map между повторами
+        db.session.expunge_all()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tasks', type=int, default=500, help='задач в списке (MAX_LIMIT = 500)')
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        app = build_app(path)
+        with app.app_context():
+            upgrade_schema()
+            seed(args.tasks)
+            assert json.loads(orm_marshal()) == json.loads(tuples_compiled())
+            print(f'json backend: {"orjson" if serialization.orjson is not None else "json"}')
+            baseline = None
+            for name, func in (('orm + marshal', orm_marshal), ('tuples + marshal', tuples_marshal),
+                               ('tuples + compiled', tuples_compiled)):
+                elapsed = measure(func, args.repeat)
+                rate = args.tasks * args.repeat / elapsed
+                baseline = baseline or rate
+                print(f'{name:18} {rate:10.0f} rows/s  x{rate / baseline:.1f}')
+            db.session.remove()
+    finally:
+        for name in (path, path + '-wal', path + '-shm'):
+            if os.path.exists(name):
+                os.remove(name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""Холодный запуск воркера: импорт, create_app() и первые запросы.
+
+Создает временную SQLite-базу (flask init-db и немного данных из
+database/seed.py), затем --repeat раз для каждого варианта запускает новый
+процесс Python и измеряет в нем: импорт app, create_app() и число
+SQL-запросов при нем, первый и второй запрос к API (GET /projects/),
+первый запрос /swagger.json (спецификация строится при первом обращении)
+и /docs/. Выводятся медианы.
+
+Варианты: default (схема не проверяется при запуске), auto-migrate
+(AUTO_MIGRATE=1, как было раньше) и no-docs (API_DOCS=0).
+
+Запуск из каталога KanbanBoard:
+    python benchmarks/startup_bench.py --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+JWT_SECRET = 'startup-bench-secret-key-with-enough-length'
+
+VARIANTS = {
+    'default': {},
+    'auto-migrate': {'AUTO_MIGRATE': '1'},
+    'no-docs': {'API_DOCS': '0'},
+}
+
+METRICS = ('import_ms', 'create_app_ms', 'create_app_sql', 'first_request_ms', 'second_request_ms',
+           'swagger_ms', 'docs_ms')
+
+
+def child():
+    """Замер в новом процессе; результат - JSON в stdout"""
+    started = time.perf_counter()
+    import app as module
+    imported = time.perf_counter()
+
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    statements = [0]
+
+    def count(*args):
+        statements[0] += 1
+    event.listen(Engine, 'before_cursor_execute', count)
+
+    application = module.create_app()
+    created = time.perf_counter()
+    sql = statements[0]
+
+    client = application.test_client()
+    headers = {'Authorization': 'Bearer ' + os.environ['BENCH_TOKEN']}
+    timings = []
+    for _ in range(2):
+        begin = time.perf_counter()
+        response = client.get('/projects/', headers=headers)
+        assert response.status_code == 200, response.status_code
+        timings.append(time.perf_counter() - begin)
+    result = {
+        'import_ms': (imported - started) * 1000,
+        'create_app_ms': (created - imported) * 1000,
+        'create_app_sql': sql,
+        'first_request_ms': timings[0] * 1000,
+        'second_request_ms': timings[1] * 1000,
+    }
+    if application.config['API_DOCS']:
+        for name, path in (('swagger_ms', '/swagger.json'), ('docs_ms', '/docs/')):
+            begin = time.perf_counter()
+            client.get(path).get_data()
+            result[name] = (time.perf_counter() - begin) * 1000
+    print(json.dumps(result))
+
+
+def prepare(path):
+    """Схема и данные во временной базе; возвращает токен владельца проекта"""
+    os.environ.update({'DB_CONNECTION_STRING': f'sqlite:///{path}', 'JWT_SECRET': JWT_SECRET})
+    from app import create_app
+    from database import db
+    from database.migrations import upgrade_schema
+    from database.seed import seed_data
+    from models import Project
+    from services.tokens import issue_tokens
+
+    app = create_app()
+    with app.app_context():
+        upgrade_schema()
+        seed_data(users=20, projects=5, tasks=500)
+        owner_id = db.session.query(Project.OwnerID).order_by(Project.ProjectID).limit(1).scalar()
+        token = issue_tokens(owner_id)['access_token']
+        db.session.remove()
+    return token
+
+
+def run_variant(env, repeat):
+    samples = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child'], cwd=ROOT, env=env,
+                                check=True, capture_output=True, text=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {name: statistics.median(sample[name] for sample in samples)
+            for name in METRICS if name in samples[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='запусков на вариант')
+    parser.add_argument('--variants', default=','.join(VARIANTS), help='варианты через запятую')
+    parser.add_argument('--output', help='файл для результатов в JSON')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child()
+        return
+
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    results = {}
+    try:
+        token = prepare(path)
+        for name in args.variants.split(','):
+            env = dict(os.environ, BENCH_TOKEN=token, JOBS_MODE='inline', **VARIANTS[name])
+            results[name] = result = run_variant(env, args.repeat)
+            print(f'{name:13} ' + '  '.join(
+                f'{metric}={result[metric]:.0f}' if metric == 'create_app_sql' else f'{metric}={result[metric]:.1f}'
+                for metric in METRICS if metric in result))
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
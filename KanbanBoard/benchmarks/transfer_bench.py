@@ -0,0 +1,126 @@
+"""Скорость выгрузки и загрузки проекта (строк в секунду).
+
+Создает временную SQLite-базу с одним проектом из --tasks задач и --logs
+логов на задачу, выгружает его в NDJSON-файл (services/transfer.py),
+загружает файл обратно новым проектом и выводит строки/с для обоих
+направлений; с --memory - еще и пиковый объем памяти Python (tracemalloc
+заметно замедляет замер).
+
+Запуск из каталога KanbanBoard:
+    python benchmarks/transfer_bench.py --tasks 100000 --logs 3
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from database import db
+from database.migrations import upgrade_schema
+from models import User, Project, ProjectMember, Column, Task, TaskLog
+from services.ranking import evenly_spaced
+from services.transfer import export_ndjson, import_project
+
+
+def build_app(path):
+    app = Flask(__name__)
+    app.config.update({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False
+    })
+    db.init_app(app)
+    return app
+
+
+def seed(tasks, logs_per_task, columns=5):
+    now = datetime.utcnow()
+    conn = db.session.connection()
+    conn.execute(User.__table__.insert(), [{'UserID': 1, 'Username': 'owner', 'Email': 'owner@example.com',
+                                            'PasswordHash': 'x'}])
+    conn.execute(Project.__table__.insert(), [{'ProjectID': 1, 'Name': 'bench', 'OwnerID': 1}])
+    conn.execute(ProjectMember.__table__.insert(), [{'ProjectID': 1, 'UserID': 1, 'Role': 'owner'}])
+    conn.execute(Column.__table__.insert(), [
+        {'ColumnID': i + 1, 'Name': f'col{i}', 'OrderIndex': i, 'Position': position, 'ProjectID': 1}
+        for i, position in enumerate(evenly_spaced(columns))
+    ])
+    positions = evenly_spaced(tasks // columns + 1)
+    for start in range(0, tasks, 10000):
+        ids = range(start + 1, min(start + 10000, tasks) + 1)
+        conn.execute(Task.__table__.insert(), [
+            {'TaskID': task_id, 'Title': f'task {task_id}', 'Description': 'description ' * 5,
+             'ColumnID': task_id % columns + 1, 'Position': positions[task_id // columns],
+             'CreatedBy': 1, 'CreatedAt': now - timedelta(minutes=task_id)}
+            for task_id in ids
+        ])
+        conn.execute(TaskLog.__table__.insert(), [
+            {'TaskID': task_id, 'UserID': 1, 'Action': 'update', 'Message': 'Изменены поля задачи: Title',
+             'CreatedAt': now - timedelta(minutes=task_id - n)}
+            for task_id in ids for n in range(logs_per_task)
+        ])
+    db.session.commit()
+
+
+def measure(func, memory=False):
+    """(результат, секунды, строка о пике памяти)"""
+    if memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    peak = ''
+    if memory:
+        peak = f'  peak {tracemalloc.get_traced_memory()[1] / 2 ** 20:6.1f} MB'
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tasks', type=int, default=100000)
+    parser.add_argument('--logs', type=int, default=3, help='логов на задачу')
+    parser.add_argument('--chunk', type=int, default=1000, help='строк в пачке импорта')
+    parser.add_argument('--memory', action='store_true', help='измерять пик памяти')
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    fd, dump = tempfile.mkstemp(suffix='.ndjson')
+    os.close(fd)
+    try:
+        app = build_app(path)
+        with app.app_context():
+            upgrade_schema()
+            seed(args.tasks, args.logs)
+            rows = args.tasks * (args.logs + 1)
+
+            def export():
+                with open(dump, 'w', encoding='utf-8') as f:
+                    for chunk in export_ndjson(1):
+                        f.write(chunk)
+
+            _, elapsed, peak = measure(export, args.memory)
+            print(f'export  {rows / elapsed:10.0f} rows/s  {elapsed:7.2f} s{peak}  '
+                  f'file {os.path.getsize(dump) / 2 ** 20:.1f} MB')
+            db.session.remove()
+
+            def load():
+                with open(dump, encoding='utf-8') as f:
+                    return import_project(1, f, chunk_size=args.chunk)
+
+            result, elapsed, peak = measure(load, args.memory)
+            print(f'import  {rows / elapsed:10.0f} rows/s  {elapsed:7.2f} s{peak}  '
+                  f"tasks {result['tasks']} logs {result['logs']}")
+            db.session.remove()
+    finally:
+        for name in (path, path + '-wal', path + '-shm', dump):
+            if os.path.exists(name):
+                os.remove(name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Команды flask CLI (flask --app app <команда>)"""
+import click
+from database import db
+
+
+def register_commands(app):
+    @app.cli.command('init-db')
+    @click.option('--seed', 'with_seed', is_flag=True, help='Добавить синтетические данные (как flask seed)')
+    def init_db_command(with_seed):
+        """Создание и обновление схемы базы; выполняется один раз при развертывании"""
+        from database.migrations import upgrade_schema
+        applied = upgrade_schema()
+        if applied:
+            click.echo('Применены миграции: ' + ', '.join(map(str, applied)))
+        else:
+            click.echo('Схема базы актуальна')
+        if with_seed:
+            from database.seed import seed_data
+            counts = seed_data()
+            click.echo(', '.join(f'{table}: {count}' for table, count in counts.items()))
+
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index():
+        """Полное перестроение полнотекстового индекса задач и логов"""
+        from services.search import rebuild
+        with db.engine.begin() as conn:
+            if rebuild(conn):
+                click.echo('Поисковый индекс перестроен')
+            else:
+                click.echo('СУБД не поддерживает FTS5, поиск выполняется без индекса')
+
+    @app.cli.command('rebuild-flow-metrics')
+    def rebuild_flow_metrics():
+        """Пересчет дневной сводки потока задач по логам перемещений"""
+        from services.metrics import rebuild
+        with db.engine.begin() as conn:
+            rebuild(conn)
+        click.echo('Сводка потока задач пересчитана')
+
+    @app.cli.command('run-jobs')
+    def run_jobs():
+        """Выполнение незавершенных заданий удаления (при остановленных воркерах)"""
+        from services.jobs import resume_jobs
+        job_ids = resume_jobs(app.config['JOB_CHUNK_SIZE'])
+        click.echo(f'Выполнено заданий: {len(job_ids)}')
+
+    @app.cli.command('export-project')
+    @click.argument('project_id', type=int)
+    @click.option('--output', '-o', type=click.File('w', encoding='utf-8'), default='-',
+                  help='Файл выгрузки (по умолчанию stdout)')
+    @click.option('--format', 'fmt', type=click.Choice(['ndjson', 'csv']), default='ndjson')
+    def export_project_command(project_id, output, fmt):
+        """Выгрузка проекта: ndjson - все данные, csv - только задачи"""
+        from models import Project
+        from services.transfer import export_csv, export_ndjson
+        if db.session.get(Project, project_id) is None:
+            raise click.ClickException(f'Проект {project_id} не найден')
+        for chunk in (export_csv if fmt == 'csv' else export_ndjson)(project_id):
+            output.write(chunk)
+
+    @app.cli.command('import-project')
+    @click.argument('source', type=click.File('r', encoding='utf-8-sig'))
+    @click.option('--owner', type=int, required=True, help='ID владельца нового проекта')
+    @click.option('--name', help='Название проекта (по умолчанию из выгрузки)')
+    @click.option('--format', 'fmt', type=click.Choice(['ndjson', 'csv']), default='ndjson')
+    def import_project_command(source, owner, name, fmt):
+        """Создание проекта из выгрузки"""
+        from models import User
+        from services.jobs import MODE_INLINE, runner
+        from services.transfer import TransferError, import_project
+        if db.session.get(User, owner) is None:
+            raise click.ClickException(f'Пользователь {owner} не найден')
+        # При ошибке недоимпортированные данные удаляются до выхода из команды
+        runner.mode = MODE_INLINE
+        try:
+            result = import_project(owner, source, fmt, name)
+        except TransferError as exc:
+            raise click.ClickException(str(exc))
+        click.echo('Проект {ProjectID} создан: колонок {columns}, участников {members}, '
+                   'задач {tasks}, логов {logs}'.format(**result))
+
+    @app.cli.command('seed')
+    @click.option('--users', type=int, default=100, show_default=True)
+    @click.option('--projects', type=int, default=20, show_default=True)
+    @click.option('--columns', type=int, default=5, show_default=True, help='Колонок в проекте')
+    @click.option('--members', type=int, default=5, show_default=True,
+                  help='Средний размер команды (на больших досках больше)')
+    @click.option('--tasks', type=int, default=10000, show_default=True, help='Задач всего')
+    @click.option('--logs', type=int, default=3, show_default=True, help='Средних логов на задачу кроме создания')
+    @click.option('--skew', type=float, default=1.0, show_default=True,
+                  help='Показатель Ципфа: 0 - одинаковые доски, больше - несколько огромных')
+    @click.option('--random-seed', type=int, default=42, show_default=True)
+    @click.option('--no-reindex', is_flag=True, help='Не перестраивать поиск и сводку потока')
+    def seed_command(users, projects, columns, members, tasks, logs, skew, random_seed, no_reindex):
+        """Генерация синтетических данных для нагрузочных тестов"""
+        from database.seed import SEED_PASSWORD, seed_data
+        if users < 1 or projects < 1 or columns < 1:
+            raise click.ClickException('Нужны хотя бы один пользователь, проект и колонка')
+        counts = seed_data(users, projects, columns, members, tasks, logs, skew, random_seed, not no_reindex)
+        click.echo(', '.join(f'{table}: {count}' for table, count in counts.items()))
+        click.echo(f'Пароль пользователей seed<ID>: {SEED_PASSWORD}')
@@ -0,0 +1 @@
+from database.database import db, jwt
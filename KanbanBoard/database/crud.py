@@ -1,5 +1,7 @@
-from models import User, Project, Column, Task, TaskLog
+from sqlalchemy import and_, func, select, union
+from models import User, Project, ProjectMember, Column, Task
 from database import db
+from services.tokens import bump_membership_version
 
 # CRUD операции для пользователей
 def create_user(username, email, password):
@@ -14,12 +16,34 @@ def get_user_by_username(username):
 
 # CRUD операции для проектов
 def create_project(name, description, owner_id):
+    """Проект с владельцем в участниках: доступ проверяется по ProjectMember"""
     project = Project(Name=name, Description=description, OwnerID=owner_id)
     db.session.add(project)
+    db.session.flush()
+    db.session.add(ProjectMember(ProjectID=project.ProjectID, UserID=owner_id, Role='owner'))
+    bump_membership_version(owner_id)
     db.session.commit()
     return project
 
 def get_projects_for_user(user_id):
-    return Project.query.filter_by(OwnerID=user_id).all()
+    """Запрос проектов, где пользователь участник или владелец, с его ролью"""
+    member_of = select(ProjectMember.ProjectID).where(ProjectMember.UserID == user_id)
+    owned = select(Project.ProjectID).where(Project.OwnerID == user_id)
+    return (db.session.query(Project.ProjectID, Project.Name, Project.Description, Project.OwnerID,
+                             Project.CreatedAt, ProjectMember.Role)
+            .outerjoin(ProjectMember, and_(ProjectMember.ProjectID == Project.ProjectID,
+                                           ProjectMember.UserID == user_id))
+            .filter(Project.ProjectID.in_(union(member_of, owned)), Project.DeletedAt.is_(None)))
+
+def get_project_counts(project_ids):
+    """{ProjectID: (колонок, задач)} одним сгруппированным запросом"""
+    if not project_ids:
+        return {}
+    rows = (db.session.query(Column.ProjectID, func.count(func.distinct(Column.ColumnID)), func.count(Task.TaskID))
+            .outerjoin(Task, Task.ColumnID == Column.ColumnID)
+            .filter(Column.ProjectID.in_(project_ids), Column.DeletedAt.is_(None))
+            .group_by(Column.ProjectID)
+            .all())
+    return {project_id: (columns, tasks) for project_id, columns, tasks in rows}
 
 # Другие CRUD операции...
\ No newline at end of file
@@ -1,27 +1,67 @@
+import os
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
+from sqlalchemy import event
 
 # Инициализация расширений
 db = SQLAlchemy()
 jwt = JWTManager()
 
+# Параметры пула соединений: переменная окружения -> (параметр create_engine, тип)
+POOL_SETTINGS = {
+    'DB_POOL_SIZE': ('pool_size', int),
+    'DB_MAX_OVERFLOW': ('max_overflow', int),
+    'DB_POOL_TIMEOUT': ('pool_timeout', int),
+    'DB_POOL_RECYCLE': ('pool_recycle', int),
+}
+
+def _is_sqlite(uri):
+    return (uri or '').startswith('sqlite')
+
+def _is_memory_sqlite(uri):
+    return _is_sqlite(uri) and (':memory:' in uri or uri.rstrip('/') == 'sqlite:')
+
+def engine_options(uri, environ=os.environ):
+    """Параметры движка SQLAlchemy из переменных окружения"""
+    options = {
+        # Проверка соединения перед выдачей из пула (разрывы после простоя/failover)
+        'pool_pre_ping': environ.get('DB_POOL_PRE_PING', '1').lower() not in ('0', 'false', 'no')
+    }
+    # Для SQLite в памяти используется StaticPool без настроек размера
+    if _is_memory_sqlite(uri):
+        return options
+    for name, (option, type_) in POOL_SETTINGS.items():
+        if environ.get(name):
+            options[option] = type_(environ[name])
+    return options
+
+def _sqlite_pragmas(app):
+    """PRAGMA для каждого нового соединения SQLite"""
+    journal_mode = app.config.get('SQLITE_JOURNAL_MODE', 'WAL')
+    synchronous = app.config.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    busy_timeout = int(app.config.get('SQLITE_BUSY_TIMEOUT', 5000))
+
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # WAL: читатели не блокируются писателем; NORMAL безопасен в режиме WAL
+        cursor.execute(f'PRAGMA journal_mode={journal_mode}')
+        cursor.execute(f'PRAGMA synchronous={synchronous}')
+        cursor.execute(f'PRAGMA busy_timeout={busy_timeout}')
+        cursor.close()
+    return on_connect
+
 def init_db(app):
     """Инициализация базы данных"""
     db.init_app(app)
     jwt.init_app(app)
     
     with app.app_context():
-        db.create_all()
-        init_default_data()
-
-def init_default_data():
-    """Инициализация начальных данных"""
-    from models.column import Column
-    if Column.query.count() == 0:
-        default_columns = [
-            Column(Name='To Do', OrderIndex=1),
-            Column(Name='In Progress', OrderIndex=2),
-            Column(Name='Done', OrderIndex=3)
-        ]
-        db.session.bulk_save_objects(default_columns)
-        db.session.commit()
\ No newline at end of file
+        if db.engine.dialect.name == 'sqlite':
+            event.listen(db.engine, 'connect', _sqlite_pragmas(app))
+        # Схема создается и обновляется командой flask init-db один раз при
+        # развертывании, запуск воркера не обращается к базе. Миграции при
+        # создании приложения - только с AUTO_MIGRATE и для SQLite в памяти
+        # (такая база пуста в каждом процессе)
+        if app.config.get('AUTO_MIGRATE') or _is_memory_sqlite(app.config.get('SQLALCHEMY_DATABASE_URI')):
+            from database.migrations import upgrade_schema
+            upgrade_schema()
\ No newline at end of file
@@ -0,0 +1,270 @@
+import re
+from datetime import datetime
+import sqlalchemy as sa
+from sqlalchemy import inspect, text
+from database.database import db
+
+# Таблица с номерами примененных версий схемы (вне метаданных моделей)
+version_table = sa.Table(
+    'schema_version', sa.MetaData(),
+    sa.Column('version', sa.Integer, primary_key=True, autoincrement=False),
+    sa.Column('description', sa.String(255), nullable=False),
+    sa.Column('applied_at', sa.DateTime, nullable=False)
+)
+
+# Зарегистрированные миграции: версия -> (описание, функция)
+MIGRATIONS = {}
+
+
+def migration(version, description):
+    """Регистрация миграции схемы с указанным номером версии"""
+    def decorator(func):
+        if version in MIGRATIONS:
+            raise ValueError(f'Миграция {version} уже зарегистрирована')
+        MIGRATIONS[version] = (description, func)
+        return func
+    return decorator
+
+
+def latest_version():
+    return max(MIGRATIONS) if MIGRATIONS else 0
+
+
+def _reflect(conn, table_name):
+    """Текущее состояние таблицы в базе (не зависит от моделей)"""
+    return sa.Table(table_name, sa.MetaData(), autoload_with=conn)
+
+
+def create_index(conn, table_name, index_name, columns, unique=False):
+    """Создание индекса, если его еще нет"""
+    table = _reflect(conn, table_name)
+    if any(index.name == index_name for index in table.indexes):
+        return
+    sa.Index(index_name, *(table.c[name] for name in columns), unique=unique).create(conn)
+
+
+def add_column(conn, table_name, column):
+    """Добавление колонки в существующую таблицу, если ее еще нет"""
+    if column.name in _reflect(conn, table_name).c:
+        return
+    table = conn.dialect.identifier_preparer.quote(table_name)
+    spec = sa.schema.CreateColumn(column).compile(dialect=conn.dialect)
+    conn.execute(text(f'ALTER TABLE {table} ADD {spec}'))
+
+
+def drop_index(conn, table_name, index_name):
+    """Удаление индекса, если он есть"""
+    table = _reflect(conn, table_name)
+    for index in table.indexes:
+        if index.name == index_name:
+            index.drop(conn)
+
+
+@migration(1, 'Начальная схема')
+def _initial_schema(conn):
+    from services.search import create_fts_tables
+    db.metadata.create_all(conn)
+    create_fts_tables(conn)
+
+
+@migration(2, 'Индексы для внешних ключей и уникальность участников проекта')
+def _hot_lookup_indexes(conn):
+    # Перед созданием уникального индекса удаляем дубли участников,
+    # оставляя самую раннюю запись
+    conn.execute(text(
+        'DELETE FROM project_members WHERE "MemberID" NOT IN ('
+        'SELECT MIN("MemberID") FROM project_members GROUP BY "ProjectID", "UserID")'
+    ))
+    create_index(conn, 'project_members', 'uq_project_members_project_user',
+                 ['ProjectID', 'UserID'], unique=True)
+    create_index(conn, 'tasks', 'ix_tasks_column_id', ['ColumnID'])
+    create_index(conn, 'columns', 'ix_columns_project_order', ['ProjectID', 'OrderIndex'])
+    create_index(conn, 'task_logs', 'ix_task_logs_task_created', ['TaskID', 'CreatedAt'])
+    create_index(conn, 'projects', 'ix_projects_owner_id', ['OwnerID'])
+
+
+@migration(3, 'Индекс для постраничного списка задач колонки')
+def _task_keyset_index(conn):
+    # Составной индекс покрывает и поиск по ColumnID, и порядок (CreatedAt, TaskID)
+    create_index(conn, 'tasks', 'ix_tasks_column_created', ['ColumnID', 'CreatedAt', 'TaskID'])
+    drop_index(conn, 'tasks', 'ix_tasks_column_id')
+
+
+@migration(4, 'Ключи порядка задач и колонок')
+def _positions(conn):
+    from services.ranking import evenly_spaced
+
+    add_column(conn, 'tasks', sa.Column('Position', sa.String(64)))
+    add_column(conn, 'columns', sa.Column('Position', sa.String(64)))
+
+    # Начальные ключи повторяют текущий порядок: колонки по OrderIndex,
+    # задачи по времени создания
+    for table_name, key, parent, order in (
+        ('columns', 'ColumnID', 'ProjectID', ('OrderIndex', 'ColumnID')),
+        ('tasks', 'TaskID', 'ColumnID', ('CreatedAt', 'TaskID')),
+    ):
+        table = _reflect(conn, table_name)
+        rows = conn.execute(
+            sa.select(table.c[key], table.c[parent])
+            .order_by(table.c[parent], *(table.c[name] for name in order))
+        ).all()
+        groups = {}
+        for row_id, parent_id in rows:
+            groups.setdefault(parent_id, []).append(row_id)
+        params = [
+            {'row_id': row_id, 'position': position}
+            for ids in groups.values()
+            for row_id, position in zip(ids, evenly_spaced(len(ids)))
+        ]
+        if params:
+            conn.execute(
+                table.update().where(table.c[key] == sa.bindparam('row_id'))
+                .values(Position=sa.bindparam('position')),
+                params
+            )
+
+    create_index(conn, 'tasks', 'ix_tasks_column_position', ['ColumnID', 'Position'])
+    create_index(conn, 'columns', 'ix_columns_project_position', ['ProjectID', 'Position'])
+
+
+@migration(5, 'Ревизия проекта для условных GET-запросов')
+def _project_revision(conn):
+    add_column(conn, 'projects', sa.Column('Revision', sa.Integer, nullable=False, server_default='0'))
+
+
+@migration(6, 'Полнотекстовый индекс задач и логов (SQLite FTS5)')
+def _search_index(conn):
+    from services.search import rebuild
+    # Для других СУБД поиск работает без индекса (LIKE по исходным таблицам)
+    rebuild(conn)
+
+
+# Колонки в тексте лога перемещения (routers/tasks.py: move_log_values)
+_MOVE_MESSAGE = re.compile(r'из колонки (\d+) в (\d+)')
+
+
+@migration(7, 'Колонки перемещения в логах и дневная сводка потока задач')
+def _flow_metrics(conn):
+    from services.metrics import rebuild
+
+    add_column(conn, 'task_logs', sa.Column('FromColumnID', sa.Integer))
+    add_column(conn, 'task_logs', sa.Column('ToColumnID', sa.Integer))
+    logs = _reflect(conn, 'task_logs')
+    params = []
+    for log_id, message in conn.execute(sa.select(logs.c.LogID, logs.c.Message).where(logs.c.Action == 'move')):
+        match = _MOVE_MESSAGE.search(message or '')
+        if match:
+            params.append({'log_id': log_id, 'from_id': int(match[1]), 'to_id': int(match[2])})
+    if params:
+        conn.execute(
+            logs.update().where(logs.c.LogID == sa.bindparam('log_id'))
+            .values(FromColumnID=sa.bindparam('from_id'), ToColumnID=sa.bindparam('to_id')),
+            params
+        )
+    create_index(conn, 'task_logs', 'ix_task_logs_to_column', ['ToColumnID', 'CreatedAt'])
+
+    sa.Table(
+        'column_flow_daily', sa.MetaData(),
+        sa.Column('ColumnID', sa.Integer, primary_key=True, autoincrement=False),
+        sa.Column('Day', sa.Date, primary_key=True),
+        sa.Column('ProjectID', sa.Integer, nullable=False),
+        sa.Column('Entered', sa.Integer, nullable=False),
+        sa.Column('Exited', sa.Integer, nullable=False),
+        sa.Column('DwellSeconds', sa.Float, nullable=False),
+        sa.Index('ix_column_flow_daily_project_day', 'ProjectID', 'Day'),
+    ).create(conn, checkfirst=True)
+    rebuild(conn)
+
+
+@migration(8, 'Версия состава проектов пользователя для ролей в токенах')
+def _membership_version(conn):
+    add_column(conn, 'users', sa.Column('MembershipVersion', sa.Integer, nullable=False, server_default='0'))
+
+
+@migration(9, 'Фоновое удаление и архивация проектов и колонок')
+def _deletion_jobs(conn):
+    from models import Job, ArchivedTask, ArchivedTaskLog
+
+    add_column(conn, 'projects', sa.Column('DeletedAt', sa.DateTime))
+    add_column(conn, 'columns', sa.Column('DeletedAt', sa.DateTime))
+    # Новые таблицы без внешних ключей: создаются по моделям
+    for model in (Job, ArchivedTask, ArchivedTaskLog):
+        model.__table__.create(conn, checkfirst=True)
+
+
+@migration(10, 'Индекс проектов пользователя')
+def _member_projects_index(conn):
+    create_index(conn, 'project_members', 'ix_project_members_user_project', ['UserID', 'ProjectID'])
+
+
+@migration(11, 'Версии задач и колонок для оптимистичной блокировки')
+def _row_versions(conn):
+    add_column(conn, 'tasks', sa.Column('Version', sa.Integer, nullable=False, server_default='1'))
+    add_column(conn, 'columns', sa.Column('Version', sa.Integer, nullable=False, server_default='1'))
+
+
+@migration(12, 'Владельцы проектов - участники с ролью owner')
+def _owner_memberships(conn):
+    missing = ('FROM projects p WHERE NOT EXISTS (SELECT 1 FROM project_members m '
+               'WHERE m."ProjectID" = p."ProjectID" AND m."UserID" = p."OwnerID")')
+    # Роли в выданных токенах владельцев устаревают вместе с составом проектов
+    conn.execute(text('UPDATE users SET "MembershipVersion" = "MembershipVersion" + 1 '
+                      f'WHERE "UserID" IN (SELECT p."OwnerID" {missing})'))
+    conn.execute(text('INSERT INTO project_members ("ProjectID", "UserID", "Role") '
+                      f'SELECT p."ProjectID", p."OwnerID", \'owner\' {missing}'))
+
+
+@migration(13, 'Журнал проекта: удаление задач и изменения колонок')
+def _project_logs(conn):
+    from models import ProjectLog
+    ProjectLog.__table__.create(conn, checkfirst=True)
+
+
+@migration(14, 'Отозванные токены в базе (общие для всех воркеров)')
+def _revoked_tokens(conn):
+    from models import RevokedToken
+    RevokedToken.__table__.create(conn, checkfirst=True)
+
+
+def current_version(conn):
+    """Текущая версия схемы; 0 - схема не создана"""
+    if not inspect(conn).has_table(version_table.name):
+        return 0
+    return conn.execute(sa.select(sa.func.max(version_table.c.version))).scalar() or 0
+
+
+def _stamp(conn, version, description):
+    conn.execute(version_table.insert().values(
+        version=version, description=description, applied_at=datetime.utcnow()
+    ))
+
+
+def upgrade_schema(engine=None):
+    """Применение всех непримененных миграций; возвращает список версий"""
+    import models  # noqa: F401 - регистрация всех таблиц в метаданных
+
+    engine = engine or db.engine
+    applied = []
+    with engine.begin() as conn:
+        version = current_version(conn)
+        if version == 0:
+            version_table.create(conn, checkfirst=True)
+            if inspect(conn).has_table('projects'):
+                # База создана до появления миграций через db.create_all():
+                # считаем начальную схему уже примененной
+                _stamp(conn, 1, MIGRATIONS[1][0])
+                version = 1
+            else:
+                # Новая база: текущие модели уже содержат все изменения
+                _initial_schema(conn)
+                _stamp(conn, latest_version(), 'Создание схемы')
+                return [latest_version()]
+
+    for target in sorted(v for v in MIGRATIONS if v > version):
+        description, func = MIGRATIONS[target]
+        # Каждая миграция выполняется в своей транзакции
+        with engine.begin() as conn:
+            func(conn)
+            _stamp(conn, target, description)
+        applied.append(target)
+    return applied
@@ -0,0 +1,153 @@
+"""Генерация синтетических данных для нагрузочных тестов (flask seed).
+
+Пользователи, проекты, участники, колонки, задачи и логи вставляются
+пачками через Core без ORM-объектов, ID продолжают текущие максимумы,
+поэтому данные можно добавлять в непустую базу. Задачи распределяются
+по проектам по закону Ципфа с показателем skew: при skew=0 доски
+одинаковые, при skew около 1 и больше - несколько огромных досок и много
+маленьких. Результат воспроизводим при одинаковом random_seed.
+"""
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import func, select
+from database import db
+from models import User, Project, ProjectMember, Column, Task, TaskLog
+from services.ranking import evenly_spaced
+
+# Строк в одном INSERT
+CHUNK_SIZE = 10000
+
+# Пароль всех сгенерированных пользователей
+SEED_PASSWORD = 'password'
+
+COLUMN_NAMES = ('To Do', 'In Progress', 'Review', 'Testing', 'Done')
+
+
+def zipf_weights(count, skew):
+    """Веса 1 / rank ** skew для count элементов"""
+    return [1.0 / (rank ** skew) for rank in range(1, count + 1)]
+
+
+def _next_id(key):
+    return (db.session.scalar(select(func.max(key))) or 0) + 1
+
+
+class _Writer:
+    """Накопление строк и вставка пачками; родительские таблицы вставляются раньше"""
+
+    def __init__(self, model, *parents):
+        self.table = model.__table__
+        self.parents = parents
+        self.rows = []
+        self.count = 0
+
+    def add(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= CHUNK_SIZE:
+            self.flush()
+
+    def flush(self):
+        for parent in self.parents:
+            parent.flush()
+        if self.rows:
+            db.session.execute(self.table.insert(), self.rows)
+            self.count += len(self.rows)
+            self.rows = []
+
+
+def seed_data(users=100, projects=20, columns=5, members=5, tasks=10000, logs=3, skew=1.0,
+              random_seed=42, reindex=True):
+    """Генерация данных в текущей транзакции с фиксацией в конце; возвращает число строк по таблицам"""
+    from services.passwords import hash_password
+
+    rnd = random.Random(random_seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    first_user = _next_id(User.UserID)
+    first_project = _next_id(Project.ProjectID)
+    column_id = _next_id(Column.ColumnID)
+    task_id = _next_id(Task.TaskID)
+
+    # Хеш вычисляется один раз: скорость генерации не зависит от политики паролей
+    password_hash = hash_password(SEED_PASSWORD)
+    writers = {User: _Writer(User)}
+    writers[Project] = _Writer(Project, writers[User])
+    writers[ProjectMember] = _Writer(ProjectMember, writers[Project])
+    writers[Column] = _Writer(Column, writers[Project])
+    writers[Task] = _Writer(Task, writers[Column])
+    writers[TaskLog] = _Writer(TaskLog, writers[Task])
+    for user_id in range(first_user, first_user + users):
+        writers[User].add({'UserID': user_id, 'Username': f'seed{user_id}', 'Email': f'seed{user_id}@example.com',
+                           'PasswordHash': password_hash, 'CreatedAt': now - timedelta(days=365)})
+    writers[User].flush()
+
+    user_ids = range(first_user, first_user + users)
+    weights = zipf_weights(projects, skew)
+    # Число задач каждого проекта: выбор проекта для каждой задачи по весам
+    task_counts = [0] * projects
+    for index in rnd.choices(range(projects), weights, k=tasks):
+        task_counts[index] += 1
+    mean_weight = sum(weights) / projects
+
+    for index in range(projects):
+        project_id = first_project + index
+        owner_id = rnd.choice(user_ids)
+        created_at = now - timedelta(days=rnd.randint(30, 365))
+        writers[Project].add({'ProjectID': project_id, 'Name': f'Проект {project_id}',
+                              'Description': f'Синтетический проект {project_id}', 'OwnerID': owner_id,
+                              'CreatedAt': created_at})
+        # На больших досках больше участников
+        size = max(1, min(users - 1, round(members * weights[index] / mean_weight)))
+        team = [owner_id] + rnd.sample([u for u in user_ids if u != owner_id], size) if users > 1 else [owner_id]
+        for user_id in team:
+            writers[ProjectMember].add({'ProjectID': project_id, 'UserID': user_id,
+                                        'Role': 'owner' if user_id == owner_id else 'member'})
+
+        column_ids = list(range(column_id, column_id + columns))
+        column_id += columns
+        for order, (cid, position) in enumerate(zip(column_ids, evenly_spaced(columns))):
+            writers[Column].add({'ColumnID': cid, 'Name': COLUMN_NAMES[order % len(COLUMN_NAMES)],
+                                 'OrderIndex': order + 1, 'Position': position, 'ProjectID': project_id})
+
+        # Итоговые колонки задач выбираются заранее: ключи порядка - равномерно по колонке
+        finals = rnd.choices(column_ids, k=task_counts[index])
+        positions = {cid: iter(evenly_spaced(finals.count(cid))) for cid in column_ids}
+        for final in finals:
+            author = rnd.choice(team)
+            moments = [created_at + timedelta(minutes=rnd.randint(0, 60 * 24 * 30))]
+            actions = []
+            for _ in range(rnd.randint(0, 2 * logs)):
+                moments.append(moments[-1] + timedelta(minutes=rnd.randint(1, 60 * 24)))
+                actions.append('move' if columns > 1 and rnd.random() < 0.5 else 'update')
+            # Цепочка колонок перемещений, заканчивающаяся итоговой колонкой
+            path = [final]
+            for _ in range(actions.count('move')):
+                path.append(rnd.choice([cid for cid in column_ids if cid != path[-1]]))
+            path.reverse()
+            writers[Task].add({'TaskID': task_id, 'Title': f'Задача {task_id}',
+                               'Description': f'Описание задачи {task_id} проекта {project_id}',
+                               'ColumnID': final, 'Position': next(positions[final]), 'CreatedBy': author,
+                               'CreatedAt': moments[0], 'UpdatedAt': moments[-1]})
+            # Ключи строк одинаковые: вставка пачкой через executemany
+            writers[TaskLog].add({'TaskID': task_id, 'UserID': author, 'Action': 'create',
+                                  'Message': 'Задача создана', 'FromColumnID': None, 'ToColumnID': None,
+                                  'CreatedAt': moments[0]})
+            step = 0
+            for action, moment in zip(actions, moments[1:]):
+                log = {'TaskID': task_id, 'UserID': rnd.choice(team), 'Action': action, 'CreatedAt': moment,
+                       'Message': 'Изменены поля задачи: Description', 'FromColumnID': None, 'ToColumnID': None}
+                if action == 'move':
+                    log.update(FromColumnID=path[step], ToColumnID=path[step + 1],
+                               Message=f'Задача перемещена из колонки {path[step]} в {path[step + 1]}')
+                    step += 1
+                writers[TaskLog].add(log)
+            task_id += 1
+
+    for writer in writers.values():
+        writer.flush()
+    if reindex:
+        from services import metrics, search
+        conn = db.session.connection()
+        search.rebuild(conn)
+        metrics.rebuild(conn)
+    db.session.commit()
+    return {model.__tablename__: writer.count for model, writer in writers.items()}
@@ -0,0 +1,44 @@
+"""Настройки gunicorn для продакшена (значения берутся из окружения).
+
+WEB_CONCURRENCY    - число процессов-воркеров (по умолчанию 2 * CPU + 1)
+GUNICORN_THREADS   - потоков на воркер (gthread: SSE-потоки занимают поток)
+GUNICORN_BIND      - адрес (по умолчанию 0.0.0.0:5000)
+GUNICORN_TIMEOUT   - таймаут воркера, секунды
+
+Пул соединений каждого воркера настраивается через DB_POOL_SIZE и
+DB_MAX_OVERFLOW: суммарно воркеры открывают до
+WEB_CONCURRENCY * (DB_POOL_SIZE + DB_MAX_OVERFLOW) соединений.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+# Приложение создается в каждом воркере, чтобы пулы соединений не делились между процессами
+preload_app = False
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+
+
+def on_starting(server):
+    """Отказ от запуска, если отозванные токены не видны другим воркерам"""
+    backend = os.getenv('REVOCATION_STORE') or ''
+    if server.cfg.workers > 1 and backend.endswith('MemoryRevocationStore'):
+        raise RuntimeError('REVOCATION_STORE=MemoryRevocationStore работает только с одним воркером: '
+                           'выход и повторное использование refresh-токенов не будут видны остальным')
+
+
+def worker_exit(server, worker):
+    """Остановка фоновых потоков перед выходом воркера.
+
+    Очередь логов задач (AUDIT_LOG_MODE=async) дописывается, задание удаления
+    останавливается после текущей порции и остается pending (flask run-jobs).
+    """
+    from services.audit import writer
+    from services.jobs import runner
+    writer.stop(timeout=graceful_timeout)
+    runner.stop(timeout=graceful_timeout)
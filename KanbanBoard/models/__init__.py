@@ -0,0 +1,12 @@
+from models.user import User
+from models.project import Project
+from models.project_member import ProjectMember
+from models.column import Column
+from models.task import Task
+from models.task_log import TaskLog
+from models.column_flow import ColumnFlowDaily
+from models.job import Job
+from models.task_archive import ArchivedTask
+from models.task_log_archive import ArchivedTaskLog
+from models.project_log import ProjectLog
+from models.revoked_token import RevokedToken
@@ -2,10 +2,22 @@ from database import db
 
 class Column(db.Model):
     __tablename__ = 'columns'
+    __table_args__ = (
+        db.Index('ix_columns_project_order', 'ProjectID', 'OrderIndex'),
+        db.Index('ix_columns_project_position', 'ProjectID', 'Position'),
+    )
     
     ColumnID = db.Column(db.Integer, primary_key=True)
     Name = db.Column(db.String(50), nullable=False)
     OrderIndex = db.Column(db.Integer, nullable=False, default=0)
+    # Лексикографический ключ порядка внутри проекта (services/ranking.py)
+    Position = db.Column(db.String(64))
     ProjectID = db.Column(db.Integer, db.ForeignKey('projects.ProjectID'), nullable=False)
+    # Время запроса на удаление; строки удаляет фоновое задание (services/jobs.py)
+    DeletedAt = db.Column(db.DateTime)
+    # Версия строки: ORM добавляет ее в WHERE каждого UPDATE (оптимистичная блокировка)
+    Version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     
-    tasks = db.relationship('Task', backref='column', lazy=True)
\ No newline at end of file
+    __mapper_args__ = {'version_id_col': Version}
+    
+    tasks = db.relationship('Task', backref='column', lazy=True, order_by='[Task.Position, Task.TaskID]')
\ No newline at end of file
@@ -0,0 +1,18 @@
+from database import db
+
+class ColumnFlowDaily(db.Model):
+    """Дневная сводка движения задач по колонке (services/metrics.py)"""
+    __tablename__ = 'column_flow_daily'
+    __table_args__ = (
+        db.Index('ix_column_flow_daily_project_day', 'ProjectID', 'Day'),
+    )
+    
+    # Сводка - история, поэтому внешних ключей нет: строки переживают удаление колонок
+    ColumnID = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    Day = db.Column(db.Date, primary_key=True)
+    ProjectID = db.Column(db.Integer, nullable=False)
+    # Сколько задач вошло в колонку и вышло из нее за день
+    Entered = db.Column(db.Integer, nullable=False, default=0)
+    Exited = db.Column(db.Integer, nullable=False, default=0)
+    # Суммарное время пребывания в колонке задач, вышедших из нее за день, секунды
+    DwellSeconds = db.Column(db.Float, nullable=False, default=0)
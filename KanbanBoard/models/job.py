@@ -0,0 +1,33 @@
+from database import db
+from datetime import datetime
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        db.Index('ix_jobs_status', 'Status'),
+    )
+    
+    JobID = db.Column(db.Integer, primary_key=True)
+    # delete_project / delete_column (services/jobs.py)
+    Kind = db.Column(db.String(20), nullable=False)
+    ProjectID = db.Column(db.Integer, nullable=False)
+    ColumnID = db.Column(db.Integer)
+    # Перед удалением строки копируются в архивные таблицы
+    Archive = db.Column(db.Boolean, nullable=False, default=False)
+    # pending -> running -> done / failed
+    Status = db.Column(db.String(20), nullable=False, default='pending')
+    # Строк задач и логов к удалению и уже удалено
+    Total = db.Column(db.Integer, nullable=False, default=0)
+    Processed = db.Column(db.Integer, nullable=False, default=0)
+    Error = db.Column(db.Text)
+    CreatedBy = db.Column(db.Integer, nullable=False)
+    CreatedAt = db.Column(db.DateTime, default=datetime.utcnow)
+    StartedAt = db.Column(db.DateTime)
+    FinishedAt = db.Column(db.DateTime)
+    
+    @property
+    def Progress(self):
+        """Доля выполнения от 0 до 1"""
+        if self.Status == 'done':
+            return 1.0
+        return min(self.Processed / self.Total, 1.0) if self.Total else 0.0
@@ -3,12 +3,19 @@ from datetime import datetime
 
 class Project(db.Model):
     __tablename__ = 'projects'
+    __table_args__ = (
+        db.Index('ix_projects_owner_id', 'OwnerID'),
+    )
     
     ProjectID = db.Column(db.Integer, primary_key=True)
     Name = db.Column(db.String(100), nullable=False)
     Description = db.Column(db.Text)
     OwnerID = db.Column(db.Integer, db.ForeignKey('users.UserID'), nullable=False)
     CreatedAt = db.Column(db.DateTime, default=datetime.utcnow)
+    # Увеличивается при любом изменении колонок, задач и участников (ETag)
+    Revision = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Время запроса на удаление; строки удаляет фоновое задание (services/jobs.py)
+    DeletedAt = db.Column(db.DateTime)
     
     columns = db.relationship('Column', backref='project', lazy=True)
     members = db.relationship('ProjectMember', backref='project', lazy=True)
\ No newline at end of file
@@ -0,0 +1,21 @@
+from database import db
+from datetime import datetime
+
+class ProjectLog(db.Model):
+    """Журнал действий проекта, которые не укладываются в логи задач:
+    удаление задач и изменения колонок (services/audit.py)"""
+    __tablename__ = 'project_logs'
+    __table_args__ = (
+        db.Index('ix_project_logs_project_created', 'ProjectID', 'CreatedAt'),
+    )
+    
+    # Журнал - история, поэтому внешних ключей нет: записи переживают удаление задач и колонок
+    LogID = db.Column(db.Integer, primary_key=True)
+    ProjectID = db.Column(db.Integer, nullable=False)
+    UserID = db.Column(db.Integer, nullable=False)
+    # task.delete, column.create, column.update, column.move, column.delete
+    Action = db.Column(db.String(50), nullable=False)
+    Message = db.Column(db.Text, nullable=False)
+    TaskID = db.Column(db.Integer)
+    ColumnID = db.Column(db.Integer)
+    CreatedAt = db.Column(db.DateTime, default=datetime.utcnow)
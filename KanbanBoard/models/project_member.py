@@ -2,6 +2,13 @@ from database import db
 
 class ProjectMember(db.Model):
     __tablename__ = 'project_members'
+    __table_args__ = (
+        # Пользователь может быть участником проекта только один раз;
+        # индекс также обслуживает проверки доступа (ProjectID, UserID)
+        db.Index('uq_project_members_project_user', 'ProjectID', 'UserID', unique=True),
+        # Проекты пользователя (список проектов, роли в токене)
+        db.Index('ix_project_members_user_project', 'UserID', 'ProjectID'),
+    )
     
     MemberID = db.Column(db.Integer, primary_key=True)
     ProjectID = db.Column(db.Integer, db.ForeignKey('projects.ProjectID'), nullable=False)
@@ -0,0 +1,12 @@
+from database import db
+
+class RevokedToken(db.Model):
+    """Отозванные JWT (jti) и семейства refresh-токенов (fam:<id>) - services/tokens.py"""
+    __tablename__ = 'revoked_tokens'
+    __table_args__ = (
+        db.Index('ix_revoked_tokens_expires', 'ExpiresAt'),
+    )
+    
+    Key = db.Column(db.String(64), primary_key=True)
+    # Срок токена (UNIX-время): после него запись не нужна и удаляется
+    ExpiresAt = db.Column(db.Integer, nullable=False)
@@ -3,13 +3,24 @@ from datetime import datetime
 
 class Task(db.Model):
     __tablename__ = 'tasks'
+    __table_args__ = (
+        # Выборка задач колонки в порядке (CreatedAt, TaskID) для постраничного списка
+        db.Index('ix_tasks_column_created', 'ColumnID', 'CreatedAt', 'TaskID'),
+        db.Index('ix_tasks_column_position', 'ColumnID', 'Position'),
+    )
     
     TaskID = db.Column(db.Integer, primary_key=True)
     Title = db.Column(db.String(100), nullable=False)
     Description = db.Column(db.Text)
     ColumnID = db.Column(db.Integer, db.ForeignKey('columns.ColumnID'), nullable=False)
+    # Лексикографический ключ порядка внутри колонки (services/ranking.py)
+    Position = db.Column(db.String(64))
     CreatedBy = db.Column(db.Integer, db.ForeignKey('users.UserID'), nullable=False)
     CreatedAt = db.Column(db.DateTime, default=datetime.utcnow)
     UpdatedAt = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Версия строки: ORM добавляет ее в WHERE каждого UPDATE (оптимистичная блокировка)
+    Version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    
+    __mapper_args__ = {'version_id_col': Version}
     
     logs = db.relationship('TaskLog', backref='task', lazy=True)
\ No newline at end of file
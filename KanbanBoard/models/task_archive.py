@@ -0,0 +1,19 @@
+from database import db
+
+class ArchivedTask(db.Model):
+    """Задачи удаленных с архивацией проектов и колонок"""
+    __tablename__ = 'tasks_archive'
+    __table_args__ = (
+        db.Index('ix_tasks_archive_project', 'ProjectID'),
+    )
+    
+    TaskID = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    Title = db.Column(db.String(100), nullable=False)
+    Description = db.Column(db.Text)
+    ColumnID = db.Column(db.Integer, nullable=False)
+    ProjectID = db.Column(db.Integer, nullable=False)
+    Position = db.Column(db.String(64))
+    CreatedBy = db.Column(db.Integer, nullable=False)
+    CreatedAt = db.Column(db.DateTime)
+    UpdatedAt = db.Column(db.DateTime)
+    ArchivedAt = db.Column(db.DateTime, nullable=False)
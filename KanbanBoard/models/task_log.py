@@ -3,10 +3,18 @@ from datetime import datetime
 
 class TaskLog(db.Model):
     __tablename__ = 'task_logs'
+    __table_args__ = (
+        db.Index('ix_task_logs_task_created', 'TaskID', 'CreatedAt'),
+        # Поиск первых попаданий задач в колонку для метрик потока
+        db.Index('ix_task_logs_to_column', 'ToColumnID', 'CreatedAt'),
+    )
     
     LogID = db.Column(db.Integer, primary_key=True)
     TaskID = db.Column(db.Integer, db.ForeignKey('tasks.TaskID'), nullable=False)
     UserID = db.Column(db.Integer, db.ForeignKey('users.UserID'), nullable=False)
     Action = db.Column(db.String(50), nullable=False)
     Message = db.Column(db.Text, nullable=False)
+    # Колонки при перемещении (Action='move'); у остальных действий пустые
+    FromColumnID = db.Column(db.Integer)
+    ToColumnID = db.Column(db.Integer)
     CreatedAt = db.Column(db.DateTime, default=datetime.utcnow)
\ No newline at end of file
@@ -0,0 +1,18 @@
+from database import db
+
+class ArchivedTaskLog(db.Model):
+    """Логи задач из tasks_archive"""
+    __tablename__ = 'task_logs_archive'
+    __table_args__ = (
+        db.Index('ix_task_logs_archive_task', 'TaskID'),
+    )
+    
+    LogID = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    TaskID = db.Column(db.Integer, nullable=False)
+    UserID = db.Column(db.Integer, nullable=False)
+    Action = db.Column(db.String(50), nullable=False)
+    Message = db.Column(db.Text, nullable=False)
+    FromColumnID = db.Column(db.Integer)
+    ToColumnID = db.Column(db.Integer)
+    CreatedAt = db.Column(db.DateTime)
+    ArchivedAt = db.Column(db.DateTime, nullable=False)
@@ -1,4 +1,4 @@
-from werkzeug.security import generate_password_hash, check_password_hash
+from services.passwords import hash_password, verify_password, needs_rehash
 from database import db
 from datetime import datetime
 
@@ -10,11 +10,17 @@ class User(db.Model):
     Email = db.Column(db.String(100), unique=True, nullable=False)
     PasswordHash = db.Column(db.String(255), nullable=False)
     CreatedAt = db.Column(db.DateTime, default=datetime.utcnow)
+    # Увеличивается при изменении участия в проектах: роли в выданных токенах устаревают
+    MembershipVersion = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     projects = db.relationship('Project', backref='owner', lazy=True)
     
     def set_password(self, password):
-        self.PasswordHash = generate_password_hash(password)
+        self.PasswordHash = hash_password(password)
     
     def check_password(self, password):
-        return check_password_hash(self.PasswordHash, password)
\ No newline at end of file
+        return verify_password(self.PasswordHash, password)
+    
+    def password_needs_rehash(self):
+        """Хеш создан по устаревшей политике (PASSWORD_HASH_METHOD)"""
+        return needs_rehash(self.PasswordHash)
\ No newline at end of file
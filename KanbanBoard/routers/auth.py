@@ -1,7 +1,12 @@
+from flask import request
 from flask_restx import Namespace, Resource, fields
-from flask_jwt_extended import create_access_token
+from flask_jwt_extended import jwt_required, get_jwt
+from werkzeug.exceptions import TooManyRequests
+from database import db
 from database.crud import create_user, get_user_by_username
 from models.user import User
+from services.ratelimit import login_user_limiter, login_ip_limiter
+from services.tokens import issue_tokens, rotate, revoke
 
 auth_ns = Namespace('auth', description='Аутентификация')
 
@@ -34,8 +39,35 @@ class Login(Resource):
     def post(self):
         """Аутентификация пользователя"""
         data = auth_ns.payload
+        # Лимиты проверяются до хеширования, чтобы перебор не занимал пул проверки паролей
+        username_key = data['Username'].lower()
+        retry_after = login_ip_limiter.hit(request.remote_addr) or login_user_limiter.hit(username_key)
+        if retry_after:
+            raise TooManyRequests('Слишком много попыток входа', retry_after=retry_after)
         user = get_user_by_username(data['Username'])
         if not user or not user.check_password(data['Password']):
             return {'message': 'Invalid credentials'}, 401
-        access_token = create_access_token(identity=user.UserID)
-        return {'access_token': access_token}, 200
\ No newline at end of file
+        login_user_limiter.reset(username_key)
+        if user.password_needs_rehash():
+            # Политика хеширования изменилась: пароль известен только сейчас
+            user.set_password(data['Password'])
+            db.session.commit()
+        return issue_tokens(user.UserID), 200
+
+@auth_ns.route('/refresh')
+class Refresh(Resource):
+    @auth_ns.doc(security='Bearer Auth', description='В заголовке Authorization передается refresh-токен')
+    @jwt_required(refresh=True)
+    def post(self):
+        """Новая пара токенов по refresh-токену (старый refresh-токен отзывается)"""
+        return rotate(get_jwt()), 200
+
+@auth_ns.route('/logout')
+class Logout(Resource):
+    @auth_ns.doc(security='Bearer Auth')
+    @jwt_required(verify_type=False)
+    def post(self):
+        """Отзыв токена; для refresh-токена отзываются и все полученные по нему"""
+        claims = get_jwt()
+        revoke(claims, family=claims.get('type') == 'refresh')
+        return {'message': 'Токен отозван'}, 200
\ No newline at end of file
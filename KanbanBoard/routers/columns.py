@@ -1,9 +1,17 @@
-from flask_restx import Namespace, Resource, fields
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from datetime import datetime
+from flask_restx import Namespace, Resource, fields, inputs, marshal
+from flask_jwt_extended import jwt_required
 from database import db
 from models.column import Column
-from models.project import Project
-from models.project_member import ProjectMember
+from services.access import authorize_project, authorize_owner, invalidate_column
+from services.positions import position_for, column_position_for_order_index
+from services import audit
+from services.events import publish
+from services.versioning import bump_revision, check_version, conditional, version_guard
+from services.tokens import current_user_id
+from services.jobs import KIND_COLUMN, create_job, runner
+from services.serialization import marshal_list_with, model_columns
+from routers.jobs import job_model
 
 columns_ns = Namespace('columns', description='Операции с колонками')
 
@@ -11,40 +19,65 @@ column_model = columns_ns.model('Column', {
     'ColumnID': fields.Integer(readonly=True),
     'Name': fields.String(required=True),
     'OrderIndex': fields.Integer(required=True),
-    'ProjectID': fields.Integer(required=True)
+    'Position': fields.String(readonly=True, description='Ключ порядка в проекте'),
+    'ProjectID': fields.Integer(required=True),
+    'Version': fields.Integer(description='Версия колонки; при изменении сверяется с текущей (или If-Match)')
 })
 
+# Перемещение колонки на место между соседями
+column_move_model = columns_ns.model('ColumnMove', {
+    'after_id': fields.Integer(description='Колонка, после которой встанет колонка'),
+    'before_id': fields.Integer(description='Колонка, перед которой встанет колонка'),
+    'Version': fields.Integer(description='Ожидаемая версия колонки')
+})
+
+delete_parser = columns_ns.parser()
+delete_parser.add_argument('archive', type=inputs.boolean, default=False, location='args',
+                           help='Скопировать задачи и логи колонки в архив перед удалением')
+
+def get_column_or_404(column_id):
+    """Колонка по ID; удаленная (скрытая до окончания задания) - 404"""
+    return Column.query.filter_by(ColumnID=column_id, DeletedAt=None).first_or_404()
+
 @columns_ns.route('/project/<int:project_id>')
 class ColumnList(Resource):
-    @columns_ns.marshal_list_with(column_model)
+    @marshal_list_with(columns_ns, column_model)
     @jwt_required()
     def get(self, project_id):
         """Получение всех колонок проекта"""
-        user_id = get_jwt_identity()
+        user_id = current_user_id()
         # Проверка что пользователь имеет доступ к проекту
-        if not ProjectMember.query.filter_by(ProjectID=project_id, UserID=user_id).first():
-            return {'message': 'Доступ запрещен'}, 403
-        return Column.query.filter_by(ProjectID=project_id).order_by(Column.OrderIndex).all()
+        authorize_project(user_id, project_id)
+        # Неизменившийся проект - 304 без выполнения выборки
+        headers = conditional(project_id)
+        return (db.session.query(*model_columns(column_model, Column))
+                .filter(Column.ProjectID == project_id, Column.DeletedAt.is_(None))
+                .order_by(Column.Position, Column.OrderIndex).all()), 200, headers
 
     @columns_ns.expect(column_model)
     @columns_ns.marshal_with(column_model, code=201)
     @jwt_required()
     def post(self, project_id):
         """Создание новой колонки"""
-        user_id = get_jwt_identity()
+        user_id = current_user_id()
         # Проверка что пользователь владелец проекта
-        project = Project.query.filter_by(ProjectID=project_id, OwnerID=user_id).first()
-        if not project:
-            return {'message': 'Только владелец может создавать колонки'}, 403
+        authorize_owner(user_id, project_id, 'Только владелец может создавать колонки')
             
         data = columns_ns.payload
         column = Column(
             Name=data['Name'],
             OrderIndex=data['OrderIndex'],
+            # OrderIndex по-прежнему задает начальное место колонки
+            Position=column_position_for_order_index(project_id, data['OrderIndex']),
             ProjectID=project_id
         )
         db.session.add(column)
+        db.session.flush()
+        audit.record_project(audit.project_log_values(project_id, user_id, 'column.create',
+                                                      f'Колонка создана: {column.Name}', column_id=column.ColumnID))
+        bump_revision(project_id)
         db.session.commit()
+        publish(project_id, 'column.created', {'column': marshal(column, column_model)})
         return column, 201
 
 @columns_ns.route('/<int:column_id>')
@@ -53,39 +86,95 @@ class ColumnResource(Resource):
     @jwt_required()
     def get(self, column_id):
         """Получение колонки по ID"""
-        column = Column.query.get_or_404(column_id)
-        user_id = get_jwt_identity()
+        column = get_column_or_404(column_id)
+        user_id = current_user_id()
         # Проверка доступа
-        if not ProjectMember.query.filter_by(ProjectID=column.ProjectID, UserID=user_id).first():
-            return {'message': 'Доступ запрещен'}, 403
+        authorize_project(user_id, column.ProjectID)
         return column
 
     @columns_ns.expect(column_model)
+    @columns_ns.response(409, 'Колонка изменена другим пользователем')
+    @columns_ns.response(412, 'Версия колонки не совпадает с If-Match')
     @columns_ns.marshal_with(column_model)
     @jwt_required()
     def put(self, column_id):
         """Обновление колонки"""
-        column = Column.query.get_or_404(column_id)
-        user_id = get_jwt_identity()
+        column = get_column_or_404(column_id)
+        user_id = current_user_id()
         # Проверка что пользователь владелец
-        if not Project.query.filter_by(ProjectID=column.ProjectID, OwnerID=user_id).first():
-            return {'message': 'Только владелец может изменять колонки'}, 403
+        authorize_owner(user_id, column.ProjectID, 'Только владелец может изменять колонки')
             
         data = columns_ns.payload
-        column.Name = data.get('Name', column.Name)
-        column.OrderIndex = data.get('OrderIndex', column.OrderIndex)
-        db.session.commit()
+        check_version(column, column_model, data)
+        old_name, old_order = column.Name, column.OrderIndex
+        with version_guard(Column, column_id, column_model):
+            column.Name = data.get('Name', column.Name)
+            if 'OrderIndex' in data and data['OrderIndex'] != column.OrderIndex:
+                column.OrderIndex = data['OrderIndex']
+                column.Position = column_position_for_order_index(
+                    column.ProjectID, column.OrderIndex, exclude_id=column.ColumnID
+                )
+            if old_name != column.Name or old_order != column.OrderIndex:
+                audit.record_project(audit.project_log_values(
+                    column.ProjectID, user_id, 'column.update',
+                    f'Колонка изменена: {old_name} -> {column.Name}, порядок {old_order} -> {column.OrderIndex}',
+                    column_id=column_id
+                ))
+            bump_revision(column.ProjectID)
+            db.session.commit()
+        publish(column.ProjectID, 'column.updated', {'column': marshal(column, column_model)})
         return column
 
+    @columns_ns.expect(delete_parser)
+    @columns_ns.response(202, 'Удаление запущено', job_model)
+    @columns_ns.response(409, 'Колонка изменена другим пользователем')
+    @columns_ns.response(412, 'Версия колонки не совпадает с If-Match')
     @jwt_required()
     def delete(self, column_id):
-        """Удаление колонки"""
-        column = Column.query.get_or_404(column_id)
-        user_id = get_jwt_identity()
+        """Удаление колонки с задачами (фоновое задание, ход - GET /jobs/<id>)"""
+        column = get_column_or_404(column_id)
+        user_id = current_user_id()
         # Проверка что пользователь владелец
-        if not Project.query.filter_by(ProjectID=column.ProjectID, OwnerID=user_id).first():
-            return {'message': 'Только владелец может удалять колонки'}, 403
+        authorize_owner(user_id, column.ProjectID, 'Только владелец может удалять колонки')
+        args = delete_parser.parse_args()
+        check_version(column, column_model)
             
-        db.session.delete(column)
-        db.session.commit()
-        return {'message': 'Колонка удалена'}, 200
\ No newline at end of file
+        # Колонка сразу скрывается, задачи и логи удаляет задание
+        project_id = column.ProjectID
+        with version_guard(Column, column_id, column_model):
+            column.DeletedAt = datetime.utcnow()
+            job = create_job(KIND_COLUMN, project_id, user_id, column_id=column_id, archive=args['archive'])
+            audit.record_project(audit.project_log_values(project_id, user_id, 'column.delete',
+                                                          f'Колонка удалена: {column.Name}', column_id=column_id))
+            bump_revision(project_id)
+            db.session.commit()
+        invalidate_column(column_id)
+        publish(project_id, 'column.deleted', {'column': {'ColumnID': column_id}})
+        runner.submit(job.JobID)
+        return marshal(job, job_model), 202, {'Location': f'/jobs/{job.JobID}'}
+
+@columns_ns.route('/<int:column_id>/move')
+class ColumnMove(Resource):
+    @columns_ns.expect(column_move_model)
+    @columns_ns.response(409, 'Колонка изменена другим пользователем')
+    @columns_ns.response(412, 'Версия колонки не совпадает с If-Match')
+    @columns_ns.marshal_with(column_model)
+    @jwt_required()
+    def put(self, column_id):
+        """Перемещение колонки на позицию в проекте (изменяется одна строка)"""
+        column = get_column_or_404(column_id)
+        user_id = current_user_id()
+        # Проверка что пользователь владелец
+        authorize_owner(user_id, column.ProjectID, 'Только владелец может изменять колонки')
+
+        data = columns_ns.payload or {}
+        check_version(column, column_model, data)
+        with version_guard(Column, column_id, column_model):
+            column.Position = position_for(Column, column.ProjectID, before_id=data.get('before_id'),
+                                           after_id=data.get('after_id'), exclude_id=column.ColumnID)
+            audit.record_project(audit.project_log_values(column.ProjectID, user_id, 'column.move',
+                                                          f'Колонка перемещена: {column.Name}', column_id=column_id))
+            bump_revision(column.ProjectID)
+            db.session.commit()
+        publish(column.ProjectID, 'column.moved', {'column': marshal(column, column_model)})
+        return column
\ No newline at end of file
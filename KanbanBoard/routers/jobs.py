@@ -0,0 +1,34 @@
+from flask_restx import Namespace, Resource, fields, abort
+from flask_jwt_extended import jwt_required
+from database import db
+from models.job import Job
+from services.tokens import current_user_id
+
+jobs_ns = Namespace('jobs', description='Фоновые задания удаления и архивации')
+
+job_model = jobs_ns.model('Job', {
+    'JobID': fields.Integer(readonly=True),
+    'Kind': fields.String(description='delete_project / delete_column'),
+    'ProjectID': fields.Integer(),
+    'ColumnID': fields.Integer(),
+    'Archive': fields.Boolean(description='Задачи и логи копируются в архив'),
+    'Status': fields.String(description='pending / running / done / failed'),
+    'Total': fields.Integer(description='Строк задач и логов к удалению'),
+    'Processed': fields.Integer(description='Удалено строк'),
+    'Progress': fields.Float(description='Доля выполнения от 0 до 1'),
+    'Error': fields.String(),
+    'CreatedAt': fields.DateTime(),
+    'StartedAt': fields.DateTime(),
+    'FinishedAt': fields.DateTime()
+})
+
+@jobs_ns.route('/<int:job_id>')
+class JobResource(Resource):
+    @jobs_ns.marshal_with(job_model)
+    @jwt_required()
+    def get(self, job_id):
+        """Ход выполнения задания (доступно создавшему его пользователю)"""
+        job = db.session.get(Job, job_id)
+        if job is None or job.CreatedBy != current_user_id():
+            abort(404)
+        return job
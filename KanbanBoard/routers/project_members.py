@@ -1,9 +1,13 @@
-from flask_restx import Namespace, Resource, fields
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_restx import Namespace, Resource, fields, abort
+from flask_jwt_extended import jwt_required
 from database import db
 from models.project import Project
 from models.project_member import ProjectMember
 from models.user import User
+from services.access import authorize_project, invalidate_membership
+from services.tokens import current_user_id, bump_membership_version
+from services.versioning import bump_revision, conditional
+from services.serialization import marshal_list_with, model_columns
 
 members_ns = Namespace('project_members', description='Управление участниками проектов')
 
@@ -16,31 +20,39 @@ member_model = members_ns.model('ProjectMember', {
 
 @members_ns.route('/project/<int:project_id>')
 class ProjectMemberList(Resource):
-    @members_ns.marshal_list_with(member_model)
+    @marshal_list_with(members_ns, member_model)
     @jwt_required()
     def get(self, project_id):
         """Получение списка участников проекта"""
-        user_id = get_jwt_identity()
+        user_id = current_user_id()
         # Проверка что пользователь участник проекта
-        if not ProjectMember.query.filter_by(ProjectID=project_id, UserID=user_id).first():
-            return {'message': 'Доступ запрещен'}, 403
+        authorize_project(user_id, project_id)
+        # Неизменившийся проект - 304 без выполнения выборки
+        headers = conditional(project_id)
             
-        return ProjectMember.query.filter_by(ProjectID=project_id).all()
+        return (db.session.query(*model_columns(member_model, ProjectMember))
+                .filter(ProjectMember.ProjectID == project_id).all()), 200, headers
 
     @members_ns.expect(member_model)
     @members_ns.marshal_with(member_model, code=201)
     @jwt_required()
     def post(self, project_id):
         """Добавление участника в проект"""
-        current_user_id = get_jwt_identity()
-        project = Project.query.get_or_404(project_id)
+        user_id = current_user_id()
+        # В удаленный проект участников не добавить
+        project = Project.query.filter_by(ProjectID=project_id, DeletedAt=None).first_or_404()
         
         # Проверка что текущий пользователь владелец проекта
-        if project.OwnerID != current_user_id:
+        if project.OwnerID != user_id:
             return {'message': 'Только владелец может добавлять участников'}, 403
             
         data = members_ns.payload
-        user = User.query.get_or_404(data['UserID'])
+        # Пользователь должен существовать
+        User.query.get_or_404(data['UserID'])
+        # Роль owner только у владельца проекта (его строка создается вместе с проектом)
+        if data.get('Role') == 'owner':
+            # abort, а не кортеж: ответ post проходит через marshal_with
+            abort(400, 'Роль owner назначить нельзя')
         
         # Проверка что пользователь еще не участник
         if ProjectMember.query.filter_by(ProjectID=project_id, UserID=data['UserID']).first():
@@ -52,7 +64,11 @@ class ProjectMemberList(Resource):
             Role=data.get('Role', 'member')
         )
         db.session.add(member)
+        bump_revision(project_id)
+        # Токены пользователя с прежним составом проектов проверяются по базе
+        bump_membership_version(member.UserID)
         db.session.commit()
+        invalidate_membership(member.UserID, project_id)
         return member, 201
 
 @members_ns.route('/<int:member_id>')
@@ -61,13 +77,19 @@ class ProjectMemberResource(Resource):
     def delete(self, member_id):
         """Удаление участника из проекта"""
         member = ProjectMember.query.get_or_404(member_id)
-        current_user_id = get_jwt_identity()
-        project = Project.query.get(member.ProjectID)
+        user_id = current_user_id()
+        project = Project.query.filter_by(ProjectID=member.ProjectID, DeletedAt=None).first_or_404()
         
         # Проверка что текущий пользователь владелец проекта
-        if project.OwnerID != current_user_id:
+        if project.OwnerID != user_id:
             return {'message': 'Только владелец может удалять участников'}, 403
+        # Доступ проверяется только по участию: без своей строки владелец потерял бы проект
+        if member.UserID == project.OwnerID:
+            return {'message': 'Владельца нельзя удалить из проекта'}, 400
             
         db.session.delete(member)
+        bump_revision(member.ProjectID)
+        bump_membership_version(member.UserID)
         db.session.commit()
+        invalidate_membership(member.UserID, member.ProjectID)
         return {'message': 'Участник удален из проекта'}, 200
\ No newline at end of file
@@ -1,6 +1,30 @@
-from flask_restx import Namespace, Resource, fields
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from database.crud import create_project, get_projects_for_user
+import io
+import time
+from datetime import datetime
+from flask import Response, request, stream_with_context
+from flask_restx import Namespace, Resource, fields, inputs, abort, marshal
+from flask_jwt_extended import jwt_required
+from sqlalchemy import delete, func
+from sqlalchemy.orm import selectinload
+from database import db
+from database.crud import create_project, get_projects_for_user, get_project_counts
+from models.column import Column
+from models.project import Project
+from models.project_member import ProjectMember
+from models.task_log import TaskLog
+from services.access import (authorize_project, authorize_owner, get_column_project,
+                             invalidate_membership, invalidate_project, is_member)
+from services import audit
+from services.events import hub, format_sse, replay_events, publish
+from services.search import search
+from services.metrics import flow_metrics, default_period
+from services.pagination import paginate, DEFAULT_LIMIT, MAX_LIMIT
+from services.versioning import bump_revision, conditional, project_revision
+from services.tokens import current_user_id, bump_membership_version
+from services.jobs import KIND_PROJECT, create_job, runner
+from services.transfer import TransferError, export_csv, export_ndjson, import_project
+from services.serialization import marshal_list_with
+from routers.jobs import job_model
 
 projects_ns = Namespace('projects', description='Операции с проектами')
 
@@ -12,21 +36,342 @@ project_model = projects_ns.model('Project', {
     'CreatedAt': fields.DateTime(readonly=True)
 })
 
+# Элемент списка проектов: роль пользователя и размеры проекта
+project_summary_model = projects_ns.clone('ProjectSummary', project_model, {
+    'Role': fields.String(description='Роль пользователя: owner или роль участника'),
+    'ColumnCount': fields.Integer(),
+    'TaskCount': fields.Integer()
+})
+
+project_list_parser = projects_ns.parser()
+project_list_parser.add_argument('limit', type=inputs.int_range(1, MAX_LIMIT), default=DEFAULT_LIMIT,
+                                 location='args', help='Размер страницы')
+project_list_parser.add_argument('cursor', type=str, location='args',
+                                 help='Токен следующей страницы из заголовка X-Next-Cursor')
+
+# Модели для снимка доски: колонки с вложенными задачами
+board_task_model = projects_ns.model('BoardTask', {
+    'TaskID': fields.Integer(readonly=True),
+    'Title': fields.String(),
+    'Description': fields.String(),
+    'ColumnID': fields.Integer(),
+    'Position': fields.String(),
+    'CreatedBy': fields.Integer(),
+    'CreatedAt': fields.DateTime(),
+    'UpdatedAt': fields.DateTime(),
+    'Version': fields.Integer(description='Версия задачи для If-Match или поля Version при изменении')
+})
+
+board_column_model = projects_ns.model('BoardColumn', {
+    'ColumnID': fields.Integer(readonly=True),
+    'Name': fields.String(),
+    'OrderIndex': fields.Integer(),
+    'Position': fields.String(),
+    'ProjectID': fields.Integer(),
+    'Version': fields.Integer(description='Версия колонки для If-Match или поля Version'),
+    'tasks': fields.List(fields.Nested(board_task_model))
+})
+
+board_model = projects_ns.model('Board', {
+    'ProjectID': fields.Integer(),
+    'columns': fields.List(fields.Nested(board_column_model))
+})
+
+search_result_model = projects_ns.model('SearchResult', {
+    'kind': fields.String(description='task - совпадение в задаче, log - в логе задачи'),
+    'TaskID': fields.Integer(),
+    'LogID': fields.Integer(description='ID записи лога для kind=log'),
+    'ColumnID': fields.Integer(),
+    'Title': fields.String(description='Заголовок задачи'),
+    'Snippet': fields.String(description='Фрагмент текста, совпадения выделены [ ]'),
+    'Score': fields.Float(description='Релевантность, больше - лучше')
+})
+
+search_parser = projects_ns.parser()
+search_parser.add_argument('q', type=str, required=True, location='args', help='Поисковый запрос')
+search_parser.add_argument('limit', type=inputs.int_range(1, 100), default=20, location='args')
+search_parser.add_argument('offset', type=inputs.natural, default=0, location='args')
+
+# Метрики потока задач
+flow_column_model = projects_ns.model('FlowColumn', {
+    'ColumnID': fields.Integer(),
+    'Name': fields.String(),
+    'counts': fields.List(fields.Integer, description='Задач в колонке на конец каждого дня')
+})
+
+cumulative_flow_model = projects_ns.model('CumulativeFlow', {
+    'days': fields.List(fields.Date),
+    'columns': fields.List(fields.Nested(flow_column_model))
+})
+
+dwell_model = projects_ns.model('ColumnDwell', {
+    'ColumnID': fields.Integer(),
+    'Name': fields.String(),
+    'exited': fields.Integer(description='Задач вышло из колонки за период'),
+    'avg_hours': fields.Float(description='Среднее время в колонке, часы')
+})
+
+percentiles_model = projects_ns.model('TimePercentiles', {
+    'count': fields.Integer(description='Завершенных задач за период'),
+    'p50': fields.Float(description='Часы'),
+    'p85': fields.Float(description='Часы'),
+    'p95': fields.Float(description='Часы')
+})
+
+metrics_model = projects_ns.model('FlowMetrics', {
+    'ProjectID': fields.Integer(),
+    'date_from': fields.Date(),
+    'date_to': fields.Date(),
+    'DoneColumnID': fields.Integer(description='Колонка завершенных задач'),
+    'cumulative_flow': fields.Nested(cumulative_flow_model),
+    'dwell': fields.List(fields.Nested(dwell_model)),
+    'lead_time': fields.Nested(percentiles_model, description='От создания до колонки завершения'),
+    'cycle_time': fields.Nested(percentiles_model, description='От первого перемещения до колонки завершения')
+})
+
+metrics_parser = projects_ns.parser()
+metrics_parser.add_argument('date_from', type=inputs.date_from_iso8601, location='args',
+                            help='Начало периода (по умолчанию 30 дней назад)')
+metrics_parser.add_argument('date_to', type=inputs.date_from_iso8601, location='args',
+                            help='Конец периода включительно (по умолчанию сегодня, UTC)')
+metrics_parser.add_argument('done_column_id', type=int, location='args',
+                            help='Колонка завершенных задач (по умолчанию последняя)')
+
+delete_parser = projects_ns.parser()
+delete_parser.add_argument('archive', type=inputs.boolean, default=False, location='args',
+                           help='Скопировать задачи и логи проекта в архив перед удалением')
+
+# Выгрузка и загрузка проекта
+TRANSFER_FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+export_parser = projects_ns.parser()
+export_parser.add_argument('format', choices=tuple(TRANSFER_FORMATS), default='ndjson', location='args',
+                           help='ndjson - все данные проекта, csv - только задачи')
+
+import_parser = export_parser.copy()
+import_parser.add_argument('name', type=str, location='args', help='Название нового проекта')
+
+import_result_model = projects_ns.model('ProjectImportResult', {
+    'ProjectID': fields.Integer(description='ID созданного проекта'),
+    'columns': fields.Integer(),
+    'members': fields.Integer(),
+    'tasks': fields.Integer(),
+    'logs': fields.Integer()
+})
+
+# Максимальная длина периода метрик, дни
+MAX_METRICS_DAYS = 731
+
+# Интервал комментариев-пингов в потоке событий, секунды
+EVENTS_HEARTBEAT = 15
+
 @projects_ns.route('/')
 class ProjectList(Resource):
-    @projects_ns.marshal_list_with(project_model)
+    @projects_ns.expect(project_list_parser)
+    @projects_ns.header('X-Next-Cursor', 'Токен следующей страницы (нет на последней странице)')
+    @marshal_list_with(projects_ns, project_summary_model)
     @jwt_required()
     def get(self):
-        """Получение списка проектов пользователя"""
-        user_id = get_jwt_identity()
-        return get_projects_for_user(user_id)
+        """Получение списка проектов пользователя (участник или владелец)"""
+        user_id = current_user_id()
+        args = project_list_parser.parse_args()
+        rows, next_cursor = paginate(get_projects_for_user(user_id), (Project.ProjectID,), args['limit'],
+                                     cursor=args['cursor'], types=(int,))
+        # Количества колонок и задач для всей страницы - одним запросом
+        counts = get_project_counts([row.ProjectID for row in rows])
+        projects = []
+        for row in rows:
+            column_count, task_count = counts.get(row.ProjectID, (0, 0))
+            projects.append({**row._asdict(), 'Role': 'owner' if row.OwnerID == user_id else row.Role,
+                             'ColumnCount': column_count, 'TaskCount': task_count})
+        headers = {'X-Next-Cursor': next_cursor} if next_cursor else {}
+        return projects, 200, headers
 
     @projects_ns.expect(project_model)
     @projects_ns.marshal_with(project_model, code=201)
     @jwt_required()
     def post(self):
         """Создание нового проекта"""
-        user_id = get_jwt_identity()
+        user_id = current_user_id()
         data = projects_ns.payload
         project = create_project(data['Name'], data.get('Description'), user_id)
-        return project, 201
\ No newline at end of file
+        invalidate_membership(user_id, project.ProjectID)
+        return project, 201
+
+@projects_ns.route('/<int:project_id>')
+class ProjectResource(Resource):
+    @projects_ns.expect(delete_parser)
+    @projects_ns.response(202, 'Удаление запущено', job_model)
+    @jwt_required()
+    def delete(self, project_id):
+        """Удаление проекта со всеми данными (фоновое задание, ход - GET /jobs/<id>)"""
+        project = Project.query.get_or_404(project_id)
+        if project.DeletedAt is not None:
+            abort(404)
+        user_id = current_user_id()
+        authorize_owner(user_id, project_id, 'Только владелец может удалять проект')
+        args = delete_parser.parse_args()
+
+        # Проект сразу скрывается, а участники теряют доступ (роли в их
+        # токенах устаревают); колонки, задачи и логи удаляет задание
+        project.DeletedAt = datetime.utcnow()
+        member_ids = [row[0] for row in db.session.query(ProjectMember.UserID).filter_by(ProjectID=project_id)]
+        db.session.execute(delete(ProjectMember).where(ProjectMember.ProjectID == project_id))
+        bump_membership_version(*member_ids)
+        job = create_job(KIND_PROJECT, project_id, user_id, archive=args['archive'])
+        bump_revision(project_id)
+        db.session.commit()
+        invalidate_project(project_id)
+        for member_id in member_ids:
+            invalidate_membership(member_id, project_id)
+        publish(project_id, 'project.deleted', {'project': {'ProjectID': project_id}})
+        runner.submit(job.JobID)
+        return marshal(job, job_model), 202, {'Location': f'/jobs/{job.JobID}'}
+
+@projects_ns.route('/<int:project_id>/export')
+class ProjectExport(Resource):
+    @projects_ns.expect(export_parser)
+    @jwt_required()
+    def get(self, project_id):
+        """Выгрузка проекта потоком (строки читаются из базы порциями)"""
+        user_id = current_user_id()
+        authorize_project(user_id, project_id)
+        fmt = export_parser.parse_args()['format']
+        body = export_csv(project_id) if fmt == 'csv' else export_ndjson(project_id)
+        return Response(stream_with_context(body), mimetype=TRANSFER_FORMATS[fmt],
+                        headers={'Content-Disposition': f'attachment; filename=project-{project_id}.{fmt}'})
+
+@projects_ns.route('/import')
+class ProjectImport(Resource):
+    @projects_ns.expect(import_parser)
+    @projects_ns.response(201, 'Проект создан', import_result_model)
+    @jwt_required()
+    def post(self):
+        """Создание проекта из выгрузки; тело запроса - NDJSON или CSV"""
+        user_id = current_user_id()
+        args = import_parser.parse_args()
+        # Тело читается построчно, без загрузки в память целиком
+        if args['format'] == 'csv':
+            source = io.TextIOWrapper(request.stream, encoding='utf-8-sig', newline='')
+        else:
+            source = request.stream
+        try:
+            result = import_project(user_id, source, args['format'], args['name'])
+        except TransferError as exc:
+            abort(400, str(exc))
+        return marshal(result, import_result_model), 201
+
+@projects_ns.route('/<int:project_id>/board')
+class ProjectBoard(Resource):
+    @projects_ns.marshal_with(board_model)
+    @jwt_required()
+    def get(self, project_id):
+        """Получение всей доски проекта (колонки с задачами)"""
+        user_id = current_user_id()
+        # Одна проверка доступа на всю доску
+        authorize_project(user_id, project_id)
+        headers = conditional(project_id)
+
+        # Колонки и все их задачи загружаются фиксированным числом запросов
+        columns = (Column.query
+                   .filter_by(ProjectID=project_id, DeletedAt=None)
+                   .options(selectinload(Column.tasks))
+                   .order_by(Column.Position, Column.OrderIndex)
+                   .all())
+        return {'ProjectID': project_id, 'columns': columns}, 200, headers
+
+@projects_ns.route('/<int:project_id>/search')
+class ProjectSearch(Resource):
+    @projects_ns.expect(search_parser)
+    @projects_ns.marshal_list_with(search_result_model)
+    @jwt_required()
+    def get(self, project_id):
+        """Полнотекстовый поиск по задачам и логам проекта"""
+        user_id = current_user_id()
+        authorize_project(user_id, project_id)
+        args = search_parser.parse_args()
+        revision = project_revision(project_id)
+        if audit.writer.mode == audit.MODE_ASYNC:
+            # Логи пишутся и индексируются после ответа на запрос записи и не
+            # меняют ревизию проекта: в ETag входит последний записанный LogID
+            revision = f'{revision}.{db.session.query(func.max(TaskLog.LogID)).scalar() or 0}'
+        headers = conditional(project_id, revision)
+        return search(project_id, args['q'], args['limit'], args['offset']), 200, headers
+
+@projects_ns.route('/<int:project_id>/metrics')
+class ProjectMetrics(Resource):
+    @projects_ns.expect(metrics_parser)
+    @projects_ns.marshal_with(metrics_model)
+    @jwt_required()
+    def get(self, project_id):
+        """Метрики потока: накопительная диаграмма, время в колонках, lead/cycle time"""
+        user_id = current_user_id()
+        authorize_project(user_id, project_id)
+        args = metrics_parser.parse_args()
+        date_from, date_to = default_period(args['date_from'], args['date_to'])
+        if date_from > date_to:
+            abort(400, 'date_from должна быть не позже date_to')
+        if (date_to - date_from).days >= MAX_METRICS_DAYS:
+            abort(400, f'Период не длиннее {MAX_METRICS_DAYS} дней')
+        done_column_id = args['done_column_id']
+        if done_column_id is not None and get_column_project(done_column_id) != project_id:
+            abort(422, 'Колонка завершения не принадлежит проекту')
+        return flow_metrics(project_id, date_from, date_to, done_column_id)
+
+@projects_ns.route('/<int:project_id>/events')
+class ProjectEvents(Resource):
+    @projects_ns.produces(['text/event-stream'])
+    @projects_ns.param('last_event_id', 'Альтернатива заголовку Last-Event-ID', _in='query')
+    @jwt_required(locations=['headers', 'query_string'])
+    def get(self, project_id):
+        """Поток изменений доски (Server-Sent Events)
+
+        EventSource не умеет передавать заголовки, поэтому токен
+        можно указать в параметре jwt. При переподключении события,
+        записанные в лог задач после Last-Event-ID, отправляются повторно.
+        Доступ перепроверяется не реже раза в EVENTS_HEARTBEAT секунд:
+        удаленному из проекта участнику приходит access.revoked, и поток
+        закрывается.
+        """
+        user_id = current_user_id()
+        authorize_project(user_id, project_id)
+
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        try:
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            abort(400, 'Некорректный Last-Event-ID')
+
+        # Подписка оформляется до чтения лога, чтобы не потерять события между ними
+        subscriber = hub.subscribe(project_id)
+
+        def generate():
+            try:
+                replayed_id = last_event_id
+                if last_event_id is not None:
+                    for event in replay_events(project_id, last_event_id):
+                        replayed_id = event['id']
+                        yield format_sse(event)
+                # Соединение с БД не удерживается на время ожидания событий
+                db.session.close()
+                checked = time.monotonic()
+                while not subscriber.closed:
+                    event = subscriber.get(EVENTS_HEARTBEAT)
+                    if time.monotonic() - checked >= EVENTS_HEARTBEAT:
+                        allowed = is_member(user_id, project_id)
+                        db.session.close()
+                        if not allowed:
+                            yield format_sse({'type': 'access.revoked', 'data': {'ProjectID': project_id}})
+                            return
+                        checked = time.monotonic()
+                    if event is None:
+                        yield ': keepalive\n\n'
+                        continue
+                    if event.get('id') is not None and replayed_id is not None and event['id'] <= replayed_id:
+                        continue
+                    yield format_sse(event)
+            finally:
+                hub.unsubscribe(subscriber)
+
+        return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
\ No newline at end of file
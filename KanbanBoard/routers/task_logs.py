@@ -1,9 +1,17 @@
-from flask_restx import Namespace, Resource, fields
-from flask_jwt_extended import jwt_required, get_jwt_identity
+import json
+from datetime import datetime
+from flask import Response, stream_with_context
+from flask_restx import Namespace, Resource, fields, abort, inputs
+from flask_jwt_extended import jwt_required
+from database import db
 from models.task_log import TaskLog
+from models.project_log import ProjectLog
 from models.task import Task
 from models.column import Column
-from models.project_member import ProjectMember
+from services.access import authorize_project, get_task_project
+from services.pagination import paginate, DEFAULT_LIMIT, MAX_LIMIT
+from services.tokens import current_user_id
+from services.serialization import marshal_list_with, model_columns
 
 task_logs_ns = Namespace('task_logs', description='Логи задач')
 
@@ -13,20 +21,134 @@ log_model = task_logs_ns.model('TaskLog', {
     'UserID': fields.Integer(required=True),
     'Action': fields.String(required=True),
     'Message': fields.String(required=True),
+    'FromColumnID': fields.Integer(readonly=True, description='Колонка до перемещения (Action=move)'),
+    'ToColumnID': fields.Integer(readonly=True, description='Колонка после перемещения (Action=move)'),
     'CreatedAt': fields.DateTime(readonly=True)
 })
 
+project_log_model = task_logs_ns.model('ProjectLog', {
+    'LogID': fields.Integer(readonly=True),
+    'ProjectID': fields.Integer(readonly=True),
+    'UserID': fields.Integer(readonly=True),
+    'Action': fields.String(readonly=True, description='task.delete, column.create, column.update, '
+                                                       'column.move, column.delete'),
+    'Message': fields.String(readonly=True),
+    'TaskID': fields.Integer(readonly=True, description='Удаленная задача (Action=task.delete)'),
+    'ColumnID': fields.Integer(readonly=True),
+    'CreatedAt': fields.DateTime(readonly=True)
+})
+
+# Размер пачки строк, читаемых курсором при выгрузке
+EXPORT_BATCH_SIZE = 1000
+
+# Фильтры по времени и действию, общие для списка и выгрузки
+log_filter_parser = task_logs_ns.parser()
+log_filter_parser.add_argument('since', type=inputs.datetime_from_iso8601, location='args',
+                               help='Логи не раньше указанного момента')
+log_filter_parser.add_argument('until', type=inputs.datetime_from_iso8601, location='args',
+                               help='Логи раньше указанного момента')
+log_filter_parser.add_argument('action', type=str, location='args', action='append',
+                               help='Тип действия (можно указать несколько)')
+
+log_list_parser = log_filter_parser.copy()
+log_list_parser.add_argument('limit', type=inputs.int_range(1, MAX_LIMIT), default=DEFAULT_LIMIT,
+                             location='args', help='Размер страницы')
+log_list_parser.add_argument('before', type=str, location='args',
+                             help='Более старые логи (от новых к старым), токен из X-Next-Cursor')
+log_list_parser.add_argument('after', type=str, location='args',
+                             help='Более новые логи (от старых к новым), токен из X-Next-Cursor')
+
+
+def filter_logs(query, args, model=TaskLog):
+    """Применение фильтров since/until/action к запросу логов (TaskLog или ProjectLog)"""
+    if args['since']:
+        query = query.filter(model.CreatedAt >= args['since'])
+    if args['until']:
+        query = query.filter(model.CreatedAt < args['until'])
+    if args['action']:
+        query = query.filter(model.Action.in_(args['action']))
+    return query
+
 @task_logs_ns.route('/task/<int:task_id>')
 class TaskLogList(Resource):
-    @task_logs_ns.marshal_list_with(log_model)
+    @task_logs_ns.expect(log_list_parser)
+    @task_logs_ns.header('X-Next-Cursor', 'Токен следующей страницы в том же направлении')
+    @marshal_list_with(task_logs_ns, log_model)
     @jwt_required()
     def get(self, task_id):
         """Получение логов задачи"""
-        task = Task.query.get_or_404(task_id)
-        user_id = get_jwt_identity()
-        column = Column.query.get(task.ColumnID)
+        user_id = current_user_id()
+        project_id = get_task_project(task_id)
+        if project_id is None:
+            abort(404)
         # Проверка доступа
-        if not ProjectMember.query.filter_by(ProjectID=column.ProjectID, UserID=user_id).first():
-            return {'message': 'Доступ запрещен'}, 403
-            
-        return TaskLog.query.filter_by(TaskID=task_id).order_by(TaskLog.CreatedAt.desc()).all()
\ No newline at end of file
+        authorize_project(user_id, project_id)
+
+        args = log_list_parser.parse_args()
+        if args['before'] and args['after']:
+            abort(400, 'Нельзя указывать before и after одновременно')
+        query = filter_logs(db.session.query(*model_columns(log_model, TaskLog)).filter(TaskLog.TaskID == task_id),
+                            args)
+
+        # По умолчанию и с before - от новых к старым, с after - от старых к новым
+        logs, next_cursor = paginate(
+            query, (TaskLog.CreatedAt, TaskLog.LogID), args['limit'],
+            cursor=args['after'] or args['before'], types=(datetime, int),
+            descending=not args['after']
+        )
+        headers = {'X-Next-Cursor': next_cursor} if next_cursor else {}
+        return logs, 200, headers
+
+@task_logs_ns.route('/project/<int:project_id>')
+class ProjectLogList(Resource):
+    @task_logs_ns.expect(log_list_parser)
+    @task_logs_ns.header('X-Next-Cursor', 'Токен следующей страницы в том же направлении')
+    @marshal_list_with(task_logs_ns, project_log_model)
+    @jwt_required()
+    def get(self, project_id):
+        """Журнал проекта: удаление задач и изменения колонок"""
+        user_id = current_user_id()
+        authorize_project(user_id, project_id)
+
+        args = log_list_parser.parse_args()
+        if args['before'] and args['after']:
+            abort(400, 'Нельзя указывать before и after одновременно')
+        query = filter_logs(db.session.query(*model_columns(project_log_model, ProjectLog))
+                            .filter(ProjectLog.ProjectID == project_id), args, ProjectLog)
+        logs, next_cursor = paginate(
+            query, (ProjectLog.CreatedAt, ProjectLog.LogID), args['limit'],
+            cursor=args['after'] or args['before'], types=(datetime, int),
+            descending=not args['after']
+        )
+        headers = {'X-Next-Cursor': next_cursor} if next_cursor else {}
+        return logs, 200, headers
+
+@task_logs_ns.route('/project/<int:project_id>/export')
+class TaskLogExport(Resource):
+    @task_logs_ns.expect(log_filter_parser)
+    @task_logs_ns.produces(['application/x-ndjson'])
+    @jwt_required()
+    def get(self, project_id):
+        """Потоковая выгрузка логов проекта в формате NDJSON"""
+        user_id = current_user_id()
+        authorize_project(user_id, project_id)
+
+        args = log_filter_parser.parse_args()
+        query = filter_logs(
+            db.session.query(TaskLog.LogID, TaskLog.TaskID, TaskLog.UserID, TaskLog.Action,
+                             TaskLog.Message, TaskLog.FromColumnID, TaskLog.ToColumnID, TaskLog.CreatedAt)
+            .join(Task, Task.TaskID == TaskLog.TaskID)
+            .join(Column, Column.ColumnID == Task.ColumnID)
+            .filter(Column.ProjectID == project_id),
+            args
+        ).order_by(TaskLog.LogID)
+
+        def generate():
+            # Строки читаются серверным курсором пачками, память не растет с объемом логов
+            for row in query.yield_per(EXPORT_BATCH_SIZE):
+                item = row._asdict()
+                if item['CreatedAt'] is not None:
+                    item['CreatedAt'] = item['CreatedAt'].isoformat()
+                yield json.dumps(item, ensure_ascii=False) + '\n'
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
\ No newline at end of file
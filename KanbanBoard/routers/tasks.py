@@ -1,10 +1,20 @@
-from flask_restx import Namespace, Resource, fields
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_restx import Namespace, Resource, fields, inputs, abort, marshal
+from flask_jwt_extended import jwt_required
+from sqlalchemy import insert, update, delete
 from database import db
 from models.task import Task
 from models.column import Column
-from models.project_member import ProjectMember
 from models.task_log import TaskLog
+from services.access import authorize_column, authorize_task, authorize_project
+from services.pagination import paginate, DEFAULT_LIMIT, MAX_LIMIT
+from services.positions import position_for, positions_at_end
+from services.ranking import rank_between
+from services.events import publish, log_data
+from services import audit, search
+from services.metrics import FlowRecorder
+from services.versioning import bump_revision, check_version, conditional, task_revision, version_guard
+from services.tokens import current_user_id
+from services.serialization import marshal_list_with, model_columns
 from datetime import datetime
 
 tasks_ns = Namespace('tasks', description='Операции с задачами')
@@ -14,9 +24,11 @@ task_model = tasks_ns.model('Task', {
     'Title': fields.String(required=True, example='Новая задача', description='Заголовок задачи'),
     'Description': fields.String(example='Описание задачи', description='Подробное описание'),
     'ColumnID': fields.Integer(required=True, example=1, description='ID колонки'),
+    'Position': fields.String(readonly=True, description='Ключ порядка в колонке'),
     'CreatedBy': fields.Integer(readonly=True, description='ID создателя'),
     'CreatedAt': fields.DateTime(readonly=True, description='Дата создания'),
-    'UpdatedAt': fields.DateTime(readonly=True, description='Дата обновления')
+    'UpdatedAt': fields.DateTime(readonly=True, description='Дата обновления'),
+    'Version': fields.Integer(description='Версия задачи; при изменении сверяется с текущей (или If-Match)')
 })
 
 # Добавим модель для создания задачи без обязательных полей, которые заполняются автоматически
@@ -26,20 +38,123 @@ task_create_model = tasks_ns.model('TaskCreate', {
     'ColumnID': fields.Integer(required=True, example=1)
 })
 
+# Параметры постраничного списка задач колонки с фильтрацией
+task_list_parser = tasks_ns.parser()
+task_list_parser.add_argument('limit', type=inputs.int_range(1, MAX_LIMIT), default=DEFAULT_LIMIT,
+                              location='args', help='Размер страницы')
+task_list_parser.add_argument('cursor', type=str, location='args',
+                              help='Токен следующей страницы из заголовка X-Next-Cursor')
+task_list_parser.add_argument('created_by', type=int, location='args', help='ID создателя')
+task_list_parser.add_argument('created_from', type=inputs.datetime_from_iso8601, location='args')
+task_list_parser.add_argument('created_to', type=inputs.datetime_from_iso8601, location='args')
+task_list_parser.add_argument('updated_from', type=inputs.datetime_from_iso8601, location='args')
+task_list_parser.add_argument('updated_to', type=inputs.datetime_from_iso8601, location='args')
+task_list_parser.add_argument('title', type=str, location='args', help='Подстрока заголовка')
+
+# Перемещение задачи на место между соседями
+task_move_model = tasks_ns.model('TaskMove', {
+    'ColumnID': fields.Integer(description='Целевая колонка (по умолчанию текущая)'),
+    'after_id': fields.Integer(description='Задача, после которой встанет карточка'),
+    'before_id': fields.Integer(description='Задача, перед которой встанет карточка'),
+    'Version': fields.Integer(description='Ожидаемая версия задачи')
+})
+
+# Пакетные операции над задачами
+BATCH_OPERATIONS = ('create', 'move', 'update', 'delete')
+MAX_BATCH_SIZE = 1000
+# Типы полей операции пакета; тело разбирается вручную, а не через validate модели
+BATCH_FIELD_TYPES = {'op': str, 'TaskID': int, 'ColumnID': int, 'Title': str, 'Description': str, 'Version': int}
+
+batch_operation_model = tasks_ns.model('TaskBatchOperation', {
+    'op': fields.String(required=True, enum=list(BATCH_OPERATIONS), description='Тип операции'),
+    'TaskID': fields.Integer(description='ID задачи (move, update, delete)'),
+    'ColumnID': fields.Integer(description='Колонка для create и move (для update - необязательно)'),
+    'Title': fields.String(description='Заголовок (create, update)'),
+    'Description': fields.String(description='Описание (create, update)'),
+    'Version': fields.Integer(description='Ожидаемая версия задачи (move, update, delete)')
+})
+
+batch_model = tasks_ns.model('TaskBatch', {
+    'operations': fields.List(fields.Nested(batch_operation_model), required=True)
+})
+
+batch_result_model = tasks_ns.model('TaskBatchResult', {
+    'created': fields.List(fields.Integer, description='ID созданных задач в порядке операций'),
+    'moved': fields.Integer(),
+    'updated': fields.Integer(),
+    'deleted': fields.Integer()
+})
+
+
+def log_values(task_id, user_id, action, message, **extra):
+    """Поля записи лога задачи для services/audit.py"""
+    return {'TaskID': task_id, 'UserID': user_id, 'Action': action, 'Message': message, **extra}
+
+def create_log_values(task_id, user_id):
+    return log_values(task_id, user_id, 'create', 'Задача создана')
+
+def update_log_values(task_id, user_id, changed):
+    """Поля записи лога об изменении заголовка или описания"""
+    return log_values(task_id, user_id, 'update', 'Изменены поля задачи: ' + ', '.join(changed))
+
+def move_log_values(task_id, user_id, old_column_id, new_column_id):
+    """Поля записи лога о перемещении задачи между колонками"""
+    return log_values(task_id, user_id, 'move',
+                      f'Задача перемещена из колонки {old_column_id} в {new_column_id}',
+                      FromColumnID=old_column_id, ToColumnID=new_column_id)
+
+def delete_log_values(project_id, user_id, task_id, column_id, title):
+    """Запись журнала проекта об удалении задачи: логи задачи удаляются вместе с ней"""
+    return audit.project_log_values(project_id, user_id, 'task.delete', f'Задача {task_id} удалена: {title}',
+                                    task_id=task_id, column_id=column_id)
+
+def publish_task_event(project_id, event_type, task, log=None):
+    """Событие о задаче для ленты изменений доски; ID события - ID записи лога.
+
+    При фоновой записи логов (AUDIT_LOG_MODE=async) ID еще неизвестен,
+    и событие уходит без него.
+    """
+    data = {'task': marshal(task, task_model)}
+    if log is not None:
+        data['log'] = log_data(log)
+    publish(project_id, event_type, data, event_id=log.get('LogID') if log is not None else None)
+
 @tasks_ns.route('/column/<int:column_id>')
 class TaskList(Resource):
     @tasks_ns.doc(security='Bearer Auth')
-    @tasks_ns.marshal_list_with(task_model)
+    @tasks_ns.expect(task_list_parser)
+    @tasks_ns.header('X-Next-Cursor', 'Токен следующей страницы (нет на последней странице)')
+    @marshal_list_with(tasks_ns, task_model)
     @jwt_required()
     def get(self, column_id):
         """Получение задач колонки"""
         # Проверка доступа
-        column = Column.query.get_or_404(column_id)
-        user_id = get_jwt_identity()
-        if not ProjectMember.query.filter_by(ProjectID=column.ProjectID, UserID=user_id).first():
-            return {'message': 'Доступ запрещен'}, 403
-            
-        return Task.query.filter_by(ColumnID=column_id).all()
+        user_id = current_user_id()
+        project_id = authorize_column(user_id, column_id)
+        # Неизменившийся проект - 304 без выполнения выборки
+        headers = conditional(project_id)
+
+        # Фильтры выполняются в SQL, страница выбирается по ключу (CreatedAt, TaskID)
+        args = task_list_parser.parse_args()
+        query = db.session.query(*model_columns(task_model, Task)).filter(Task.ColumnID == column_id)
+        if args['created_by'] is not None:
+            query = query.filter(Task.CreatedBy == args['created_by'])
+        if args['created_from']:
+            query = query.filter(Task.CreatedAt >= args['created_from'])
+        if args['created_to']:
+            query = query.filter(Task.CreatedAt < args['created_to'])
+        if args['updated_from']:
+            query = query.filter(Task.UpdatedAt >= args['updated_from'])
+        if args['updated_to']:
+            query = query.filter(Task.UpdatedAt < args['updated_to'])
+        if args['title']:
+            query = query.filter(Task.Title.icontains(args['title'], autoescape=True))
+
+        tasks, next_cursor = paginate(query, (Task.CreatedAt, Task.TaskID), args['limit'],
+                                      cursor=args['cursor'], types=(datetime, int))
+        if next_cursor:
+            headers['X-Next-Cursor'] = next_cursor
+        return tasks, 200, headers
 
     @tasks_ns.doc(security='Bearer Auth')
     @tasks_ns.expect(task_create_model)
@@ -53,22 +168,29 @@ class TaskList(Resource):
         if not data.get('Title'):
             return {'message': 'Title обязательно'}, 422
             
-        column = Column.query.get_or_404(column_id)
-        user_id = get_jwt_identity()
+        user_id = current_user_id()
         
         # Проверка доступа
-        if not ProjectMember.query.filter_by(ProjectID=column.ProjectID, UserID=user_id).first():
-            return {'message': 'Доступ запрещен'}, 403
+        project_id = authorize_column(user_id, column_id)
             
         task = Task(
             Title=data['Title'],
             Description=data.get('Description', ''),
             ColumnID=column_id,
+            Position=position_for(Task, column_id),
             CreatedBy=user_id
         )
         
         db.session.add(task)
+        db.session.flush()
+        search.index_tasks([task.TaskID])
+        flow = FlowRecorder(task.CreatedAt)
+        flow.created(task.TaskID, column_id)
+        flow.apply()
+        log, = audit.record(create_log_values(task.TaskID, user_id))
+        bump_revision(project_id)
         db.session.commit()
+        publish_task_event(project_id, 'task.created', task, log)
         
         return task, 201
     
@@ -78,58 +200,293 @@ class TaskResource(Resource):
     @jwt_required()
     def get(self, task_id):
         """Получение задачи по ID"""
-        task = Task.query.get_or_404(task_id)
-        user_id = get_jwt_identity()
-        column = Column.query.get(task.ColumnID)
+        user_id = current_user_id()
+        project_id, revision = task_revision(task_id)
         # Проверка доступа
-        if not ProjectMember.query.filter_by(ProjectID=column.ProjectID, UserID=user_id).first():
-            return {'message': 'Доступ запрещен'}, 403
-        return task
+        authorize_project(user_id, project_id)
+        headers = conditional(project_id, revision)
+        task = Task.query.get_or_404(task_id)
+        return task, 200, headers
 
     @tasks_ns.expect(task_model)
+    @tasks_ns.response(409, 'Задача изменена другим пользователем')
+    @tasks_ns.response(412, 'Версия задачи не совпадает с If-Match')
     @tasks_ns.marshal_with(task_model)
     @jwt_required()
     def put(self, task_id):
         """Обновление задачи"""
         task = Task.query.get_or_404(task_id)
-        user_id = get_jwt_identity()
-        column = Column.query.get(task.ColumnID)
+        user_id = current_user_id()
         # Проверка доступа
-        if not ProjectMember.query.filter_by(ProjectID=column.ProjectID, UserID=user_id).first():
-            return {'message': 'Доступ запрещен'}, 403
+        project_id = old_project_id = authorize_task(user_id, task)
             
         data = tasks_ns.payload
-        old_column_id = task.ColumnID
+        # Задачу изменили после чтения клиентом - 412/409 с актуальным состоянием
+        check_version(task, task_model, data)
+        with version_guard(Task, task_id, task_model):
+            old_column_id = task.ColumnID
+            moved_from_project = None
         
-        task.Title = data.get('Title', task.Title)
-        task.Description = data.get('Description', task.Description)
+            changed = [field for field in ('Title', 'Description')
+                       if field in data and data[field] != getattr(task, field)]
+            task.Title = data.get('Title', task.Title)
+            task.Description = data.get('Description', task.Description)
         
-        # Логирование изменения колонки
-        if 'ColumnID' in data and data['ColumnID'] != old_column_id:
-            new_column = Column.query.get_or_404(data['ColumnID'])
-            task.ColumnID = data['ColumnID']
+            # Логирование изменения колонки
+            logs = []
+            if changed:
+                logs.append(update_log_values(task.TaskID, user_id, changed))
+            log = None
+            if 'ColumnID' in data and data['ColumnID'] != old_column_id:
+                # Перемещать можно только в колонку проекта, доступного пользователю
+                project_id = authorize_column(user_id, data['ColumnID'])
+                if project_id != old_project_id:
+                    moved_from_project = old_project_id
+                task.ColumnID = data['ColumnID']
+                task.Position = position_for(Task, task.ColumnID, exclude_id=task.TaskID)
+                flow = FlowRecorder(datetime.utcnow())
+                flow.moved(task.TaskID, old_column_id, task.ColumnID)
+                flow.apply()
             
-            log = TaskLog(
-                TaskID=task.TaskID,
-                UserID=user_id,
-                Action='move',
-                Message=f'Задача перемещена из колонки {old_column_id} в {task.ColumnID}'
-            )
-            db.session.add(log)
+                log = move_log_values(task.TaskID, user_id, old_column_id, task.ColumnID)
+                logs.append(log)
         
-        db.session.commit()
+            db.session.flush()
+            search.index_tasks([task.TaskID])
+            audit.record(*logs)
+            bump_revision(project_id, old_project_id)
+            db.session.commit()
+        publish_task_event(project_id, 'task.moved' if log else 'task.updated', task, logs[-1] if logs else None)
+        if moved_from_project is not None:
+            publish(moved_from_project, 'task.deleted', {'task': {'TaskID': task.TaskID, 'ColumnID': old_column_id}})
         return task
 
+    @tasks_ns.response(409, 'Задача изменена другим пользователем')
+    @tasks_ns.response(412, 'Версия задачи не совпадает с If-Match')
     @jwt_required()
     def delete(self, task_id):
         """Удаление задачи"""
         task = Task.query.get_or_404(task_id)
-        user_id = get_jwt_identity()
-        column = Column.query.get(task.ColumnID)
+        user_id = current_user_id()
         # Проверка доступа
-        if not ProjectMember.query.filter_by(ProjectID=column.ProjectID, UserID=user_id).first():
-            return {'message': 'Доступ запрещен'}, 403
+        project_id = authorize_task(user_id, task)
+        check_version(task, task_model)
             
-        db.session.delete(task)
+        task_data = {'TaskID': task.TaskID, 'ColumnID': task.ColumnID}
+        # Все изменения - внутри guard: без autoflush DELETE с проверкой версии
+        # выполняется при фиксации и конфликт дает 409, а не 500
+        with version_guard(Task, task_id, task_model):
+            search.remove_tasks([task.TaskID])
+            flow = FlowRecorder(datetime.utcnow())
+            flow.removed(task.TaskID, task.ColumnID)
+            flow.apply()
+            # Логи удаляются вместе с задачей (TaskLog.TaskID не может ссылаться на удаленную задачу)
+            TaskLog.query.filter_by(TaskID=task.TaskID).delete(synchronize_session=False)
+            audit.record_project(delete_log_values(project_id, user_id, task.TaskID, task.ColumnID, task.Title))
+            db.session.delete(task)
+            bump_revision(project_id)
+            db.session.commit()
+        publish(project_id, 'task.deleted', {'task': task_data})
+        return {'message': 'Задача удалена'}, 200
+
+@tasks_ns.route('/<int:task_id>/move')
+class TaskMove(Resource):
+    @tasks_ns.expect(task_move_model)
+    @tasks_ns.response(409, 'Задача изменена другим пользователем')
+    @tasks_ns.response(412, 'Версия задачи не совпадает с If-Match')
+    @tasks_ns.marshal_with(task_model)
+    @jwt_required()
+    def put(self, task_id):
+        """Перемещение задачи на позицию в колонке (изменяется одна строка)"""
+        task = Task.query.get_or_404(task_id)
+        user_id = current_user_id()
+        # Проверка доступа
+        project_id = old_project_id = authorize_task(user_id, task)
+
+        data = tasks_ns.payload or {}
+        check_version(task, task_model, data)
+        old_column_id = task.ColumnID
+        column_id = data.get('ColumnID') or old_column_id
+        if column_id != old_column_id:
+            project_id = authorize_column(user_id, column_id)
+
+        with version_guard(Task, task_id, task_model):
+            task.Position = position_for(Task, column_id, before_id=data.get('before_id'),
+                                         after_id=data.get('after_id'), exclude_id=task.TaskID)
+            log = None
+            if column_id != old_column_id:
+                flow = FlowRecorder(datetime.utcnow())
+                flow.moved(task.TaskID, old_column_id, column_id)
+                flow.apply()
+                task.ColumnID = column_id
+                log, = audit.record(move_log_values(task.TaskID, user_id, old_column_id, column_id))
+            bump_revision(project_id, old_project_id)
+            db.session.commit()
+        publish_task_event(project_id, 'task.moved', task, log)
+        if project_id != old_project_id:
+            publish(old_project_id, 'task.deleted', {'task': {'TaskID': task.TaskID, 'ColumnID': old_column_id}})
+        return task
+
+@tasks_ns.route('/batch')
+class TaskBatch(Resource):
+    @tasks_ns.expect(batch_model)
+    @tasks_ns.marshal_with(batch_result_model)
+    @jwt_required()
+    def post(self):
+        """Пакетное создание, перемещение, изменение и удаление задач в одной транзакции"""
+        user_id = current_user_id()
+        payload = tasks_ns.payload or {}
+        if not isinstance(payload, dict) or not isinstance(payload.get('operations') or [], list):
+            abort(400, 'Ожидается объект с массивом operations')
+        operations = payload.get('operations') or []
+        if len(operations) > MAX_BATCH_SIZE:
+            abort(422, f'Не больше {MAX_BATCH_SIZE} операций за запрос')
+
+        # Проверка формата операций
+        for i, op in enumerate(operations):
+            if not isinstance(op, dict):
+                abort(400, f'Операция {i}: ожидается объект')
+            for field, field_type in BATCH_FIELD_TYPES.items():
+                value = op.get(field)
+                # bool - подкласс int, но как ID или версия не подходит
+                if value is not None and (not isinstance(value, field_type) or isinstance(value, bool)):
+                    abort(400, f'Операция {i}: поле {field} должно быть {field_type.__name__}')
+            kind = op.get('op')
+            if kind not in BATCH_OPERATIONS:
+                abort(422, f'Операция {i}: неизвестный тип {kind!r}')
+            if kind != 'create' and not op.get('TaskID'):
+                abort(422, f'Операция {i}: TaskID обязательно')
+            if kind in ('create', 'move') and not op.get('ColumnID'):
+                abort(422, f'Операция {i}: ColumnID обязательно')
+            if kind == 'create' and not op.get('Title'):
+                abort(422, f'Операция {i}: Title обязательно')
+
+        # Текущие колонки и версии всех затронутых задач - одним запросом
+        task_ids = {op['TaskID'] for op in operations if op['op'] != 'create'}
+        rows = db.session.query(Task.TaskID, Task.ColumnID, Task.Version).filter(Task.TaskID.in_(task_ids)).all() \
+            if task_ids else []
+        current = {task_id: column_id for task_id, column_id, _ in rows}
+        versions = {task_id: version for task_id, _, version in rows}
+        missing = task_ids - current.keys()
+        if missing:
+            abort(404, f'Задачи не найдены: {sorted(missing)}')
+        # Ожидаемые версии сверяются до изменений; все конфликты пакета - в одном ответе
+        conflicts = sorted({op['TaskID'] for op in operations
+                            if op['op'] != 'create' and op.get('Version') is not None
+                            and op['Version'] != versions[op['TaskID']]})
+        if conflicts:
+            abort(409, f'Задачи изменены другим пользователем: {conflicts}',
+                  current=[{'TaskID': task_id, 'Version': versions[task_id]} for task_id in conflicts])
+
+        # Проекты всех затронутых колонок - одним запросом, доступ проверяется один раз на проект
+        column_ids = set(current.values()) | {op['ColumnID'] for op in operations if op.get('ColumnID')}
+        column_projects = dict(
+            db.session.query(Column.ColumnID, Column.ProjectID)
+            .filter(Column.ColumnID.in_(column_ids), Column.DeletedAt.is_(None)).all()
+        ) if column_ids else {}
+        missing = column_ids - column_projects.keys()
+        if missing:
+            abort(404, f'Колонки не найдены: {sorted(missing)}')
+        for project_id in set(column_projects.values()):
+            authorize_project(user_id, project_id)
+
+        # Новые и перемещенные задачи встают в конец колонок;
+        # последние ключи всех целевых колонок читаются одним запросом
+        last_positions = positions_at_end(Task, {op['ColumnID'] for op in operations if op.get('ColumnID')})
+
+        def next_position(column_id):
+            last_positions[column_id] = rank_between(last_positions[column_id], None)
+            return last_positions[column_id]
+
+        # Операции сворачиваются в итоговое состояние каждой задачи,
+        # после чего применяются пакетными INSERT/UPDATE/DELETE
+        now = datetime.utcnow()
+        creates, changes, deleted, logs = [], {}, set(), []
+        # Колонка каждой удаляемой задачи - для записи в журнал проекта
+        deleted_from = {}
+        # Сводка потока: время входа затронутых задач в колонки читается одним запросом
+        flow = FlowRecorder(now)
+        flow.load(task_ids)
+        moved = updated = 0
+        for i, op in enumerate(operations):
+            kind = op['op']
+            if kind == 'create':
+                creates.append({
+                    'Title': op['Title'],
+                    'Description': op.get('Description', ''),
+                    'ColumnID': op['ColumnID'],
+                    'Position': next_position(op['ColumnID']),
+                    'CreatedBy': user_id,
+                    'CreatedAt': now,
+                    'UpdatedAt': now
+                })
+                continue
+
+            task_id = op['TaskID']
+            if task_id in deleted:
+                abort(422, f'Операция {i}: задача {task_id} уже удалена в этом пакете')
+            if kind == 'delete':
+                flow.removed(task_id, current[task_id])
+                deleted.add(task_id)
+                deleted_from[task_id] = current[task_id]
+                changes.pop(task_id, None)
+                continue
+
+            # UPDATE проверяет прочитанную версию: изменение после чтения - 409
+            change = changes.setdefault(task_id, {'TaskID': task_id, 'Version': versions[task_id]})
+            if kind == 'update':
+                fields_changed = [field for field in ('Title', 'Description') if field in op]
+                for field in fields_changed:
+                    change[field] = op[field]
+                if fields_changed:
+                    logs.append(update_log_values(task_id, user_id, fields_changed))
+                updated += 1
+            new_column_id = op.get('ColumnID')
+            if new_column_id and new_column_id != current[task_id]:
+                logs.append(move_log_values(task_id, user_id, current[task_id], new_column_id))
+                flow.moved(task_id, current[task_id], new_column_id)
+                current[task_id] = new_column_id
+                change['ColumnID'] = new_column_id
+                change['Position'] = next_position(new_column_id)
+                moved += 1
+            change['UpdatedAt'] = now
+
+        created_ids = []
+        if creates:
+            created_ids = list(db.session.scalars(
+                insert(Task).returning(Task.TaskID, sort_by_parameter_order=True), creates
+            ))
+        for task_id, values in zip(created_ids, creates):
+            flow.created(task_id, values['ColumnID'])
+            logs.append(create_log_values(task_id, user_id))
+        if changes:
+            with version_guard():
+                db.session.execute(update(Task), list(changes.values()))
+        # Логи удаляемых задач не пишутся; время всех записей пакета одно
+        for log in logs:
+            log['CreatedAt'] = now
+        audit.record(*(log for log in logs if log['TaskID'] not in deleted))
+        # Поисковый индекс обновляется в той же транзакции
+        search.index_tasks(created_ids + [task_id for task_id, change in changes.items()
+                                          if 'Title' in change or 'Description' in change])
+        if deleted:
+            # Версии удаляемых задач проверяются тем же UPDATE с версией, что и
+            # изменения: задача, измененная после чтения, не удаляется (409)
+            with version_guard():
+                db.session.execute(update(Task), [{'TaskID': task_id, 'Version': versions[task_id], 'UpdatedAt': now}
+                                                  for task_id in deleted])
+            titles = dict(db.session.query(Task.TaskID, Task.Title).filter(Task.TaskID.in_(deleted)).all())
+            audit.record_project(*(delete_log_values(column_projects[column_id], user_id, task_id, column_id,
+                                                     titles[task_id])
+                                   for task_id, column_id in deleted_from.items()))
+            search.remove_tasks(deleted)
+            db.session.execute(delete(TaskLog).where(TaskLog.TaskID.in_(deleted)))
+            db.session.execute(delete(Task).where(Task.TaskID.in_(deleted)))
+        flow.apply()
+        bump_revision(*column_projects.values())
         db.session.commit()
-        return {'message': 'Задача удалена'}, 200
\ No newline at end of file
+
+        result = {'created': created_ids, 'moved': moved, 'updated': updated, 'deleted': len(deleted)}
+        for project_id in set(column_projects.values()):
+            publish(project_id, 'tasks.batch', result)
+        return result
@@ -0,0 +1,216 @@
+import threading
+import time
+from collections import OrderedDict
+from flask import g
+from flask_jwt_extended import get_jwt
+from flask_restx import abort
+from database import db
+from models.column import Column
+from models.project import Project
+from models.project_member import ProjectMember
+from models.task import Task
+from models.user import User
+
+# Маркер "значения нет в кэше" (None - допустимое значение: пользователь не участник)
+_MISSING = object()
+
+
+class TTLCache:
+    """Ограниченный LRU-кэш с временем жизни записей"""
+
+    def __init__(self, maxsize=10000, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                return _MISSING
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def configure(self, maxsize=None, ttl=None):
+        if maxsize is not None:
+            self.maxsize = maxsize
+        if ttl is not None:
+            self.ttl = ttl
+        self.clear()
+
+
+# Кэши между запросами:
+#   (user_id, project_id) -> роль участника или None
+#   column_id -> project_id (колонка не переносится между проектами)
+#   project_id -> owner_id
+#   user_id -> версия состава проектов пользователя (для ролей из токена)
+membership_cache = TTLCache()
+column_project_cache = TTLCache()
+project_owner_cache = TTLCache()
+membership_version_cache = TTLCache()
+
+
+def init_access(app):
+    """Настройка кэшей авторизации из конфигурации приложения"""
+    maxsize = app.config.get('AUTH_CACHE_SIZE')
+    ttl = app.config.get('AUTH_CACHE_TTL')
+    for cache in (membership_cache, column_project_cache, project_owner_cache, membership_version_cache):
+        cache.configure(maxsize=maxsize, ttl=ttl)
+
+
+def _request_memo():
+    """Кэш результатов в пределах одного запроса"""
+    if '_access_memo' not in g:
+        g._access_memo = {}
+    return g._access_memo
+
+
+def _cached(cache, key, loader):
+    memo = _request_memo()
+    memo_key = (id(cache), key)
+    if memo_key in memo:
+        return memo[memo_key]
+    value = cache.get(key)
+    if value is _MISSING:
+        value = loader()
+        cache.set(key, value)
+    memo[memo_key] = value
+    return value
+
+
+def get_membership_version(user_id):
+    return _cached(
+        membership_version_cache, user_id,
+        lambda: db.session.query(User.MembershipVersion).filter_by(UserID=user_id).scalar()
+    )
+
+
+def _token_role(user_id, project_id):
+    """Роль из claims access-токена текущего запроса, если они не устарели"""
+    try:
+        claims = get_jwt()
+    except RuntimeError:
+        return _MISSING
+    if 'prj' not in claims or claims.get('sub') != str(user_id):
+        return _MISSING
+    if claims.get('pv') != get_membership_version(user_id):
+        return _MISSING
+    # Токен отвечает только за перечисленные проекты: отсутствие проекта в
+    # claims (например, выдан до записи, не изменившей версию) проверяется по базе
+    return claims['prj'].get(str(project_id), _MISSING)
+
+
+def get_member_role(user_id, project_id):
+    """Роль пользователя в проекте или None, если он не участник"""
+    role = _token_role(user_id, project_id)
+    if role is not _MISSING:
+        return role
+    return _cached(
+        membership_cache, (user_id, project_id),
+        lambda: db.session.query(ProjectMember.Role)
+        .filter_by(ProjectID=project_id, UserID=user_id).scalar()
+    )
+
+
+def get_project_owner(project_id):
+    """ID владельца проекта или None, если проекта нет (или он удаляется)"""
+    return _cached(
+        project_owner_cache, project_id,
+        lambda: db.session.query(Project.OwnerID)
+        .filter_by(ProjectID=project_id, DeletedAt=None).scalar()
+    )
+
+
+def get_column_project(column_id):
+    """ID проекта колонки или None, если колонки нет (или она удаляется)"""
+    return _cached(
+        column_project_cache, column_id,
+        lambda: db.session.query(Column.ProjectID)
+        .filter_by(ColumnID=column_id, DeletedAt=None).scalar()
+    )
+
+
+def get_task_project(task_id):
+    """ID проекта задачи (задача -> колонка -> проект) одним запросом"""
+    return (db.session.query(Column.ProjectID)
+            .join(Task, Task.ColumnID == Column.ColumnID)
+            .filter(Task.TaskID == task_id, Column.DeletedAt.is_(None))
+            .scalar())
+
+
+def is_member(user_id, project_id):
+    """Участие в неудаленном проекте - запросом к базе, мимо кэша и claims токена
+    (для долгих соединений, которые переживают изменение состава)"""
+    return db.session.query(ProjectMember.MemberID).join(
+        Project, Project.ProjectID == ProjectMember.ProjectID
+    ).filter(ProjectMember.ProjectID == project_id, ProjectMember.UserID == user_id,
+             Project.DeletedAt.is_(None)).first() is not None
+
+
+def authorize_project(user_id, project_id):
+    """Проверка что пользователь участник проекта, иначе 403"""
+    role = get_member_role(user_id, project_id)
+    if role is None:
+        abort(403, 'Доступ запрещен')
+    return role
+
+
+def authorize_owner(user_id, project_id, message='Доступ запрещен'):
+    """Проверка что пользователь владелец проекта, иначе 403"""
+    if get_project_owner(project_id) != user_id:
+        abort(403, message)
+
+
+def authorize_column(user_id, column_id):
+    """Проверка доступа к колонке; возвращает ID проекта"""
+    project_id = get_column_project(column_id)
+    if project_id is None:
+        abort(404)
+    authorize_project(user_id, project_id)
+    return project_id
+
+
+def authorize_task(user_id, task):
+    """Проверка доступа к задаче; возвращает ID проекта"""
+    return authorize_column(user_id, task.ColumnID)
+
+
+def invalidate_membership(user_id, project_id):
+    """Сброс кэша после изменения состава участников проекта"""
+    membership_cache.delete((user_id, project_id))
+    membership_version_cache.delete(user_id)
+    memo = _request_memo()
+    memo.pop((id(membership_cache), (user_id, project_id)), None)
+    memo.pop((id(membership_version_cache), user_id), None)
+
+
+def invalidate_project(project_id):
+    """Сброс кэша после удаления проекта"""
+    project_owner_cache.delete(project_id)
+    _request_memo().pop((id(project_owner_cache), project_id), None)
+
+
+def invalidate_column(column_id):
+    """Сброс кэша после удаления колонки"""
+    column_project_cache.delete(column_id)
+    _request_memo().pop((id(column_project_cache), column_id), None)
@@ -0,0 +1,204 @@
+"""Запись логов задач (TaskLog): синхронно или фоновыми пачками.
+
+AUDIT_LOG_MODE=sync (по умолчанию, используется в тестах) - записи
+вставляются в транзакцию запроса, события ленты получают ID записи лога.
+
+AUDIT_LOG_MODE=async - записи копятся в сессии и после фиксации транзакции
+ставятся в ограниченную очередь процесса. Фоновый поток пишет их одним
+INSERT на пачку: когда набралось AUDIT_BATCH_SIZE записей или прошло
+AUDIT_FLUSH_INTERVAL секунд. Запрос никогда не ждет очередь: при
+переполнении запись отбрасывается и учитывается в счетчике dropped.
+При остановке процесса очередь дописывается (stop()).
+
+Тем же путем пишется журнал проекта (ProjectLog): удаление задач и
+изменения колонок. Его записи не ссылаются на строки внешними ключами и
+остаются после удаления задачи или колонки.
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+from database import db
+from models.project_log import ProjectLog
+from models.task import Task
+from models.task_log import TaskLog
+from services import search
+
+MODE_SYNC = 'sync'
+MODE_ASYNC = 'async'
+
+logger = logging.getLogger(__name__)
+
+
+class AuditWriter:
+    """Очередь и фоновый поток записи логов одного процесса"""
+
+    def __init__(self, queue_size=10000, batch_size=500, flush_interval=1.0):
+        self.mode = MODE_SYNC
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.counters = {'enqueued': 0, 'flushed': 0, 'dropped': 0, 'failed': 0, 'batches': 0}
+        self._app = None
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+
+    def configure(self, app):
+        self.stop()
+        self._app = app
+        self.mode = app.config.get('AUDIT_LOG_MODE', self.mode)
+        self.queue_size = app.config.get('AUDIT_QUEUE_SIZE', self.queue_size)
+        self.batch_size = app.config.get('AUDIT_BATCH_SIZE', self.batch_size)
+        self.flush_interval = app.config.get('AUDIT_FLUSH_INTERVAL', self.flush_interval)
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._stopping.clear()
+
+    def record(self, entries, model=TaskLog):
+        """Запись логов (TaskLog или ProjectLog) в рамках текущей транзакции;
+        в sync-режиме в записи добавляется LogID"""
+        now = datetime.utcnow()
+        for entry in entries:
+            entry.setdefault('CreatedAt', now)
+        if not entries:
+            return entries
+        if self.mode != MODE_ASYNC:
+            log_ids = list(db.session.scalars(
+                insert(model).returning(model.LogID, sort_by_parameter_order=True), entries
+            ))
+            for entry, log_id in zip(entries, log_ids):
+                entry['LogID'] = log_id
+            if model is TaskLog:
+                search.index_logs(log_ids)
+        else:
+            # В очередь попадают только записи зафиксированных транзакций
+            db.session.info.setdefault('audit', []).extend((model, entry) for entry in entries)
+        return entries
+
+    def enqueue(self, items):
+        """Постановка в очередь пар (модель, запись)"""
+        self._start()
+        for item in items:
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                self._count('dropped')
+            else:
+                self._count('enqueued')
+
+    def stats(self):
+        with self._lock:
+            result = dict(self.counters)
+        result['queue_depth'] = self._queue.qsize()
+        result['mode'] = self.mode
+        return result
+
+    def stop(self, timeout=None):
+        """Остановка фонового потока после записи всей очереди"""
+        thread = self._thread
+        if thread is None:
+            return
+        self._stopping.set()
+        thread.join(timeout)
+        self._thread = None
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self.counters[name] += value
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not (self._stopping.is_set() and self._queue.empty()):
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=min(timeout, 0.1)))
+                except queue.Empty:
+                    if self._stopping.is_set():
+                        break
+            if batch:
+                self._flush(batch)
+
+    def _flush(self, batch):
+        task_logs = [entry for model, entry in batch if model is TaskLog]
+        project_logs = [entry for model, entry in batch if model is ProjectLog]
+        rows = []
+        with self._app.app_context():
+            try:
+                if task_logs:
+                    # Задача могла быть удалена, пока ее лог ждал в очереди
+                    existing = {row[0] for row in db.session.query(Task.TaskID)
+                                .filter(Task.TaskID.in_({entry['TaskID'] for entry in task_logs}))}
+                    rows = [entry for entry in task_logs if entry['TaskID'] in existing]
+                if rows:
+                    search.index_logs(list(db.session.scalars(
+                        insert(TaskLog).returning(TaskLog.LogID), rows
+                    )))
+                if project_logs:
+                    db.session.execute(insert(ProjectLog), project_logs)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                self._count('failed', len(batch))
+                logger.exception('Не удалось записать %d логов задач', len(batch))
+                return
+            finally:
+                db.session.remove()
+        self._count('dropped', len(task_logs) - len(rows))
+        self._count('flushed', len(rows) + len(project_logs))
+        self._count('batches')
+
+
+writer = AuditWriter()
+
+
+# Дописывание очереди при штатном завершении процесса
+atexit.register(writer.stop)
+
+
+def init_audit(app):
+    """Настройка записи логов из конфигурации приложения"""
+    writer.configure(app)
+
+
+def record(*entries):
+    """Запись логов задач; возвращает записи (с LogID в sync-режиме)"""
+    return writer.record(list(entries))
+
+
+def project_log_values(project_id, user_id, action, message, task_id=None, column_id=None):
+    """Поля записи журнала проекта; набор ключей одинаковый для пакетной вставки"""
+    return {'ProjectID': project_id, 'UserID': user_id, 'Action': action, 'Message': message,
+            'TaskID': task_id, 'ColumnID': column_id}
+
+
+def record_project(*entries):
+    """Запись в журнал проекта (удаление задач, изменения колонок)"""
+    return writer.record(list(entries), ProjectLog)
+
+
+@event.listens_for(Session, 'after_commit')
+def _enqueue_committed(session):
+    items = session.info.pop('audit', None)
+    if items:
+        writer.enqueue(items)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_rolled_back(session):
+    session.info.pop('audit', None)
@@ -0,0 +1,202 @@
+"""Лента изменений доски: публикация событий и раздача подписчикам (SSE).
+
+События публикуются обработчиками routers/* после фиксации транзакции.
+EventHub раздает их подписчикам текущего процесса через ограниченные
+очереди. Доставка между процессами выполняется брокером: по умолчанию
+LocalBroker (в пределах процесса), для нескольких воркеров можно указать
+свой класс в EVENTS_BROKER.
+"""
+import json
+import queue
+import threading
+from collections import defaultdict
+from werkzeug.utils import import_string
+
+# Политики при переполнении очереди подписчика
+OVERFLOW_RESYNC = 'resync'          # очистить очередь и попросить клиента перечитать доску
+OVERFLOW_DISCONNECT = 'disconnect'  # закрыть поток, клиент переподключится с Last-Event-ID
+
+# Служебное событие: клиент отстал и должен заново загрузить доску
+RESYNC_EVENT = {'type': 'resync', 'data': {}}
+
+
+class Broker:
+    """Интерфейс доставки событий между процессами"""
+
+    def start(self, deliver):
+        """Запуск приема; deliver(project_id, event) вызывается для каждого события"""
+        raise NotImplementedError
+
+    def publish(self, project_id, event):
+        raise NotImplementedError
+
+    def stop(self):
+        pass
+
+
+class LocalBroker(Broker):
+    """Доставка в пределах одного процесса (по умолчанию и в тестах)"""
+
+    def __init__(self):
+        self._deliver = None
+
+    def start(self, deliver):
+        self._deliver = deliver
+
+    def publish(self, project_id, event):
+        if self._deliver is not None:
+            self._deliver(project_id, event)
+
+
+class Subscriber:
+    """Подписка одного клиента с ограниченной очередью"""
+
+    def __init__(self, project_id, maxsize, policy):
+        self.project_id = project_id
+        self.policy = policy
+        self.closed = False
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+
+    def offer(self, event):
+        """Неблокирующая постановка события; издатель никогда не ждет медленного клиента"""
+        with self._lock:
+            if self.closed:
+                return
+            try:
+                self._queue.put_nowait(event)
+            except queue.Full:
+                if self.policy == OVERFLOW_DISCONNECT:
+                    self.closed = True
+                    return
+                # Все накопленное уже неактуально: остается одно событие resync
+                while True:
+                    try:
+                        self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                self._queue.put_nowait(RESYNC_EVENT)
+
+    def get(self, timeout):
+        """Следующее событие или None по истечении timeout"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventHub:
+    """Раздача событий подписчикам процесса по проектам"""
+
+    def __init__(self, broker=None, queue_size=100, policy=OVERFLOW_RESYNC):
+        self.queue_size = queue_size
+        self.policy = policy
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+        self.broker = None
+        self.set_broker(broker or LocalBroker())
+
+    def set_broker(self, broker):
+        if self.broker is not None:
+            self.broker.stop()
+        self.broker = broker
+        broker.start(self._fanout)
+
+    def subscribe(self, project_id):
+        subscriber = Subscriber(project_id, self.queue_size, self.policy)
+        with self._lock:
+            self._subscribers[project_id].add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        subscriber.closed = True
+        with self._lock:
+            subscribers = self._subscribers.get(subscriber.project_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[subscriber.project_id]
+
+    def publish(self, project_id, event_type, data, event_id=None):
+        self.broker.publish(project_id, {'type': event_type, 'id': event_id, 'data': data})
+
+    def subscriber_count(self, project_id=None):
+        with self._lock:
+            if project_id is not None:
+                return len(self._subscribers.get(project_id, ()))
+            return sum(len(s) for s in self._subscribers.values())
+
+    def _fanout(self, project_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(project_id, ()))
+        for subscriber in subscribers:
+            subscriber.offer(event)
+
+
+hub = EventHub()
+
+
+def init_events(app):
+    """Настройка ленты событий из конфигурации приложения"""
+    hub.queue_size = app.config.get('EVENTS_QUEUE_SIZE', hub.queue_size)
+    hub.policy = app.config.get('EVENTS_OVERFLOW_POLICY', hub.policy)
+    broker = app.config.get('EVENTS_BROKER')
+    if broker:
+        hub.set_broker(import_string(broker)() if isinstance(broker, str) else broker)
+
+
+def publish(project_id, event_type, data, event_id=None):
+    """Публикация события проекта; вызывается после фиксации транзакции"""
+    hub.publish(project_id, event_type, data, event_id)
+
+
+def format_sse(event):
+    """Сериализация события в формат text/event-stream"""
+    lines = []
+    if event.get('id') is not None:
+        lines.append(f"id: {event['id']}")
+    lines.append(f"event: {event['type']}")
+    lines.append('data: ' + json.dumps(event['data'], ensure_ascii=False, default=str))
+    return '\n'.join(lines) + '\n\n'
+
+
+# Поля записи лога задачи в событиях
+LOG_FIELDS = ('LogID', 'TaskID', 'UserID', 'Action', 'Message', 'FromColumnID', 'ToColumnID', 'CreatedAt')
+
+
+def log_data(log):
+    """Данные записи лога задачи (модель или словарь из services/audit.py) для события"""
+    if not isinstance(log, dict):
+        log = {name: getattr(log, name) for name in LOG_FIELDS}
+    data = {name: log.get(name) for name in LOG_FIELDS}
+    if data['CreatedAt'] is not None:
+        data['CreatedAt'] = data['CreatedAt'].isoformat()
+    return data
+
+
+# Тип события для действия из лога задачи
+LOG_ACTION_EVENTS = {
+    'create': 'task.created',
+    'update': 'task.updated',
+    'move': 'task.moved',
+}
+
+
+def replay_events(project_id, after_id, batch_size=500):
+    """События проекта из лога задач с LogID > after_id (для Last-Event-ID)"""
+    from database import db
+    from models.column import Column
+    from models.task import Task
+    from models.task_log import TaskLog
+
+    query = (db.session.query(TaskLog)
+             .join(Task, Task.TaskID == TaskLog.TaskID)
+             .join(Column, Column.ColumnID == Task.ColumnID)
+             .filter(Column.ProjectID == project_id, TaskLog.LogID > after_id)
+             .order_by(TaskLog.LogID))
+    for log in query.yield_per(batch_size):
+        yield {
+            'type': LOG_ACTION_EVENTS.get(log.Action, f'task.{log.Action}'),
+            'id': log.LogID,
+            'data': {'log': log_data(log), 'replayed': True}
+        }
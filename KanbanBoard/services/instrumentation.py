@@ -0,0 +1,296 @@
+"""Метрики запросов: число SQL-запросов, время в базе и задержка по маршрутам.
+
+События движка SQLAlchemy (before/after_cursor_execute) считают запросы и
+их время в рамках HTTP-запроса, сигналы Flask (request_started,
+request_finished) фиксируют итог по маршруту (endpoint и метод):
+гистограммы задержки и числа SQL-запросов, суммарное время в базе и самые
+медленные операторы. GET /metrics отдает все это в текстовом формате
+Prometheus вместе со счетчиками записи логов задач и фоновых заданий.
+Метрики хранятся в памяти процесса: каждый воркер gunicorn отдает свои.
+Сбор включается METRICS_ENABLED; METRICS_TOKEN (Authorization: Bearer) и
+METRICS_ALLOWED_IPS ограничивают доступ к /metrics, иначе он открыт всем,
+кто достучится до воркера.
+
+NPLUSONE_THRESHOLD > 0 (для разработки) - предупреждение в лог, если один
+запрос выполнил оператор одной формы (текст без параметров) столько раз
+или больше. PROFILE_SAMPLE_RATE - доля запросов, для которых cProfile
+сохраняет профиль в PROFILE_DIR (0 - выключено).
+"""
+import cProfile
+import hmac
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from flask import Response, abort, current_app, g, has_request_context, request, request_finished, request_started
+from sqlalchemy import event
+from database import db
+
+# Границы гистограмм: задержка в секундах и число SQL-запросов на запрос
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+# Медленных операторов на маршрут
+SLOW_STATEMENTS = 5
+
+# Параметры всех стилей DB-API (qmark, format, pyformat, named, numeric)
+# приводятся к ?, затем списки IN (?, ?, ...) разной длины - к одной форме
+_PLACEHOLDER_RE = re.compile(r'%\([^)]+\)s|%s|(?<![:\w]):\w+|\$\d+|\?')
+_PARAMS_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_SPACES_RE = re.compile(r'\s+')
+
+logger = logging.getLogger(__name__)
+
+
+def statement_shape(statement):
+    """Текст оператора без различий в длине списков параметров и пробелах"""
+    statement = _PLACEHOLDER_RE.sub('?', statement)
+    return _SPACES_RE.sub(' ', _PARAMS_RE.sub('(?)', statement)).strip()
+
+
+class Histogram:
+    """Накопительная гистограмма в духе Prometheus"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = 0
+        while index < len(self.buckets) and value > self.buckets[index]:
+            index += 1
+        self.counts[index] += 1
+        self.sum += value
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+
+class RouteStats:
+    """Накопленные метрики одного маршрута"""
+
+    def __init__(self):
+        self.statuses = Counter()
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.db_time = 0.0
+        self.n_plus_one = 0
+        # Самые медленные операторы: форма -> максимальное время
+        self.slowest = {}
+
+    def add_slow(self, shape, elapsed):
+        if elapsed <= self.slowest.get(shape, 0.0):
+            return
+        self.slowest[shape] = elapsed
+        if len(self.slowest) > SLOW_STATEMENTS:
+            del self.slowest[min(self.slowest, key=self.slowest.get)]
+
+
+class RequestState:
+    """SQL-запросы текущего HTTP-запроса"""
+
+    __slots__ = ('started', 'queries', 'db_time', 'shapes', 'slowest', 'profiler')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.shapes = Counter()
+        self.slowest = {}
+        self.profiler = None
+
+
+class Instrumentation:
+    """Сбор и выдача метрик одного процесса"""
+
+    def __init__(self):
+        self.n_plus_one_threshold = 0
+        self.profile_rate = 0.0
+        self.profile_dir = None
+        self.routes = {}
+        self._lock = threading.Lock()
+
+    def configure(self, app):
+        self.n_plus_one_threshold = app.config.get('NPLUSONE_THRESHOLD', self.n_plus_one_threshold)
+        self.profile_rate = app.config.get('PROFILE_SAMPLE_RATE', self.profile_rate)
+        self.profile_dir = app.config.get('PROFILE_DIR') or os.path.join(app.instance_path, 'profiles')
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.routes = {}
+
+    def connect(self, app):
+        """Подключение к сигналам приложения и событиям его движка"""
+        request_started.connect(self._request_started, app)
+        request_finished.connect(self._request_finished, app)
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', self._before_execute)
+            event.listen(db.engine, 'after_cursor_execute', self._after_execute)
+            event.listen(db.engine, 'handle_error', self._execute_failed)
+
+    def _request_started(self, sender, **extra):
+        state = g._instrumentation = RequestState()
+        if self.profile_rate and random.random() < self.profile_rate:
+            state.profiler = cProfile.Profile()
+            state.profiler.enable()
+
+    def _request_finished(self, sender, response, **extra):
+        state = g.pop('_instrumentation', None)
+        if state is None:
+            return
+        elapsed = time.perf_counter() - state.started
+        route = (request.endpoint or 'unknown', request.method)
+        if state.profiler is not None:
+            state.profiler.disable()
+            self._dump_profile(state.profiler, route, elapsed)
+
+        repeated = []
+        if self.n_plus_one_threshold:
+            repeated = [(shape, count) for shape, count in state.shapes.items()
+                        if count >= self.n_plus_one_threshold]
+            for shape, count in repeated:
+                logger.warning('Возможный N+1: %s %s выполнил %d раз: %s',
+                               request.method, request.path, count, shape)
+
+        with self._lock:
+            stats = self.routes.get(route)
+            if stats is None:
+                stats = self.routes[route] = RouteStats()
+            stats.statuses[response.status_code] += 1
+            stats.latency.observe(elapsed)
+            stats.queries.observe(state.queries)
+            stats.db_time += state.db_time
+            stats.n_plus_one += len(repeated)
+            for shape, slowest in state.slowest.items():
+                stats.add_slow(shape, slowest)
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and '_instrumentation' in g:
+            conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('query_started')
+        if not started or not has_request_context():
+            return
+        elapsed = time.perf_counter() - started.pop()
+        state = g.get('_instrumentation')
+        if state is None:
+            return
+        shape = statement_shape(statement)
+        state.queries += 1
+        state.db_time += elapsed
+        state.shapes[shape] += 1
+        if elapsed > state.slowest.get(shape, 0.0):
+            state.slowest[shape] = elapsed
+
+    def _execute_failed(self, context):
+        # after_cursor_execute не вызывается при ошибке оператора: без этого
+        # время его начала осталось бы в стеке соединения
+        connection = context.connection
+        if connection is not None and connection.info.get('query_started'):
+            connection.info['query_started'].pop()
+
+    def _dump_profile(self, profiler, route, elapsed):
+        endpoint, method = route
+        os.makedirs(self.profile_dir, exist_ok=True)
+        name = f'{endpoint}-{method}-{time.time_ns()}-{int(elapsed * 1000)}ms.prof'
+        try:
+            profiler.dump_stats(os.path.join(self.profile_dir, name))
+        except OSError:
+            logger.exception('Не удалось сохранить профиль запроса')
+
+    def render(self):
+        """Метрики процесса в текстовом формате Prometheus"""
+        with self._lock:
+            routes = sorted(self.routes.items())
+            lines = []
+            _header(lines, 'kanban_http_requests_total', 'counter', 'Запросы по маршрутам и кодам ответа')
+            for (endpoint, method), stats in routes:
+                for status, count in sorted(stats.statuses.items()):
+                    lines.append(f'kanban_http_requests_total{_labels(endpoint, method, status=status)} {count}')
+            _header(lines, 'kanban_http_request_duration_seconds', 'histogram', 'Задержка обработки запроса')
+            for (endpoint, method), stats in routes:
+                _histogram(lines, 'kanban_http_request_duration_seconds', stats.latency, endpoint, method)
+            _header(lines, 'kanban_http_request_queries', 'histogram', 'SQL-запросов на HTTP-запрос')
+            for (endpoint, method), stats in routes:
+                _histogram(lines, 'kanban_http_request_queries', stats.queries, endpoint, method)
+            _header(lines, 'kanban_http_request_db_seconds_total', 'counter', 'Время выполнения SQL-запросов')
+            for (endpoint, method), stats in routes:
+                lines.append(f'kanban_http_request_db_seconds_total{_labels(endpoint, method)} {stats.db_time:.6f}')
+            _header(lines, 'kanban_http_request_n_plus_one_total', 'counter',
+                    'Повторы одного оператора сверх NPLUSONE_THRESHOLD')
+            for (endpoint, method), stats in routes:
+                lines.append(f'kanban_http_request_n_plus_one_total{_labels(endpoint, method)} {stats.n_plus_one}')
+            _header(lines, 'kanban_db_slowest_statement_seconds', 'gauge', 'Самые медленные операторы маршрута')
+            for (endpoint, method), stats in routes:
+                for shape, elapsed in sorted(stats.slowest.items(), key=lambda item: -item[1]):
+                    lines.append(f'kanban_db_slowest_statement_seconds'
+                                 f'{_labels(endpoint, method, statement=shape[:300])} {elapsed:.6f}')
+
+        from services.audit import writer
+        from services.jobs import runner
+        audit = writer.stats()
+        _header(lines, 'kanban_audit_logs_total', 'counter', 'Записи логов задач по результату')
+        for name in ('enqueued', 'flushed', 'dropped', 'failed'):
+            lines.append(f'kanban_audit_logs_total{{result="{name}"}} {audit[name]}')
+        _header(lines, 'kanban_audit_queue_depth', 'gauge', 'Записей логов в очереди')
+        lines.append(f'kanban_audit_queue_depth {audit["queue_depth"]}')
+        jobs = runner.stats()
+        _header(lines, 'kanban_jobs_total', 'counter', 'Фоновые задания процесса по результату')
+        for name in ('done', 'failed', 'interrupted'):
+            lines.append(f'kanban_jobs_total{{result="{name}"}} {jobs[name]}')
+        _header(lines, 'kanban_jobs_queue_depth', 'gauge', 'Заданий в очереди процесса')
+        lines.append(f'kanban_jobs_queue_depth {jobs["queue_depth"]}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+
+def _labels(endpoint, method, **extra):
+    labels = {'endpoint': endpoint, 'method': method, **extra}
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _header(lines, name, kind, description):
+    lines.append(f'# HELP {name} {description}')
+    lines.append(f'# TYPE {name} {kind}')
+
+
+def _histogram(lines, name, histogram, endpoint, method):
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{_labels(endpoint, method, le=bound)} {cumulative}')
+    lines.append(f'{name}_bucket{_labels(endpoint, method, le="+Inf")} {histogram.count}')
+    lines.append(f'{name}_sum{_labels(endpoint, method)} {histogram.sum:.6f}')
+    lines.append(f'{name}_count{_labels(endpoint, method)} {histogram.count}')
+
+
+instrumentation = Instrumentation()
+
+
+def metrics_view():
+    allowed_ips = current_app.config.get('METRICS_ALLOWED_IPS')
+    if allowed_ips and request.remote_addr not in allowed_ips:
+        abort(403)
+    token = current_app.config.get('METRICS_TOKEN')
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        abort(401)
+    return Response(instrumentation.render(), mimetype='text/plain; version=0.0.4')
+
+
+def init_instrumentation(app):
+    """Подключение метрик к приложению и выдача их по GET /metrics"""
+    if not app.config.get('METRICS_ENABLED', False):
+        return
+    instrumentation.configure(app)
+    instrumentation.connect(app)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
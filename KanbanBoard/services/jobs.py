@@ -0,0 +1,286 @@
+"""Фоновые задания удаления и архивации проектов и колонок.
+
+Запрос на удаление только помечает проект или колонку (DeletedAt): они
+сразу пропадают из выдачи и проверок доступа. Сами строки удаляет
+задание порциями по JOB_CHUNK_SIZE без загрузки объектов ORM: для порции
+задач их логи удаляются через DELETE ... WHERE "LogID" IN (...), затем
+удаляются задачи. Каждая порция - отдельная транзакция вместе со счетчиком
+Processed, поэтому прерванное задание продолжается с места остановки.
+С архивацией строки перед удалением копируются INSERT ... SELECT в
+tasks_archive и task_logs_archive.
+
+JOBS_MODE=thread (по умолчанию) - задания выполняет фоновый поток процесса
+по одному, между порциями выдерживается пауза JOB_CHUNK_PAUSE секунд;
+JOBS_MODE=inline - сразу в запросе (для тестов). Задания, оставшиеся
+незавершенными после остановки процесса, выполняет flask run-jobs.
+"""
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import delete, func, insert, literal, select, update
+from database import db
+from models.column import Column
+from models.column_flow import ColumnFlowDaily
+from models.job import Job
+from models.project import Project
+from models.project_log import ProjectLog
+from models.project_member import ProjectMember
+from models.task import Task
+from models.task_archive import ArchivedTask
+from models.task_log import TaskLog
+from models.task_log_archive import ArchivedTaskLog
+from services import search
+from services.access import invalidate_column, invalidate_project
+from services.versioning import bump_revision
+
+MODE_THREAD = 'thread'
+MODE_INLINE = 'inline'
+
+KIND_PROJECT = 'delete_project'
+KIND_COLUMN = 'delete_column'
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+logger = logging.getLogger(__name__)
+
+
+class Purge:
+    """Удаление задач и логов одного задания порциями"""
+
+    def __init__(self, job, chunk_size):
+        self.job = job
+        self.chunk_size = chunk_size
+        # Новые колонки в удаляемом проекте не создаются: доступ к нему уже закрыт
+        if job.Kind == KIND_PROJECT:
+            self.column_ids = db.session.scalars(
+                select(Column.ColumnID).where(Column.ProjectID == job.ProjectID)
+            ).all()
+        else:
+            self.column_ids = [job.ColumnID]
+        self.tasks = select(Task.TaskID).where(Task.ColumnID.in_(self.column_ids))
+
+    def count(self):
+        """Число строк задач и логов к удалению"""
+        tasks = db.session.scalar(select(func.count()).select_from(self.tasks.subquery()))
+        logs = db.session.scalar(select(func.count()).where(TaskLog.TaskID.in_(self.tasks)))
+        return tasks + logs
+
+    def steps(self):
+        """Порции удаления; после каждой - число удаленных строк (до commit)"""
+        while True:
+            task_ids = db.session.scalars(self.tasks.limit(self.chunk_size)).all()
+            if not task_ids:
+                return
+            while True:
+                log_ids = db.session.scalars(
+                    select(TaskLog.LogID).where(TaskLog.TaskID.in_(task_ids)).limit(self.chunk_size)
+                ).all()
+                if not log_ids:
+                    break
+                yield self._delete_logs(log_ids)
+            yield self._delete_tasks(task_ids)
+
+    def finish(self):
+        """Удаление самих колонок и проекта после их задач; возвращает число
+        строк, добавленных в колонки уже во время задания"""
+        job = self.job
+        removed = 0
+        db.session.execute(delete(ColumnFlowDaily).where(ColumnFlowDaily.ColumnID.in_(self.column_ids)))
+        # Другие воркеры до истечения кэша доступа могли создать или перенести
+        # задачи в помеченные колонки: они удаляются в одной транзакции с колонками
+        task_ids = db.session.scalars(self.tasks).all()
+        if task_ids:
+            log_ids = db.session.scalars(select(TaskLog.LogID).where(TaskLog.TaskID.in_(task_ids))).all()
+            if log_ids:
+                removed += self._delete_logs(log_ids)
+            removed += self._delete_tasks(task_ids)
+        db.session.execute(delete(Column).where(Column.ColumnID.in_(self.column_ids)))
+        if job.Kind == KIND_PROJECT:
+            db.session.execute(delete(ProjectMember).where(ProjectMember.ProjectID == job.ProjectID))
+            db.session.execute(delete(ProjectLog).where(ProjectLog.ProjectID == job.ProjectID))
+            db.session.execute(delete(Project).where(Project.ProjectID == job.ProjectID))
+        else:
+            bump_revision(job.ProjectID)
+        return removed
+
+    def _delete_logs(self, log_ids):
+        if self.job.Archive:
+            names = [column.name for column in TaskLog.__table__.columns]
+            db.session.execute(insert(ArchivedTaskLog).from_select(
+                names + ['ArchivedAt'],
+                select(*TaskLog.__table__.columns, literal(datetime.utcnow())).where(TaskLog.LogID.in_(log_ids))
+            ))
+        search.remove_logs(log_ids)
+        return db.session.execute(delete(TaskLog).where(TaskLog.LogID.in_(log_ids))).rowcount
+
+    def _delete_tasks(self, task_ids):
+        if self.job.Archive:
+            # Версия строки (Version) в архив не переносится
+            columns = [column for column in Task.__table__.columns if column.name in ArchivedTask.__table__.c]
+            db.session.execute(insert(ArchivedTask).from_select(
+                [column.name for column in columns] + ['ProjectID', 'ArchivedAt'],
+                select(*columns, literal(self.job.ProjectID), literal(datetime.utcnow()))
+                .where(Task.TaskID.in_(task_ids))
+            ))
+        search.remove_tasks(task_ids)
+        return db.session.execute(delete(Task).where(Task.TaskID.in_(task_ids))).rowcount
+
+
+def create_job(kind, project_id, user_id, column_id=None, archive=False):
+    """Запись задания в текущей транзакции; запуск - submit() после commit"""
+    job = Job(Kind=kind, ProjectID=project_id, ColumnID=column_id, Archive=archive,
+              Status=PENDING, CreatedBy=user_id)
+    db.session.add(job)
+    return job
+
+
+def run_job(job_id, chunk_size=1000, pause=0.0, stopping=None):
+    """Выполнение задания; False, если его уже выполняет другой процесс или оно прервано"""
+    # Выполняет только тот, кто перевел задание в running
+    claimed = db.session.execute(
+        update(Job).where(Job.JobID == job_id, Job.Status == PENDING)
+        .values(Status=RUNNING, StartedAt=func.coalesce(Job.StartedAt, datetime.utcnow()))
+    ).rowcount
+    db.session.commit()
+    if not claimed:
+        return False
+
+    job = db.session.get(Job, job_id)
+    purge = Purge(job, chunk_size)
+    try:
+        if not job.Total:
+            job.Total = purge.count()
+            db.session.commit()
+        for removed in purge.steps():
+            job.Processed += removed
+            db.session.commit()
+            if stopping is not None and stopping.is_set():
+                job.Status = PENDING
+                db.session.commit()
+                return False
+            if pause:
+                time.sleep(pause)
+        job.Processed += purge.finish()
+        job.Status = DONE
+        job.FinishedAt = datetime.utcnow()
+        db.session.commit()
+    except Exception as exc:
+        db.session.rollback()
+        job.Status = FAILED
+        job.Error = str(exc)
+        job.FinishedAt = datetime.utcnow()
+        db.session.commit()
+        raise
+    for column_id in purge.column_ids:
+        invalidate_column(column_id)
+    if job.Kind == KIND_PROJECT:
+        invalidate_project(job.ProjectID)
+    return True
+
+
+def resume_jobs(chunk_size=1000):
+    """Выполнение всех незавершенных заданий (процессы приложения остановлены)"""
+    db.session.execute(update(Job).where(Job.Status == RUNNING).values(Status=PENDING))
+    db.session.commit()
+    job_ids = db.session.scalars(select(Job.JobID).where(Job.Status == PENDING).order_by(Job.JobID)).all()
+    for job_id in job_ids:
+        run_job(job_id, chunk_size)
+    return job_ids
+
+
+class JobRunner:
+    """Фоновый поток выполнения заданий одного процесса"""
+
+    def __init__(self, chunk_size=1000, pause=0.0):
+        self.mode = MODE_THREAD
+        self.chunk_size = chunk_size
+        self.pause = pause
+        self.counters = {'done': 0, 'failed': 0, 'interrupted': 0}
+        self._app = None
+        self._queue = queue.Queue()
+        self._thread = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+
+    def configure(self, app):
+        self.stop()
+        self._app = app
+        self.mode = app.config.get('JOBS_MODE', self.mode)
+        self.chunk_size = app.config.get('JOB_CHUNK_SIZE', self.chunk_size)
+        self.pause = app.config.get('JOB_CHUNK_PAUSE', self.pause)
+        self._queue = queue.Queue()
+        self._stopping.clear()
+
+    def submit(self, job_id):
+        """Запуск зафиксированного задания"""
+        if self.mode == MODE_INLINE:
+            self._execute(job_id)
+            return
+        self._start()
+        self._queue.put(job_id)
+
+    def stats(self):
+        with self._lock:
+            result = dict(self.counters)
+        result['queue_depth'] = self._queue.qsize()
+        result['mode'] = self.mode
+        return result
+
+    def stop(self, timeout=None):
+        """Остановка после текущей порции; прерванное задание остается pending"""
+        thread = self._thread
+        if thread is None:
+            return
+        self._stopping.set()
+        self._queue.put(None)
+        thread.join(timeout)
+        self._thread = None
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name='job-runner', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            job_id = self._queue.get()
+            if job_id is None:
+                break
+            with self._app.app_context():
+                try:
+                    self._execute(job_id, self.pause, self._stopping)
+                except Exception:
+                    logger.exception('Задание %s завершилось ошибкой', job_id)
+                finally:
+                    db.session.remove()
+
+    def _execute(self, job_id, pause=0.0, stopping=None):
+        try:
+            finished = run_job(job_id, self.chunk_size, pause, stopping)
+        except Exception:
+            self._count('failed')
+            raise
+        if finished:
+            self._count('done')
+        elif stopping is not None and stopping.is_set():
+            self._count('interrupted')
+        return finished
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+
+runner = JobRunner()
+
+
+def init_jobs(app):
+    """Настройка выполнения заданий из конфигурации приложения"""
+    runner.configure(app)
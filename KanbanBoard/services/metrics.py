@@ -0,0 +1,267 @@
+"""Метрики потока задач: накопительная диаграмма, время в колонках, lead/cycle time.
+
+Движение задач сводится в таблицу column_flow_daily (колонка x день:
+сколько задач вошло, вышло и сколько времени провели в колонке вышедшие).
+Сводка обновляется в той же транзакции, что и запись задачи, поэтому
+дашборд за год читает не больше (колонки x дни) строк, а не весь лог.
+Lead time - от создания задачи до первого попадания в колонку "готово",
+cycle time - от первого перемещения до него же; считаются одним запросом
+по логам завершенных за период задач.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import func, and_, insert, update
+from werkzeug.utils import import_string
+from database import db
+from models.column import Column
+from models.column_flow import ColumnFlowDaily
+from models.task import Task
+from models.task_log import TaskLog
+from services.access import get_column_project
+
+# Процентили времени выполнения в ответе
+PERCENTILES = (50, 85, 95)
+
+# Диалекты с INSERT ... ON CONFLICT DO UPDATE; модуль диалекта импортируется
+# при первом использовании (postgresql заметно замедляет запуск воркера)
+_UPSERT_INSERTS = {'sqlite': 'sqlalchemy.dialects.sqlite.insert',
+                   'postgresql': 'sqlalchemy.dialects.postgresql.insert'}
+
+
+class FlowRecorder:
+    """Накопление изменений сводки за одну запись; apply() - до фиксации транзакции.
+
+    Время входа задачи в текущую колонку (последнее перемещение или
+    создание) читается одним запросом на всю пачку задач, поэтому
+    moved/removed вызываются до того, как в сессию добавлены новые логи.
+    """
+
+    def __init__(self, at):
+        self.at = at
+        self._deltas = {}
+        self._entered = {}
+
+    def _delta(self, column_id):
+        key = (column_id, self.at.date())
+        if key not in self._deltas:
+            self._deltas[key] = {'ProjectID': get_column_project(column_id), 'Entered': 0,
+                                 'Exited': 0, 'DwellSeconds': 0.0}
+        return self._deltas[key]
+
+    def load(self, task_ids):
+        """Время входа задач в текущие колонки одним запросом"""
+        task_ids = [task_id for task_id in task_ids if task_id not in self._entered]
+        if not task_ids:
+            return
+        with db.session.no_autoflush:
+            rows = (db.session.query(Task.TaskID, Task.CreatedAt, func.max(TaskLog.CreatedAt))
+                    .outerjoin(TaskLog, and_(TaskLog.TaskID == Task.TaskID, TaskLog.Action == 'move'))
+                    .filter(Task.TaskID.in_(task_ids))
+                    .group_by(Task.TaskID, Task.CreatedAt)
+                    .all())
+        for task_id, created_at, moved_at in rows:
+            self._entered[task_id] = moved_at or created_at or self.at
+
+    def _exit(self, task_id, column_id):
+        self.load([task_id])
+        delta = self._delta(column_id)
+        delta['Exited'] += 1
+        delta['DwellSeconds'] += max((self.at - self._entered[task_id]).total_seconds(), 0.0)
+
+    def created(self, task_id, column_id):
+        self._entered[task_id] = self.at
+        self._delta(column_id)['Entered'] += 1
+
+    def moved(self, task_id, from_column_id, to_column_id):
+        self._exit(task_id, from_column_id)
+        self._delta(to_column_id)['Entered'] += 1
+        self._entered[task_id] = self.at
+
+    def removed(self, task_id, column_id):
+        self._exit(task_id, column_id)
+
+    def apply(self):
+        params = [
+            {'ColumnID': column_id, 'Day': day, **delta}
+            for (column_id, day), delta in self._deltas.items()
+        ]
+        self._deltas = {}
+        if params:
+            upsert_flow(db.session, params)
+
+
+def upsert_flow(session, params):
+    """Прибавление дневных изменений к сводке (строки создаются при отсутствии)"""
+    table = ColumnFlowDaily.__table__
+    make_insert = _UPSERT_INSERTS.get(session.get_bind().dialect.name)
+    if make_insert is not None:
+        stmt = import_string(make_insert)(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.ColumnID, table.c.Day],
+            set_={name: table.c[name] + stmt.excluded[name] for name in ('Entered', 'Exited', 'DwellSeconds')}
+        )
+        session.execute(stmt, params)
+        return
+    for row in params:
+        result = session.execute(
+            update(table)
+            .where(table.c.ColumnID == row['ColumnID'], table.c.Day == row['Day'])
+            .values({name: table.c[name] + row[name] for name in ('Entered', 'Exited', 'DwellSeconds')})
+        )
+        if result.rowcount == 0:
+            session.execute(insert(table), [row])
+
+
+def rebuild(conn):
+    """Пересчет сводки по задачам и логам перемещений.
+
+    История удаленных задач при этом теряется (их логи удаляются вместе
+    с ними), поэтому пересчет нужен только для заполнения сводки впервые.
+    """
+    columns = dict(conn.execute(db.select(Column.ColumnID, Column.ProjectID)).all())
+    tasks = {task_id: (column_id, created_at) for task_id, column_id, created_at
+             in conn.execute(db.select(Task.TaskID, Task.ColumnID, Task.CreatedAt))}
+    deltas = {}
+
+    def add(column_id, moment, entered=0, exited=0, dwell=0.0):
+        if column_id not in columns or moment is None:
+            return
+        key = (column_id, moment.date())
+        delta = deltas.setdefault(key, [0, 0, 0.0])
+        delta[0] += entered
+        delta[1] += exited
+        delta[2] += dwell
+
+    moves = conn.execution_options(yield_per=1000).execute(
+        db.select(TaskLog.TaskID, TaskLog.FromColumnID, TaskLog.ToColumnID, TaskLog.CreatedAt)
+        .where(TaskLog.Action == 'move')
+        .order_by(TaskLog.TaskID, TaskLog.CreatedAt, TaskLog.LogID)
+    )
+    # Начальная колонка задачи - откуда было первое перемещение
+    entered = {}
+    for task_id, from_column_id, to_column_id, moved_at in moves:
+        if task_id not in tasks:
+            continue
+        if task_id not in entered:
+            created_at = tasks[task_id][1]
+            add(from_column_id, created_at, entered=1)
+            entered[task_id] = created_at
+        dwell = (moved_at - entered[task_id]).total_seconds() if entered[task_id] else 0.0
+        add(from_column_id, moved_at, exited=1, dwell=max(dwell, 0.0))
+        add(to_column_id, moved_at, entered=1)
+        entered[task_id] = moved_at
+    for task_id, (column_id, created_at) in tasks.items():
+        if task_id not in entered:
+            add(column_id, created_at, entered=1)
+
+    conn.execute(ColumnFlowDaily.__table__.delete())
+    if deltas:
+        conn.execute(insert(ColumnFlowDaily.__table__), [
+            {'ColumnID': column_id, 'Day': day, 'ProjectID': columns[column_id],
+             'Entered': entered_count, 'Exited': exited_count, 'DwellSeconds': dwell}
+            for (column_id, day), (entered_count, exited_count, dwell) in deltas.items()
+        ])
+
+
+def _percentiles(values):
+    """Процентили методом ближайшего ранга, в часах"""
+    if not values:
+        return {'count': 0, **{f'p{p}': None for p in PERCENTILES}}
+    values = sorted(values)
+    result = {'count': len(values)}
+    for p in PERCENTILES:
+        rank = max(-(-p * len(values) // 100), 1)
+        result[f'p{p}'] = round(values[rank - 1] / 3600, 2)
+    return result
+
+
+def cumulative_flow(project_id, columns, date_from, date_to):
+    """Число задач в каждой колонке на конец каждого дня периода"""
+    table = ColumnFlowDaily
+    counts = dict(
+        db.session.query(table.ColumnID, func.sum(table.Entered - table.Exited))
+        .filter(table.ProjectID == project_id, table.Day < date_from)
+        .group_by(table.ColumnID)
+        .all()
+    )
+    days = [date_from + timedelta(days=i) for i in range((date_to - date_from).days + 1)]
+    changes = {}
+    dwell = {}
+    rows = (db.session.query(table.ColumnID, table.Day, table.Entered, table.Exited, table.DwellSeconds)
+            .filter(table.ProjectID == project_id, table.Day >= date_from, table.Day <= date_to)
+            .all())
+    for column_id, day, entered, exited, dwell_seconds in rows:
+        changes[(column_id, day)] = entered - exited
+        total = dwell.setdefault(column_id, [0, 0.0])
+        total[0] += exited
+        total[1] += dwell_seconds
+
+    series, dwell_times = [], []
+    for column in columns:
+        count = counts.get(column.ColumnID) or 0
+        values = []
+        for day in days:
+            count += changes.get((column.ColumnID, day), 0)
+            values.append(count)
+        series.append({'ColumnID': column.ColumnID, 'Name': column.Name, 'counts': values})
+        exited, dwell_seconds = dwell.get(column.ColumnID, (0, 0.0))
+        dwell_times.append({
+            'ColumnID': column.ColumnID,
+            'Name': column.Name,
+            'exited': exited,
+            'avg_hours': round(dwell_seconds / exited / 3600, 2) if exited else None
+        })
+    return {'days': days, 'columns': series}, dwell_times
+
+
+def completion_times(done_column_id, date_from, date_to):
+    """Lead и cycle time задач, впервые попавших в колонку "готово" за период, в секундах"""
+    done = (db.session.query(TaskLog.TaskID, func.min(TaskLog.CreatedAt).label('done_at'))
+            .filter(TaskLog.ToColumnID == done_column_id)
+            .group_by(TaskLog.TaskID)
+            .having(func.min(TaskLog.CreatedAt) >= date_from)
+            .having(func.min(TaskLog.CreatedAt) < date_to + timedelta(days=1))
+            .subquery())
+    started = (db.session.query(TaskLog.TaskID, func.min(TaskLog.CreatedAt).label('started_at'))
+               .join(done, done.c.TaskID == TaskLog.TaskID)
+               .filter(TaskLog.Action == 'move')
+               .group_by(TaskLog.TaskID)
+               .subquery())
+    rows = (db.session.query(Task.CreatedAt, started.c.started_at, done.c.done_at)
+            .join(done, done.c.TaskID == Task.TaskID)
+            .join(started, started.c.TaskID == Task.TaskID)
+            .all())
+    lead, cycle = [], []
+    for created_at, started_at, done_at in rows:
+        if created_at is not None:
+            lead.append((done_at - created_at).total_seconds())
+        cycle.append((done_at - started_at).total_seconds())
+    return lead, cycle
+
+
+def flow_metrics(project_id, date_from, date_to, done_column_id=None):
+    """Все метрики потока проекта за период [date_from, date_to]"""
+    columns = (Column.query
+               .filter_by(ProjectID=project_id, DeletedAt=None)
+               .order_by(Column.Position, Column.OrderIndex)
+               .all())
+    if done_column_id is None and columns:
+        # По умолчанию "готово" - последняя колонка доски
+        done_column_id = columns[-1].ColumnID
+    flow, dwell = cumulative_flow(project_id, columns, date_from, date_to)
+    lead, cycle = completion_times(done_column_id, date_from, date_to) if done_column_id else ([], [])
+    return {
+        'ProjectID': project_id,
+        'date_from': date_from,
+        'date_to': date_to,
+        'DoneColumnID': done_column_id,
+        'cumulative_flow': flow,
+        'dwell': dwell,
+        'lead_time': _percentiles(lead),
+        'cycle_time': _percentiles(cycle)
+    }
+
+
+def default_period(date_from=None, date_to=None, days=30):
+    """Период по умолчанию: days дней, заканчивающихся date_to (сегодня, UTC)"""
+    date_to = date_to or datetime.utcnow().date()
+    return date_from or date_to - timedelta(days=days - 1), date_to
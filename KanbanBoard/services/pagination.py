@@ -0,0 +1,64 @@
+import base64
+import json
+from datetime import datetime
+from flask_restx import abort
+from sqlalchemy import and_, or_
+
+# Ограничения размера страницы для списков
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+
+
+def encode_cursor(*values):
+    """Упаковка значений ключа последней строки в непрозрачный токен"""
+    raw = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(raw).encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, *types):
+    """Распаковка токена курсора; types - типы значений ключа (datetime, int, ...)"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if len(raw) != len(types):
+            raise ValueError(token)
+        return [
+            None if value is None else
+            datetime.fromisoformat(value) if type_ is datetime else type_(value)
+            for type_, value in zip(types, raw)
+        ]
+    except (ValueError, TypeError):
+        abort(400, 'Некорректный курсор')
+
+
+def keyset_filter(columns, values, descending=False):
+    """Условие "строго после курсора" для сортировки по набору колонок.
+
+    Для (a, b) по возрастанию: a > :a OR (a = :a AND b > :b).
+    Записывается без сравнения кортежей, чтобы работать во всех СУБД.
+    """
+    conditions = []
+    for i, column in enumerate(columns):
+        equal = [columns[j] == values[j] for j in range(i)]
+        step = column < values[i] if descending else column > values[i]
+        conditions.append(and_(*equal, step))
+    return or_(*conditions)
+
+
+def paginate(query, columns, limit, cursor=None, types=None, descending=False):
+    """Одна страница keyset-пагинации.
+
+    Возвращает (строки, токен следующей страницы или None). Выбирается
+    limit + 1 строка, чтобы узнать о наличии следующей страницы без COUNT.
+    """
+    if cursor:
+        values = decode_cursor(cursor, *(types or ()))
+        query = query.filter(keyset_filter(columns, values, descending))
+    order = [c.desc() for c in columns] if descending else list(columns)
+    rows = query.order_by(*order).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(*(getattr(last, c.key) for c in columns))
+    return rows, next_cursor
@@ -0,0 +1,111 @@
+"""Хеширование паролей: настраиваемая политика и пул процессов для проверки.
+
+PASSWORD_HASH_METHOD задает метод werkzeug (например, scrypt:32768:8:1 или
+pbkdf2:sha256:600000). Хеши, созданные по другой политике, проверяются как
+обычно и при успешном входе пересчитываются по текущей (needs_rehash).
+
+Хеширование занимает CPU на десятки миллисекунд, поэтому выполняется в пуле
+из PASSWORD_POOL_SIZE процессов (0 - в потоке запроса, для тестов). Пул
+ограничен: одновременно в нем не больше PASSWORD_POOL_QUEUE задач, а
+запрос, не дождавшийся места за PASSWORD_POOL_TIMEOUT секунд, получает 503.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from flask_restx import abort
+from werkzeug.security import generate_password_hash, check_password_hash
+
+DEFAULT_METHOD = 'scrypt'
+
+
+class PasswordHasher:
+    def __init__(self, method=DEFAULT_METHOD, pool_size=0, queue_size=None, timeout=10.0):
+        self.method = method
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._queue_size = queue_size
+        self._prefix = None
+        self._pool = None
+        self._slots = None
+        self._lock = threading.Lock()
+
+    def configure(self, method=None, pool_size=None, queue_size=None, timeout=None):
+        self.shutdown()
+        if method is not None:
+            self.method = method
+        if pool_size is not None:
+            self.pool_size = pool_size
+        if timeout is not None:
+            self.timeout = timeout
+        self._queue_size = queue_size
+        self._prefix = None
+
+    @property
+    def prefix(self):
+        """Полная запись метода с параметрами, как она сохраняется в начале хеша"""
+        if self._prefix is None:
+            self._prefix = generate_password_hash('', method=self.method).split('$', 1)[0]
+        return self._prefix
+
+    def needs_rehash(self, pwhash):
+        return pwhash.split('$', 1)[0] != self.prefix
+
+    def hash(self, password):
+        return self._call(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        return self._call(check_password_hash, pwhash, password)
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                # spawn: пул создается в многопоточном процессе, fork здесь небезопасен
+                self._pool = ProcessPoolExecutor(max_workers=self.pool_size,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+                self._slots = threading.BoundedSemaphore(self._queue_size or self.pool_size * 4)
+            return self._pool, self._slots
+
+    def _call(self, func, *args):
+        if not self.pool_size:
+            return func(*args)
+        pool, slots = self._executor()
+        if not slots.acquire(timeout=self.timeout):
+            abort(503, 'Сервер перегружен, повторите вход позже')
+        try:
+            return pool.submit(func, *args).result(timeout=self.timeout)
+        except FutureTimeout:
+            abort(503, 'Сервер перегружен, повторите вход позже')
+        finally:
+            slots.release()
+
+
+hasher = PasswordHasher()
+
+
+def init_passwords(app):
+    """Настройка политики хеширования и пула из конфигурации приложения"""
+    hasher.configure(
+        method=app.config.get('PASSWORD_HASH_METHOD'),
+        pool_size=app.config.get('PASSWORD_POOL_SIZE'),
+        queue_size=app.config.get('PASSWORD_POOL_QUEUE'),
+        timeout=app.config.get('PASSWORD_POOL_TIMEOUT')
+    )
+
+
+def hash_password(password):
+    return hasher.hash(password)
+
+
+def verify_password(pwhash, password):
+    return hasher.verify(pwhash, password)
+
+
+def needs_rehash(pwhash):
+    return hasher.needs_rehash(pwhash)
@@ -0,0 +1,213 @@
+import threading
+from flask import current_app
+from flask_restx import abort
+from sqlalchemy import bindparam, event, func, update
+from sqlalchemy.orm import Session
+from database import db
+from models.column import Column
+from models.project import Project
+from models.task import Task
+from services.ranking import rank_between, evenly_spaced, needs_rebalance
+from services.versioning import project_revision
+
+# Попыток фонового пересчета, если группу параллельно изменили
+REBALANCE_ATTEMPTS = 3
+
+# Упорядочиваемые сущности: модель -> (ключ, родитель, внутри которого задается порядок)
+_GROUPS = {
+    Task: (Task.TaskID, Task.ColumnID),
+    Column: (Column.ColumnID, Column.ProjectID),
+}
+
+
+def _live(model, query):
+    """Без колонок, помеченных на удаление (их строки удаляет задание)"""
+    return query.filter(Column.DeletedAt.is_(None)) if model is Column else query
+
+
+def _siblings(model, parent_id, exclude_id=None):
+    key, parent = _GROUPS[model]
+    query = _live(model, db.session.query(model.Position).filter(parent == parent_id, model.Position.isnot(None)))
+    if exclude_id is not None:
+        query = query.filter(key != exclude_id)
+    return query
+
+
+def _neighbor_position(model, parent_id, neighbor_id, exclude_id):
+    """Ключ соседа, который должен находиться в той же группе"""
+    key, parent = _GROUPS[model]
+    if neighbor_id == exclude_id:
+        abort(422, 'Элемент не может быть соседом самого себя')
+    row = _live(model, db.session.query(parent, model.Position).filter(key == neighbor_id)).first()
+    if row is None:
+        abort(404, f'Элемент {neighbor_id} не найден')
+    if row[0] != parent_id:
+        abort(422, f'Элемент {neighbor_id} находится в другой группе')
+    return row[1]
+
+
+def _neighbor_bounds(model, parent_id, before_id, after_id, exclude_id):
+    """Ключи соседей (low, high), между которыми встанет элемент"""
+    key, _ = _GROUPS[model]
+    siblings = _siblings(model, parent_id, exclude_id)
+    low = high = None
+    if after_id is not None:
+        low = _neighbor_position(model, parent_id, after_id, exclude_id)
+    if before_id is not None:
+        high = _neighbor_position(model, parent_id, before_id, exclude_id)
+    # Ближайший ключ ищется нестрого: элемент с тем же ключом, что у соседа,
+    # дает low == high, и группа пересчитывается
+    if after_id is not None and before_id is None:
+        high = (siblings.filter(model.Position >= low, key != after_id)
+                .with_entities(func.min(model.Position)).scalar()
+                if low is not None else None)
+    elif before_id is not None and after_id is None:
+        low = (siblings.filter(model.Position <= high, key != before_id)
+               .with_entities(func.max(model.Position)).scalar()
+               if high is not None else None)
+    elif after_id is None and before_id is None:
+        low = siblings.with_entities(func.max(model.Position)).scalar()
+    return low, high
+
+
+def position_for(model, parent_id, before_id=None, after_id=None, exclude_id=None):
+    """Ключ для вставки элемента после after_id и/или перед before_id.
+
+    Без соседей элемент ставится в конец. Нужен не более чем один запрос
+    на каждого соседа плюс один запрос на ближайший ключ, независимо от
+    размера группы.
+    """
+    if model is Task and db.session.query(Column.ColumnID).filter(
+            Column.ColumnID == parent_id, Column.DeletedAt.is_(None)).first() is None:
+        # Проверка по базе, а не по кэшу доступа: колонку могли удалить в
+        # другом воркере, и задача не должна попасть в нее перед очисткой
+        abort(404, f'Колонка {parent_id} не найдена')
+    low, high = _neighbor_bounds(model, parent_id, before_id, after_id, exclude_id)
+    if low is not None and low == high and after_id != before_id:
+        # Одинаковые ключи у соседей (одновременные вставки в конец группы):
+        # ключи пересчитываются в этой же транзакции, место ищется заново
+        _respace(model, parent_id)
+        low, high = _neighbor_bounds(model, parent_id, before_id, after_id, exclude_id)
+    try:
+        position = rank_between(low, high)
+    except ValueError:
+        abort(422, 'after_id должен находиться перед before_id')
+    if needs_rebalance(position):
+        schedule_rebalance(model, parent_id)
+    return position
+
+
+def positions_at_end(model, parent_ids):
+    """Последний ключ каждой группы одним запросом: parent_id -> ключ или None"""
+    key, parent = _GROUPS[model]
+    if not parent_ids:
+        return {}
+    rows = (db.session.query(parent, func.max(model.Position))
+            .filter(parent.in_(parent_ids))
+            .group_by(parent)
+            .all())
+    result = dict.fromkeys(parent_ids)
+    result.update(rows)
+    return result
+
+
+def column_position_for_order_index(project_id, order_index, exclude_id=None):
+    """Ключ колонки по устаревшему OrderIndex: после последней колонки с OrderIndex <= заданного"""
+    previous = (Column.query
+                .filter(Column.ProjectID == project_id, Column.OrderIndex <= order_index,
+                        Column.Position.isnot(None), Column.DeletedAt.is_(None))
+                .filter(Column.ColumnID != exclude_id)
+                .order_by(Column.OrderIndex.desc(), Column.Position.desc())
+                .with_entities(Column.ColumnID)
+                .first())
+    if previous is not None:
+        return position_for(Column, project_id, after_id=previous[0], exclude_id=exclude_id)
+    first = (_siblings(Column, project_id, exclude_id)
+             .with_entities(Column.ColumnID).order_by(Column.Position).first())
+    return position_for(Column, project_id, before_id=first[0] if first else None, exclude_id=exclude_id)
+
+
+def _group_project(model, parent_id):
+    return parent_id if model is Column else (
+        db.session.query(Column.ProjectID).filter_by(ColumnID=parent_id).scalar()
+    )
+
+
+def _respace(model, parent_id):
+    """Равномерные ключи группы в текущей транзакции; порядок - (ключ, ID)"""
+    key, parent = _GROUPS[model]
+    ids = [row[0] for row in db.session.query(key)
+           .filter(parent == parent_id)
+           .order_by(model.Position, key)
+           .all()]
+    if ids:
+        # UPDATE по таблице, а не через ORM: пересчет порядка не меняет версии
+        # строк (Version) и не вызывает конфликтов у клиентов
+        table = model.__table__
+        db.session.execute(
+            table.update().where(table.c[key.key] == bindparam('row_id')).values(Position=bindparam('new_position')),
+            [{'row_id': row_id, 'new_position': position}
+             for row_id, position in zip(ids, evenly_spaced(len(ids)))]
+        )
+
+
+def rebalance(model, parent_id):
+    """Равномерный пересчет ключей группы; сохраняет текущий порядок.
+
+    Ключи считаются по прочитанному порядку, поэтому пересчет фиксируется,
+    только если ревизия проекта не изменилась с его начала (любое
+    перемещение ее увеличивает); иначе он откатывается и повторяется, чтобы
+    не затереть параллельное перемещение.
+    """
+    project_id = _group_project(model, parent_id)
+    for _ in range(REBALANCE_ATTEMPTS):
+        revision = project_revision(project_id)
+        if revision is None:
+            return
+        _respace(model, parent_id)
+        unchanged = db.session.execute(
+            update(Project).where(Project.ProjectID == project_id, Project.Revision == revision)
+            .values(Revision=Project.Revision + 1)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if unchanged:
+            db.session.commit()
+            return
+        db.session.rollback()
+
+
+# Группы, для которых уже выполняется фоновый пересчет
+_running = set()
+_running_lock = threading.Lock()
+
+
+def schedule_rebalance(model, parent_id):
+    """Фоновый пересчет ключей группы после фиксации текущей транзакции"""
+    app = current_app._get_current_object()
+    db.session.info.setdefault('rebalance', {})[(model, parent_id)] = app
+
+
+@event.listens_for(Session, 'after_commit')
+def _start_rebalance(session):
+    for (model, parent_id), app in session.info.pop('rebalance', {}).items():
+        group = (model.__tablename__, parent_id)
+        with _running_lock:
+            if group in _running:
+                continue
+            _running.add(group)
+        threading.Thread(target=_rebalance_in_background, args=(app, model, parent_id, group),
+                         name=f'rebalance-{group[0]}-{parent_id}', daemon=True).start()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _cancel_rebalance(session):
+    session.info.pop('rebalance', None)
+
+
+def _rebalance_in_background(app, model, parent_id, group):
+    try:
+        with app.app_context():
+            rebalance(model, parent_id)
+    finally:
+        with _running_lock:
+            _running.discard(group)
@@ -0,0 +1,104 @@
+"""Лексикографические ключи порядка (дробная индексация).
+
+Ключ - строка из цифр и строчных латинских букв; порядок элементов
+совпадает с обычным сравнением строк. Между любыми двумя ключами можно
+получить новый, поэтому перестановка элемента меняет одну строку, а не
+перенумеровывает соседей. Строчные буквы выбраны, чтобы порядок не зависел
+от регистронезависимых сопоставлений (например, в SQL Server).
+
+Вставка в конец (и в начало) - обычный путь создания задач - не делит
+интервал до края пополам, а сдвигает ключ на единицу последнего разряда:
+длина не растет, а evenly_spaced оставляет с обеих сторон запас не меньше
+числа элементов. Поэтому пересчет группы нужен не чаще, чем раз на
+порядка n вставок в конец, а не каждые ~130.
+"""
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+BASE = len(DIGITS)
+
+# Длина ключа, после которой ключи колонки/проекта пересчитываются заново
+REBALANCE_THRESHOLD = 24
+
+
+def _midpoint(a, b):
+    """Ключ строго между a и b; a='' - начало, b=None - конец"""
+    if b is not None:
+        # Общий префикс переносится в результат как есть
+        n = 0
+        while n < len(b) and (a[n] if n < len(a) else '0') == b[n]:
+            n += 1
+        if n > 0:
+            return b[:n] + _midpoint(a[n:], b[n:])
+    digit_a = DIGITS.index(a[0]) if a else 0
+    digit_b = DIGITS.index(b[0]) if b is not None else BASE
+    if digit_b - digit_a > 1:
+        return DIGITS[(digit_a + digit_b) // 2]
+    # Соседние цифры: берем первую цифру b, если после нее еще что-то есть,
+    # иначе продолжаем после первой цифры a
+    if b is not None and len(b) > 1:
+        return b[0]
+    return DIGITS[digit_a] + _midpoint(a[1:], None)
+
+
+def _step(key, delta):
+    """Соседний ключ той же длины (delta = 1 или -1); None при выходе за край.
+
+    Значения, оканчивающиеся нулевой цифрой, пропускаются: перед таким
+    ключом нельзя вставить другой той же длины.
+    """
+    digits = [DIGITS.index(char) for char in key]
+    while True:
+        i = len(digits) - 1
+        while i >= 0:
+            digits[i] += delta
+            if 0 <= digits[i] < BASE:
+                break
+            digits[i] %= BASE
+            i -= 1
+        if i < 0:
+            return None
+        if digits[-1] != 0:
+            return ''.join(DIGITS[digit] for digit in digits)
+
+
+def rank_between(before=None, after=None):
+    """Новый ключ между соседями: before < результат < after (None - край списка)"""
+    before = before or ''
+    if after is not None and before >= after:
+        raise ValueError(f'Ключи не упорядочены: {before!r} >= {after!r}')
+    # У края - ближайший ключ той же длины; при исчерпании - середина интервала
+    if after is None and before:
+        return _step(before, 1) or _midpoint(before, None)
+    if after is not None and not before:
+        key = _step(after, -1)
+        if key is not None:
+            return key
+    return _midpoint(before, after)
+
+
+def evenly_spaced(count):
+    """count ключей одинаковой длины, равномерно распределенных по средней
+    половине диапазона: до первого и после последнего остается не меньше
+    count значений для вставок в начало и в конец"""
+    width = 1
+    while BASE ** width < 4 * (count + 1):
+        width += 1
+    size = BASE ** width
+    step = size / 2 / (count + 1)
+    keys = []
+    for i in range(1, count + 1):
+        value = size // 4 + int(step * i)
+        # Ключ не должен оканчиваться нулевой цифрой, иначе перед ним нельзя
+        # вставить; шаг не меньше 2, поэтому порядок сохраняется
+        if value % BASE == 0:
+            value += 1
+        digits = []
+        for _ in range(width):
+            value, digit = divmod(value, BASE)
+            digits.append(DIGITS[digit])
+        keys.append(''.join(reversed(digits)))
+    return keys
+
+
+def needs_rebalance(key):
+    return len(key) > REBALANCE_THRESHOLD
+
@@ -0,0 +1,59 @@
+"""Ограничение частоты попыток входа (в пределах процесса).
+
+Окно фиксированной длины: ключ (имя пользователя или IP) может сделать
+не больше limit попыток за window секунд. Число хранимых ключей
+ограничено, старые вытесняются первыми.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+
+class RateLimiter:
+    def __init__(self, limit, window=60, maxsize=100000):
+        self.limit = limit
+        self.window = window
+        self.maxsize = maxsize
+        self._hits = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key):
+        """Учет попытки; None - разрешено, иначе число секунд до открытия окна"""
+        if not self.limit:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            started, count = self._hits.get(key, (now, 0))
+            if now - started >= self.window:
+                started, count = now, 0
+            if count >= self.limit:
+                return max(math.ceil(started + self.window - now), 1)
+            self._hits[key] = (started, count + 1)
+            self._hits.move_to_end(key)
+            while len(self._hits) > self.maxsize:
+                self._hits.popitem(last=False)
+        return None
+
+    def reset(self, key):
+        with self._lock:
+            self._hits.pop(key, None)
+
+    def configure(self, limit=None, window=None):
+        if limit is not None:
+            self.limit = limit
+        if window is not None:
+            self.window = window
+        with self._lock:
+            self._hits.clear()
+
+
+# Попытки входа по имени пользователя и по IP-адресу клиента
+login_user_limiter = RateLimiter(limit=10)
+login_ip_limiter = RateLimiter(limit=50)
+
+
+def init_rate_limits(app):
+    window = app.config.get('LOGIN_RATE_WINDOW')
+    login_user_limiter.configure(app.config.get('LOGIN_RATE_LIMIT_USER'), window)
+    login_ip_limiter.configure(app.config.get('LOGIN_RATE_LIMIT_IP'), window)
@@ -0,0 +1,197 @@
+"""Полнотекстовый поиск по задачам и логам задач.
+
+Для SQLite используются виртуальные таблицы FTS5 (rowid совпадает с
+TaskID/LogID), которые обновляются из обработчиков записи в той же
+транзакции. Для других СУБД и сборок SQLite без FTS5 поиск выполняется
+через LIKE по исходным таблицам: результат тот же, но без индекса.
+"""
+import re
+from sqlalchemy import Integer, inspect, or_, text, case, literal
+from database import db
+from models.column import Column
+from models.task import Task
+from models.task_log import TaskLog
+
+TASKS_FTS = 'tasks_fts'
+LOGS_FTS = 'task_logs_fts'
+
+# Вес совпадения в заголовке относительно описания для bm25
+TITLE_WEIGHT = 10.0
+
+# Наличие FTS-таблиц в базе по URL движка (проверяется один раз на процесс)
+_fts_available = {}
+
+
+def create_fts_tables(conn):
+    """Создание FTS5-таблиц; False, если СУБД или сборка SQLite их не поддерживает"""
+    if conn.dialect.name != 'sqlite':
+        return False
+    try:
+        with conn.begin_nested():
+            conn.execute(text(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {TASKS_FTS} USING fts5('
+                'Title, Description, tokenize="unicode61 remove_diacritics 2")'
+            ))
+            conn.execute(text(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {LOGS_FTS} USING fts5('
+                'Message, tokenize="unicode61 remove_diacritics 2")'
+            ))
+    except Exception:
+        return False
+    return True
+
+
+def fts_enabled():
+    key = str(db.engine.url)
+    if key not in _fts_available:
+        # Проверка через соединение текущей сессии, чтобы не занимать второе соединение из пула
+        conn = db.session.connection()
+        _fts_available[key] = (conn.dialect.name == 'sqlite'
+                               and inspect(conn).has_table(TASKS_FTS)
+                               and inspect(conn).has_table(LOGS_FTS))
+    return _fts_available[key]
+
+
+def _ids_param(ids):
+    return ','.join(str(int(i)) for i in ids)
+
+
+def index_tasks(task_ids):
+    """Переиндексация задач (после flush, до commit)"""
+    if not task_ids or not fts_enabled():
+        return
+    ids = _ids_param(task_ids)
+    db.session.execute(text(f'DELETE FROM {TASKS_FTS} WHERE rowid IN ({ids})'))
+    db.session.execute(text(
+        f'INSERT INTO {TASKS_FTS} (rowid, Title, Description) '
+        f'SELECT "TaskID", "Title", COALESCE("Description", \'\') FROM tasks WHERE "TaskID" IN ({ids})'
+    ))
+
+
+def index_logs(log_ids):
+    """Индексация новых записей лога (после flush, до commit)"""
+    if not log_ids or not fts_enabled():
+        return
+    ids = _ids_param(log_ids)
+    db.session.execute(text(f'DELETE FROM {LOGS_FTS} WHERE rowid IN ({ids})'))
+    db.session.execute(text(
+        f'INSERT INTO {LOGS_FTS} (rowid, Message) '
+        f'SELECT "LogID", "Message" FROM task_logs WHERE "LogID" IN ({ids})'
+    ))
+
+
+def remove_logs(log_ids):
+    """Удаление записей лога из индекса (до удаления строк)"""
+    if not log_ids or not fts_enabled():
+        return
+    db.session.execute(text(f'DELETE FROM {LOGS_FTS} WHERE rowid IN ({_ids_param(log_ids)})'))
+
+
+def remove_tasks(task_ids):
+    """Удаление задач и их логов из индекса (до удаления строк)"""
+    if not task_ids or not fts_enabled():
+        return
+    ids = _ids_param(task_ids)
+    db.session.execute(text(f'DELETE FROM {TASKS_FTS} WHERE rowid IN ({ids})'))
+    db.session.execute(text(
+        f'DELETE FROM {LOGS_FTS} WHERE rowid IN (SELECT "LogID" FROM task_logs WHERE "TaskID" IN ({ids}))'
+    ))
+
+
+def rebuild(conn):
+    """Полное перестроение индекса по текущим данным"""
+    if not create_fts_tables(conn):
+        return False
+    conn.execute(text(f'DELETE FROM {TASKS_FTS}'))
+    conn.execute(text(f'DELETE FROM {LOGS_FTS}'))
+    conn.execute(text(
+        f'INSERT INTO {TASKS_FTS} (rowid, Title, Description) '
+        'SELECT "TaskID", "Title", COALESCE("Description", \'\') FROM tasks'
+    ))
+    conn.execute(text(f'INSERT INTO {LOGS_FTS} (rowid, Message) SELECT "LogID", "Message" FROM task_logs'))
+    conn.execute(text(f"INSERT INTO {TASKS_FTS}({TASKS_FTS}) VALUES ('optimize')"))
+    conn.execute(text(f"INSERT INTO {LOGS_FTS}({LOGS_FTS}) VALUES ('optimize')"))
+    _fts_available.clear()
+    return True
+
+
+def _terms(query):
+    return [term for term in re.split(r'[^\w]+', query, flags=re.UNICODE) if term]
+
+
+def _fts_query(terms):
+    """Запрос FTS5 из слов пользователя: все слова, последнее - как префикс"""
+    quoted = ['"' + term.replace('"', '""') + '"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def search(project_id, query, limit, offset):
+    """Результаты поиска в проекте, от наиболее релевантных"""
+    terms = _terms(query)
+    if not terms:
+        return []
+    if fts_enabled():
+        return _search_fts(project_id, terms, limit, offset)
+    return _search_like(project_id, terms, limit, offset)
+
+
+def _search_fts(project_id, terms, limit, offset):
+    rows = db.session.execute(text(f'''
+        SELECT kind, "TaskID", "LogID", "ColumnID", "Title", snippet_text, score FROM (
+            SELECT 'task' AS kind, t."TaskID", NULL AS "LogID", t."ColumnID", t."Title",
+                   snippet({TASKS_FTS}, -1, '[', ']', '...', 12) AS snippet_text,
+                   bm25({TASKS_FTS}, :title_weight, 1.0) AS score
+            FROM {TASKS_FTS}
+            JOIN tasks t ON t."TaskID" = {TASKS_FTS}.rowid
+            JOIN columns c ON c."ColumnID" = t."ColumnID"
+            WHERE {TASKS_FTS} MATCH :query AND c."ProjectID" = :project_id AND c."DeletedAt" IS NULL
+            UNION ALL
+            SELECT 'log' AS kind, t."TaskID", l."LogID", t."ColumnID", t."Title",
+                   snippet({LOGS_FTS}, 0, '[', ']', '...', 12) AS snippet_text,
+                   bm25({LOGS_FTS}) AS score
+            FROM {LOGS_FTS}
+            JOIN task_logs l ON l."LogID" = {LOGS_FTS}.rowid
+            JOIN tasks t ON t."TaskID" = l."TaskID"
+            JOIN columns c ON c."ColumnID" = t."ColumnID"
+            WHERE {LOGS_FTS} MATCH :query AND c."ProjectID" = :project_id AND c."DeletedAt" IS NULL
+        )
+        ORDER BY score, "TaskID", "LogID"
+        LIMIT :limit OFFSET :offset
+    '''), {'query': _fts_query(terms), 'project_id': project_id, 'title_weight': TITLE_WEIGHT,
+           'limit': limit, 'offset': offset})
+    # bm25 в SQLite отрицателен: чем меньше, тем релевантнее
+    return [
+        {'kind': kind, 'TaskID': task_id, 'LogID': log_id, 'ColumnID': column_id,
+         'Title': title, 'Snippet': snippet, 'Score': -score}
+        for kind, task_id, log_id, column_id, title, snippet, score in rows
+    ]
+
+
+def _search_like(project_id, terms, limit, offset):
+    """Запасной поиск без индекса: все слова в заголовке/описании или в сообщении лога"""
+    def matches(*columns):
+        return [or_(*(column.icontains(term, autoescape=True) for column in columns)) for term in terms]
+
+    title_hit = case((Task.Title.icontains(terms[0], autoescape=True), 1), else_=0)
+    tasks = (db.session.query(literal('task').label('kind'), Task.TaskID.label('TaskID'),
+                              literal(None, Integer).label('LogID'), Task.ColumnID.label('ColumnID'),
+                              Task.Title.label('Title'), Task.Description.label('snippet'),
+                              (1 + title_hit).label('score'))
+             .join(Column, Column.ColumnID == Task.ColumnID)
+             .filter(Column.ProjectID == project_id, Column.DeletedAt.is_(None),
+                     *matches(Task.Title, Task.Description)))
+    logs = (db.session.query(literal('log'), Task.TaskID, TaskLog.LogID, Task.ColumnID,
+                             Task.Title, TaskLog.Message, literal(1))
+            .join(Task, Task.TaskID == TaskLog.TaskID)
+            .join(Column, Column.ColumnID == Task.ColumnID)
+            .filter(Column.ProjectID == project_id, Column.DeletedAt.is_(None), *matches(TaskLog.Message)))
+    union = tasks.union_all(logs).subquery()
+    rows = (db.session.query(union)
+            .order_by(union.c.score.desc(), union.c.TaskID, union.c.LogID)
+            .limit(limit).offset(offset).all())
+    return [
+        {'kind': kind, 'TaskID': task_id, 'LogID': log_id, 'ColumnID': column_id,
+         'Title': title, 'Snippet': snippet, 'Score': float(score)}
+        for kind, task_id, log_id, column_id, title, snippet, score in rows
+    ]
@@ -0,0 +1,188 @@
+"""Выдача JWT: access/refresh-токены, ротация и отзыв.
+
+Access-токен несет роли пользователя в проектах (claim prj) и версию
+состава его проектов (claim pv, users.MembershipVersion). Пока версия в
+токене совпадает с текущей, проверки доступа отвечают по токену без
+запросов к ProjectMember (services/access.py); любое изменение участников
+увеличивает версию, и устаревший токен проверяется по базе.
+
+Refresh-токен одноразовый: при обновлении он отзывается и выдается новая
+пара того же семейства (claim fam). Повторное предъявление уже замененного
+токена означает утечку, поэтому отзывается все семейство. Отозванные
+идентификаторы хранятся до истечения срока токена в хранилище
+REVOCATION_STORE: по умолчанию - таблица revoked_tokens, общая для всех
+воркеров; MemoryRevocationStore (память процесса) подходит только для
+одного процесса, с несколькими воркерами gunicorn не запускается.
+"""
+import heapq
+import threading
+import time
+import uuid
+from flask_jwt_extended import create_access_token, create_refresh_token, get_jwt_identity
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from werkzeug.utils import import_string
+from database import db, jwt
+from models.project_member import ProjectMember
+from models.revoked_token import RevokedToken
+from models.user import User
+
+# Больше проектов в токен не кладется: проверки идут через базу
+MAX_TOKEN_PROJECTS = 200
+
+
+class RevocationStore:
+    """Интерфейс хранилища отозванных токенов"""
+
+    def add(self, key, expires_at):
+        """Отзыв ключа до момента expires_at (UNIX-время)"""
+        raise NotImplementedError
+
+    def contains(self, key):
+        raise NotImplementedError
+
+    def revoked(self, keys):
+        """Отозванные ключи из keys"""
+        return {key for key in keys if self.contains(key)}
+
+
+class MemoryRevocationStore(RevocationStore):
+    """Отозванные ключи в памяти процесса; записи удаляются по истечении срока"""
+
+    def __init__(self):
+        self._expires = {}
+        self._heap = []
+        self._lock = threading.Lock()
+
+    def add(self, key, expires_at):
+        with self._lock:
+            self._purge(time.time())
+            if expires_at > self._expires.get(key, 0):
+                self._expires[key] = expires_at
+                heapq.heappush(self._heap, (expires_at, key))
+
+    def contains(self, key):
+        with self._lock:
+            expires_at = self._expires.get(key)
+            return expires_at is not None and expires_at > time.time()
+
+    def __len__(self):
+        return len(self._expires)
+
+    def _purge(self, now):
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, key = heapq.heappop(self._heap)
+            if self._expires.get(key) == expires_at:
+                del self._expires[key]
+
+
+class DatabaseRevocationStore(RevocationStore):
+    """Отозванные ключи в таблице revoked_tokens, общей для всех воркеров.
+
+    Запись идет в отдельной транзакции соединения, а не в сессии запроса:
+    отзыв фиксируется сразу, в том числе из проверки токена до обработчика.
+    """
+
+    def add(self, key, expires_at):
+        expires_at = int(expires_at)
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(delete(RevokedToken).where(RevokedToken.ExpiresAt <= int(time.time())))
+                if conn.scalar(select(RevokedToken.ExpiresAt).where(RevokedToken.Key == key)) is None:
+                    conn.execute(insert(RevokedToken).values(Key=key, ExpiresAt=expires_at))
+                else:
+                    conn.execute(update(RevokedToken)
+                                 .where(RevokedToken.Key == key, RevokedToken.ExpiresAt < expires_at)
+                                 .values(ExpiresAt=expires_at))
+        except IntegrityError:
+            # Тот же ключ одновременно отозвал другой воркер
+            pass
+
+    def contains(self, key):
+        return bool(self.revoked([key]))
+
+    def revoked(self, keys):
+        # Один запрос по первичному ключу на проверку токена
+        with db.engine.connect() as conn:
+            return set(conn.scalars(select(RevokedToken.Key).where(
+                RevokedToken.Key.in_(list(keys)), RevokedToken.ExpiresAt > int(time.time())
+            )))
+
+
+store = DatabaseRevocationStore()
+
+
+def init_tokens(app):
+    """Выбор хранилища отозванных токенов из конфигурации приложения"""
+    global store
+    backend = app.config.get('REVOCATION_STORE')
+    if backend:
+        store = import_string(backend)() if isinstance(backend, str) else backend
+    else:
+        store = DatabaseRevocationStore()
+
+
+def current_user_id():
+    """ID пользователя из токена (subject хранится строкой)"""
+    return int(get_jwt_identity())
+
+
+def membership_claims(user_id):
+    """Роли пользователя в проектах и версия их состава - одним запросом каждое"""
+    version = db.session.query(User.MembershipVersion).filter_by(UserID=user_id).scalar() or 0
+    rows = (db.session.query(ProjectMember.ProjectID, ProjectMember.Role)
+            .filter_by(UserID=user_id)
+            .limit(MAX_TOKEN_PROJECTS + 1)
+            .all())
+    if len(rows) > MAX_TOKEN_PROJECTS:
+        return {'pv': version}
+    return {'pv': version, 'prj': {str(project_id): role for project_id, role in rows}}
+
+
+def issue_tokens(user_id, family=None):
+    """Пара access/refresh-токенов; family - семейство при ротации"""
+    identity = str(user_id)
+    return {
+        'access_token': create_access_token(identity=identity, additional_claims=membership_claims(user_id)),
+        'refresh_token': create_refresh_token(identity=identity,
+                                              additional_claims={'fam': family or uuid.uuid4().hex})
+    }
+
+
+def revoke(claims, family=False):
+    """Отзыв токена (и его семейства) до истечения срока"""
+    store.add(claims['jti'], claims['exp'])
+    if family and claims.get('fam'):
+        store.add('fam:' + claims['fam'], claims['exp'])
+
+
+def rotate(claims):
+    """Замена refresh-токена новой парой того же семейства"""
+    revoke(claims)
+    return issue_tokens(int(claims['sub']), family=claims.get('fam'))
+
+
+def bump_membership_version(*user_ids):
+    """Увеличение версии состава проектов; вызывается до фиксации транзакции"""
+    ids = {user_id for user_id in user_ids if user_id is not None}
+    if ids:
+        db.session.execute(
+            update(User).where(User.UserID.in_(ids))
+            .values(MembershipVersion=User.MembershipVersion + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+
+@jwt.token_in_blocklist_loader
+def _is_revoked(jwt_header, jwt_payload):
+    family = jwt_payload.get('fam')
+    keys = [jwt_payload['jti']] + (['fam:' + family] if family else [])
+    revoked = store.revoked(keys)
+    if family and 'fam:' + family in revoked:
+        return True
+    if jwt_payload['jti'] in revoked:
+        if jwt_payload.get('type') == 'refresh' and family:
+            # Уже замененный refresh-токен предъявлен повторно: отзываем семейство
+            store.add('fam:' + family, jwt_payload['exp'])
+        return True
+    return False
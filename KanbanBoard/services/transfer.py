@@ -0,0 +1,428 @@
+"""Экспорт и импорт проекта целиком: NDJSON (все данные) и CSV (только задачи).
+
+Экспорт - генератор строк: данные читаются порциями (yield_per) и сразу
+отдаются клиенту, проект целиком в памяти не собирается. Записи NDJSON
+идут в порядке project, user, column, member, task, log, flow - в том же
+порядке их ожидает импорт. Каждая запись - объект с полем type и полями
+модели; пользователи переносятся по Username.
+
+Импорт читает строки по одной и вставляет задачи и логи пачками по
+chunk_size строк, каждая пачка - отдельная транзакция. Старые ID задач и
+колонок заменяются новыми (IdMap). Пока импорт не завершен, проект скрыт
+(DeletedAt); при ошибке недоимпортированные данные удаляет фоновое задание
+(services/jobs.py).
+"""
+import csv
+import io
+import json
+from array import array
+from bisect import bisect_left
+from datetime import date, datetime
+from sqlalchemy import func, insert, or_, select, update
+from database import db
+from models.column import Column
+from models.column_flow import ColumnFlowDaily
+from models.project import Project
+from models.project_member import ProjectMember
+from models.task import Task
+from models.task_log import TaskLog
+from models.user import User
+from services import search
+from services.access import invalidate_membership
+from services.ranking import rank_between
+from services.tokens import bump_membership_version
+
+# Версия формата NDJSON в записи project
+FORMAT_VERSION = 1
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# Поля записей NDJSON по типам
+COLUMN_FIELDS = ('ColumnID', 'Name', 'OrderIndex', 'Position')
+TASK_FIELDS = ('TaskID', 'Title', 'Description', 'ColumnID', 'Position', 'CreatedBy', 'CreatedAt', 'UpdatedAt')
+LOG_FIELDS = ('LogID', 'TaskID', 'UserID', 'Action', 'Message', 'FromColumnID', 'ToColumnID', 'CreatedAt')
+FLOW_FIELDS = ('ColumnID', 'Day', 'Entered', 'Exited', 'DwellSeconds')
+
+# Колонки CSV задач
+CSV_FIELDS = ('TaskID', 'Column', 'Title', 'Description', 'CreatedBy', 'CreatedAt', 'UpdatedAt')
+
+
+class TransferError(ValueError):
+    """Некорректные данные импорта"""
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(value)
+
+
+def _dumps(record):
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=_json_default) + '\n'
+
+
+def _stream(stmt, record_type, chunk_size):
+    """Строки NDJSON результата запроса, по одной порции на yield"""
+    result = db.session.execute(stmt.execution_options(yield_per=chunk_size))
+    for rows in result.partitions():
+        yield ''.join(_dumps({'type': record_type, **row._asdict()}) for row in rows)
+
+
+def _project_columns(project_id):
+    return select(Column.ColumnID).where(Column.ProjectID == project_id, Column.DeletedAt.is_(None))
+
+
+def export_ndjson(project_id, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Проект со всеми данными в формате NDJSON"""
+    project = db.session.get(Project, project_id)
+    yield _dumps({'type': 'project', 'format': FORMAT_VERSION, 'ProjectID': project.ProjectID,
+                  'Name': project.Name, 'Description': project.Description,
+                  'OwnerID': project.OwnerID, 'CreatedAt': project.CreatedAt})
+
+    columns = _project_columns(project_id)
+    tasks = select(Task.TaskID).where(Task.ColumnID.in_(columns))
+    # Все упомянутые пользователи: владелец, участники, авторы задач и логов
+    user_ids = (select(ProjectMember.UserID).where(ProjectMember.ProjectID == project_id)
+                .union(select(Task.CreatedBy).where(Task.ColumnID.in_(columns)),
+                       select(TaskLog.UserID).where(TaskLog.TaskID.in_(tasks))))
+    yield from _stream(
+        select(User.UserID, User.Username)
+        .where(or_(User.UserID.in_(user_ids), User.UserID == project.OwnerID)),
+        'user', chunk_size
+    )
+    yield from _stream(
+        select(*(getattr(Column, name) for name in COLUMN_FIELDS))
+        .where(Column.ProjectID == project_id, Column.DeletedAt.is_(None))
+        .order_by(Column.Position, Column.OrderIndex),
+        'column', chunk_size
+    )
+    yield from _stream(
+        select(ProjectMember.UserID, ProjectMember.Role).where(ProjectMember.ProjectID == project_id),
+        'member', chunk_size
+    )
+    # По возрастанию ID: импорт хранит соответствие ID компактно (IdMap)
+    yield from _stream(
+        select(*(getattr(Task, name) for name in TASK_FIELDS))
+        .where(Task.ColumnID.in_(columns)).order_by(Task.TaskID),
+        'task', chunk_size
+    )
+    yield from _stream(
+        select(*(getattr(TaskLog, name) for name in LOG_FIELDS))
+        .where(TaskLog.TaskID.in_(tasks)).order_by(TaskLog.LogID),
+        'log', chunk_size
+    )
+    yield from _stream(
+        select(*(getattr(ColumnFlowDaily, name) for name in FLOW_FIELDS))
+        .where(ColumnFlowDaily.ProjectID == project_id, ColumnFlowDaily.ColumnID.in_(columns)),
+        'flow', chunk_size
+    )
+
+
+def export_csv(project_id, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Задачи проекта в формате CSV (колонка и автор - по имени)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_FIELDS)
+    result = db.session.execute(
+        select(Task.TaskID, Column.Name, Task.Title, Task.Description, User.Username,
+               Task.CreatedAt, Task.UpdatedAt)
+        .join(Column, Column.ColumnID == Task.ColumnID)
+        .outerjoin(User, User.UserID == Task.CreatedBy)
+        .where(Column.ProjectID == project_id, Column.DeletedAt.is_(None))
+        .order_by(Column.Position, Column.OrderIndex, Task.Position)
+        .execution_options(yield_per=chunk_size)
+    )
+    yield buffer.getvalue()
+    for rows in result.partitions():
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue()
+
+
+class IdMap:
+    """Соответствие старых ID новым.
+
+    Пока старые ID добавляются по возрастанию (так их пишет экспорт), пары
+    хранятся в двух массивах по 8 байт на ID и ищутся бинарным поиском;
+    иначе - в словаре.
+    """
+
+    def __init__(self):
+        self._old = array('q')
+        self._new = array('q')
+        self._dict = None
+
+    def add(self, old, new):
+        if self._dict is None and (not self._old or old > self._old[-1]):
+            self._old.append(old)
+            self._new.append(new)
+            return
+        if self._dict is None:
+            self._dict = dict(zip(self._old, self._new))
+            self._old, self._new = array('q'), array('q')
+        self._dict[old] = new
+
+    def get(self, old):
+        if old is None:
+            return None
+        if self._dict is not None:
+            return self._dict.get(old)
+        i = bisect_left(self._old, old)
+        if i < len(self._old) and self._old[i] == old:
+            return self._new[i]
+        return None
+
+    def __len__(self):
+        return len(self._dict) if self._dict is not None else len(self._old)
+
+
+def _parse_datetime(value, field):
+    if value in (None, ''):
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise TransferError(f'{field}: некорректная дата {value!r}')
+
+
+class ProjectImporter:
+    """Создание нового проекта из данных экспорта"""
+
+    def __init__(self, owner_id, name=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.owner_id = owner_id
+        self.name = name
+        self.chunk_size = chunk_size
+        self.project_id = None
+        self.counts = {'columns': 0, 'members': 0, 'tasks': 0, 'logs': 0}
+        self._users = {}
+        self._columns = {}
+        self._tasks = IdMap()
+        self._pending_tasks = []
+        self._pending_logs = []
+        self._flow = []
+        self._last_column_position = None
+        # Пользователи, получившие участие в проекте
+        self._member_ids = set()
+
+    # Записи NDJSON
+
+    def read_ndjson(self, lines):
+        handlers = {'project': self._project, 'user': self._user, 'column': self._column,
+                    'member': self._member, 'task': self._task, 'log': self._log, 'flow': self._flow_row}
+        for number, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+                handler = handlers[record['type']]
+            except (ValueError, KeyError, TypeError):
+                raise TransferError(f'Строка {number}: ожидается JSON-объект с известным type')
+            if record['type'] != 'project' and self.project_id is None:
+                raise TransferError(f'Строка {number}: первой должна быть запись project')
+            try:
+                handler(record)
+            except KeyError as exc:
+                raise TransferError(f'Строка {number}: нет поля {exc.args[0]}')
+        if self.project_id is None:
+            raise TransferError('Нет записи project')
+        return self.finish()
+
+    def _project(self, record):
+        if self.project_id is not None:
+            raise TransferError('Запись project повторяется')
+        if record.get('format', FORMAT_VERSION) > FORMAT_VERSION:
+            raise TransferError(f"Неподдерживаемая версия формата {record['format']}")
+        self._create_project(self.name or record['Name'], record.get('Description'))
+
+    def _user(self, record):
+        # Пользователи сопоставляются по имени; неизвестные заменяются владельцем
+        local_id = db.session.query(User.UserID).filter_by(Username=record['Username']).scalar()
+        self._users[record['UserID']] = local_id or self.owner_id
+
+    def _column(self, record):
+        self._columns[record['ColumnID']] = self._add_column(
+            record['Name'], record.get('OrderIndex') or 0, record.get('Position')
+        )
+
+    def _member(self, record):
+        user_id = self._users.get(record['UserID'])
+        if user_id is None or user_id == self.owner_id or user_id in self._member_ids:
+            return
+        self._member_ids.add(user_id)
+        db.session.add(ProjectMember(ProjectID=self.project_id, UserID=user_id, Role=record.get('Role') or 'member'))
+        self.counts['members'] += 1
+
+    def _task(self, record):
+        column_id = self._columns.get(record['ColumnID'])
+        if column_id is None:
+            raise TransferError(f"Задача {record['TaskID']}: неизвестная колонка {record['ColumnID']}")
+        self._pending_tasks.append((record['TaskID'], {
+            'Title': record['Title'],
+            'Description': record.get('Description'),
+            'ColumnID': column_id,
+            'Position': record.get('Position'),
+            'CreatedBy': self._users.get(record.get('CreatedBy'), self.owner_id),
+            'CreatedAt': _parse_datetime(record.get('CreatedAt'), 'CreatedAt'),
+            'UpdatedAt': _parse_datetime(record.get('UpdatedAt'), 'UpdatedAt'),
+        }))
+        if len(self._pending_tasks) >= self.chunk_size:
+            self._flush_tasks()
+
+    def _log(self, record):
+        self._flush_tasks()
+        task_id = self._tasks.get(record['TaskID'])
+        if task_id is None:
+            raise TransferError(f"Лог {record.get('LogID')}: неизвестная задача {record['TaskID']}")
+        self._pending_logs.append({
+            'TaskID': task_id,
+            'UserID': self._users.get(record.get('UserID'), self.owner_id),
+            'Action': record['Action'],
+            'Message': record['Message'],
+            'FromColumnID': self._columns.get(record.get('FromColumnID')),
+            'ToColumnID': self._columns.get(record.get('ToColumnID')),
+            'CreatedAt': _parse_datetime(record.get('CreatedAt'), 'CreatedAt'),
+        })
+        if len(self._pending_logs) >= self.chunk_size:
+            self._flush_logs()
+
+    def _flow_row(self, record):
+        column_id = self._columns.get(record['ColumnID'])
+        if column_id is not None:
+            self._flow.append({'ColumnID': column_id, 'Day': date.fromisoformat(record['Day']),
+                               'ProjectID': self.project_id, 'Entered': record['Entered'],
+                               'Exited': record['Exited'], 'DwellSeconds': record['DwellSeconds']})
+
+    # Строки CSV
+
+    def read_csv(self, stream):
+        """Задачи из CSV с колонками Title и Column (остальные из CSV_FIELDS - необязательны)"""
+        reader = csv.DictReader(stream)
+        if not reader.fieldnames or not {'Title', 'Column'} <= set(reader.fieldnames):
+            raise TransferError('В CSV нужны колонки Title и Column')
+        self._create_project(self.name or 'Импорт', None)
+        usernames, last_positions = {}, {}
+        for number, row in enumerate(reader, 2):
+            if not row['Title']:
+                raise TransferError(f'Строка {number}: пустой Title')
+            name = row['Column'] or 'Без колонки'
+            if name not in self._columns:
+                self._columns[name] = self._add_column(name, len(self._columns) + 1)
+            column_id = self._columns[name]
+            last_positions[column_id] = rank_between(last_positions.get(column_id), None)
+            author = row.get('CreatedBy')
+            if author and author not in usernames:
+                usernames[author] = db.session.query(User.UserID).filter_by(Username=author).scalar()
+            self._pending_tasks.append((None, {
+                'Title': row['Title'],
+                'Description': row.get('Description') or '',
+                'ColumnID': column_id,
+                'Position': last_positions[column_id],
+                'CreatedBy': usernames.get(author) or self.owner_id,
+                'CreatedAt': _parse_datetime(row.get('CreatedAt'), 'CreatedAt') or datetime.utcnow(),
+                'UpdatedAt': _parse_datetime(row.get('UpdatedAt'), 'UpdatedAt') or datetime.utcnow(),
+            }))
+            if len(self._pending_tasks) >= self.chunk_size:
+                self._flush_tasks()
+        return self.finish()
+
+    # Запись
+
+    def _create_project(self, name, description):
+        project = Project(Name=name, Description=description, OwnerID=self.owner_id,
+                          DeletedAt=datetime.utcnow())
+        db.session.add(project)
+        db.session.flush()
+        self.project_id = project.ProjectID
+        db.session.add(ProjectMember(ProjectID=self.project_id, UserID=self.owner_id, Role='owner'))
+        self._member_ids.add(self.owner_id)
+        db.session.commit()
+
+    def _add_column(self, name, order_index, position=None):
+        column = Column(Name=name, OrderIndex=order_index, ProjectID=self.project_id,
+                        Position=position or rank_between(self._last_column_position, None))
+        db.session.add(column)
+        db.session.flush()
+        self._last_column_position = column.Position
+        self.counts['columns'] += 1
+        return column.ColumnID
+
+    # Пачка вставляется одним executemany на уровне таблицы, без RETURNING
+    # (с упорядоченным RETURNING SQLite вставляет по одной строке). Новые ID выдаются по возрастанию в
+    # порядке вставки, а в скрытый проект пишет только импорт, поэтому ID
+    # пачки - строки проекта выше прежнего максимума, по возрастанию.
+
+    def _flush_tasks(self):
+        if not self._pending_tasks:
+            return
+        last_id = db.session.scalar(select(func.max(Task.TaskID))) or 0
+        db.session.execute(insert(Task.__table__), [values for _, values in self._pending_tasks])
+        new_ids = db.session.scalars(
+            select(Task.TaskID)
+            .where(Task.TaskID > last_id, Task.ColumnID.in_(list(self._columns.values())))
+            .order_by(Task.TaskID)
+        ).all()
+        for (old_id, _), new_id in zip(self._pending_tasks, new_ids):
+            if old_id is not None:
+                self._tasks.add(old_id, new_id)
+        search.index_tasks(new_ids)
+        db.session.commit()
+        self.counts['tasks'] += len(new_ids)
+        self._pending_tasks = []
+
+    def _flush_logs(self):
+        if not self._pending_logs:
+            return
+        last_id = db.session.scalar(select(func.max(TaskLog.LogID))) or 0
+        db.session.execute(insert(TaskLog.__table__), self._pending_logs)
+        log_ids = db.session.scalars(
+            select(TaskLog.LogID)
+            .where(TaskLog.LogID > last_id, TaskLog.TaskID.in_({row['TaskID'] for row in self._pending_logs}))
+        ).all()
+        search.index_logs(log_ids)
+        db.session.commit()
+        self.counts['logs'] += len(log_ids)
+        self._pending_logs = []
+
+    def finish(self):
+        """Запись оставшихся пачек и открытие проекта"""
+        self._flush_tasks()
+        self._flush_logs()
+        if self._flow:
+            db.session.execute(insert(ColumnFlowDaily), self._flow)
+        db.session.execute(update(Project).where(Project.ProjectID == self.project_id).values(DeletedAt=None))
+        # Как в crud.create_project: токены участников без нового проекта
+        # в claims проверяются по базе
+        bump_membership_version(*self._member_ids)
+        db.session.commit()
+        for user_id in self._member_ids:
+            invalidate_membership(user_id, self.project_id)
+        return {'ProjectID': self.project_id, **self.counts}
+
+    def abort(self):
+        """Удаление недоимпортированного проекта фоновым заданием"""
+        from services.jobs import KIND_PROJECT, create_job, runner
+
+        db.session.rollback()
+        if self.project_id is None:
+            return
+        job = create_job(KIND_PROJECT, self.project_id, self.owner_id)
+        db.session.commit()
+        runner.submit(job.JobID)
+
+
+def import_project(owner_id, source, fmt='ndjson', name=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Импорт проекта из итератора строк (NDJSON) или текстового потока (CSV).
+
+    Возвращает ID нового проекта и число созданных строк; при ошибке данных
+    поднимает TransferError, а созданные строки удаляются.
+    """
+    importer = ProjectImporter(owner_id, name, chunk_size)
+    try:
+        if fmt == 'csv':
+            return importer.read_csv(source)
+        return importer.read_ndjson(source)
+    except BaseException:
+        importer.abort()
+        raise
@@ -0,0 +1,113 @@
+"""Ревизия проекта, условные GET-запросы и версии задач и колонок.
+
+Каждая запись в колонки, задачи и участников проекта увеличивает
+Project.Revision в той же транзакции. Ответы на чтение помечаются слабым
+ETag, построенным из ревизии и адреса запроса; если клиент присылает его
+в If-None-Match, возвращается 304 без выполнения основного запроса.
+
+Задачи и колонки дополнительно несут версию строки (Version), которую ORM
+проверяет и увеличивает в каждом UPDATE. Клиент передает прочитанную
+версию в If-Match ("<Version>") или в поле Version тела запроса; при
+несовпадении изменение отклоняется (412 или 409) с актуальным состоянием
+записи в поле current, без блокировок строк.
+"""
+import zlib
+from contextlib import contextmanager
+from flask import request
+from flask_restx import abort, marshal
+from sqlalchemy import update
+from sqlalchemy.orm.exc import StaleDataError
+from werkzeug.exceptions import HTTPException
+from werkzeug.wrappers import Response
+from database import db
+from models.column import Column
+from models.project import Project
+from models.task import Task
+
+
+class NotModified(HTTPException):
+    """Ответ 304 с актуальным ETag"""
+    code = 304
+    description = 'Not Modified'
+
+    def __init__(self, etag):
+        super().__init__()
+        self.etag = etag
+
+    def get_response(self, environ=None, scope=None):
+        return Response(status=304, headers={'ETag': self.etag})
+
+
+def bump_revision(*project_ids):
+    """Увеличение ревизии проектов; вызывается до фиксации транзакции записи"""
+    ids = {project_id for project_id in project_ids if project_id is not None}
+    if ids:
+        db.session.execute(
+            update(Project).where(Project.ProjectID.in_(ids))
+            .values(Revision=Project.Revision + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def project_revision(project_id):
+    """Текущая ревизия проекта (поиск по первичному ключу) или None"""
+    return db.session.query(Project.Revision).filter_by(ProjectID=project_id).scalar()
+
+
+def task_revision(task_id):
+    """(ID проекта, ревизия) для задачи одним запросом; 404, если задачи нет"""
+    row = (db.session.query(Project.ProjectID, Project.Revision)
+           .join(Column, Column.ProjectID == Project.ProjectID)
+           .join(Task, Task.ColumnID == Column.ColumnID)
+           .filter(Task.TaskID == task_id)
+           .first())
+    if row is None:
+        abort(404)
+    return row
+
+
+def conditional(project_id, revision=None):
+    """Проверка If-None-Match по ревизии проекта.
+
+    Возвращает заголовки с ETag для ответа 200 либо прерывает запрос
+    ответом 304. ETag учитывает путь и параметры запроса, поэтому разные
+    страницы и фильтры одного проекта не путаются между собой.
+    """
+    if revision is None:
+        revision = project_revision(project_id)
+    scope = zlib.crc32(request.full_path.encode())
+    value = f'{project_id}-{revision}-{scope:08x}'
+    etag = f'W/"{value}"'
+    if request.if_none_match.contains_weak(value):
+        raise NotModified(etag)
+    return {'ETag': etag}
+
+
+def check_version(obj, model, payload=None):
+    """Проверка версии записи перед изменением по If-Match и полю Version тела"""
+    if request.if_match and not request.if_match.contains(str(obj.Version)):
+        abort(412, 'Версия записи не совпадает с If-Match', current=marshal(obj, model))
+    expected = (payload or {}).get('Version')
+    if expected is not None and expected != obj.Version:
+        abort(409, 'Запись изменена другим пользователем', current=marshal(obj, model))
+
+
+@contextmanager
+def version_guard(entity=None, key=None, model=None):
+    """409 вместо StaleDataError: запись изменили между чтением и UPDATE.
+
+    Внутри блока autoflush выключен, чтобы запись обновлялась одним UPDATE
+    (версия растет на 1 за запрос). С entity, key и model в ответ
+    добавляется актуальное состояние записи.
+    """
+    try:
+        with db.session.no_autoflush:
+            yield
+    except StaleDataError:
+        db.session.rollback()
+        if entity is None:
+            abort(409, 'Записи изменены другим пользователем')
+        current = db.session.get(entity, key)
+        if current is None:
+            abort(404)
+        abort(409, 'Запись изменена другим пользователем', current=marshal(current, model))
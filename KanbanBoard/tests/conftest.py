@@ -0,0 +1,54 @@
+"""Общие фикстуры: приложение на SQLite в памяти и вход через API"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from database import db  # noqa: E402
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setenv('DB_CONNECTION_STRING', 'sqlite:///:memory:')
+    monkeypatch.setenv('JWT_SECRET', 'tests-secret-key-with-enough-length-for-hs256')
+    # Быстрый хеш паролей и задания удаления прямо в запросе
+    monkeypatch.setenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1000')
+    monkeypatch.setenv('JOBS_MODE', 'inline')
+    monkeypatch.setenv('AUDIT_LOG_MODE', 'sync')
+    application = create_app()
+    application.config['TESTING'] = True
+    yield application
+    with application.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def login(client):
+    """Регистрация (если нужно) и вход; возвращает заголовки с access-токеном"""
+    def login(username):
+        client.post('/auth/register', json={'Username': username, 'Email': f'{username}@example.com',
+                                            'Password': 'password'})
+        response = client.post('/auth/login', json={'Username': username, 'Password': 'password'})
+        assert response.status_code == 200, response.json
+        return {'Authorization': 'Bearer ' + response.json['access_token']}
+    return login
+
+
+@pytest.fixture
+def board(client, login):
+    """Проект владельца alice с двумя колонками: (заголовки, ID проекта, ID колонок)"""
+    headers = login('alice')
+    project_id = client.post('/projects/', headers=headers, json={'Name': 'Доска'}).json['ProjectID']
+    column_ids = [client.post(f'/columns/project/{project_id}', headers=headers,
+                              json={'Name': name, 'OrderIndex': index, 'ProjectID': project_id}).json['ColumnID']
+                  for index, name in enumerate(('Сделать', 'Готово'))]
+    return headers, project_id, column_ids
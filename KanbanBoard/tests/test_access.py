@@ -0,0 +1,52 @@
+"""Проверки доступа по claims access-токена (prj, pv) и откат к базе"""
+from database import db
+from models import ProjectMember
+
+
+def test_project_created_after_login_is_accessible(client, login):
+    headers = login('alice')
+    project_id = client.post('/projects/', headers=headers, json={'Name': 'p'}).json['ProjectID']
+    # В токене нет нового проекта: версия состава увеличена, проверка идет по базе
+    assert client.get(f'/projects/{project_id}/board', headers=headers).status_code == 200
+
+
+def test_project_missing_from_claims_falls_back_to_database(app, client, board, login):
+    _, project_id, _ = board
+    bob = login('bob')
+    assert client.get(f'/projects/{project_id}/board', headers=bob).status_code == 403
+    # Участие записано без увеличения MembershipVersion: pv в токене совпадает,
+    # но проекта нет в prj - доступ решает база
+    with app.app_context():
+        user_id = db.session.query(ProjectMember.UserID).filter_by(ProjectID=project_id).scalar() + 1
+        db.session.add(ProjectMember(ProjectID=project_id, UserID=user_id, Role='member'))
+        db.session.commit()
+    from services.access import membership_cache
+    membership_cache.clear()
+    assert client.get(f'/projects/{project_id}/board', headers=bob).status_code == 200
+
+
+def test_member_added_and_removed_with_existing_token(client, board, login):
+    headers, project_id, _ = board
+    bob = login('bob')
+    response = client.post(f'/project_members/project/{project_id}', headers=headers,
+                           json={'UserID': 2, 'ProjectID': project_id, 'Role': 'member'})
+    assert response.status_code == 201
+    assert client.get(f'/projects/{project_id}/board', headers=bob).status_code == 200
+
+    member_id = response.json['MemberID']
+    assert client.delete(f'/project_members/{member_id}', headers=headers).status_code == 200
+    assert client.get(f'/projects/{project_id}/board', headers=bob).status_code == 403
+
+
+def test_owner_membership_cannot_be_removed(client, board):
+    headers, project_id, _ = board
+    members = client.get(f'/project_members/project/{project_id}', headers=headers).json
+    owner_row = next(member for member in members if member['Role'] == 'owner')
+    assert client.delete(f"/project_members/{owner_row['MemberID']}", headers=headers).status_code == 400
+    assert client.get(f'/projects/{project_id}/board', headers=headers).status_code == 200
+
+
+def test_logout_revokes_access_token(client, login):
+    headers = login('alice')
+    assert client.post('/auth/logout', headers=headers).status_code == 200
+    assert client.get('/projects/', headers=headers).status_code == 401
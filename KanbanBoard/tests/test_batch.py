@@ -0,0 +1,81 @@
+"""Пакетные операции над задачами: разбор тела, версии и результат"""
+import pytest
+from sqlalchemy import update
+
+from database import db
+from models import Task
+
+
+def batch(client, headers, operations):
+    return client.post('/tasks/batch', headers=headers, json={'operations': operations})
+
+
+@pytest.mark.parametrize('body', [
+    [1, 2],
+    {'operations': 5},
+    {'operations': [1]},
+    {'operations': ['create']},
+    {'operations': [{'op': 'delete', 'TaskID': 'x'}]},
+    {'operations': [{'op': 'move', 'TaskID': True, 'ColumnID': 1}]},
+    {'operations': [{'op': 'create', 'ColumnID': 1, 'Title': 3}]},
+])
+def test_malformed_payload_is_400(client, board, body):
+    headers, _, _ = board
+    assert client.post('/tasks/batch', headers=headers, json=body).status_code == 400
+
+
+def test_create_move_update_delete(client, board):
+    headers, project_id, (todo, done) = board
+    response = batch(client, headers, [{'op': 'create', 'ColumnID': todo, 'Title': f't{i}'} for i in range(3)])
+    assert response.status_code == 200
+    first, second, third = response.json['created']
+
+    response = batch(client, headers, [
+        {'op': 'move', 'TaskID': first, 'ColumnID': done},
+        {'op': 'update', 'TaskID': second, 'Title': 'изменено'},
+        {'op': 'delete', 'TaskID': third},
+    ])
+    assert response.status_code == 200
+    assert response.json == {'created': [], 'moved': 1, 'updated': 1, 'deleted': 1}
+
+    columns = client.get(f'/projects/{project_id}/board', headers=headers).json['columns']
+    assert [[task['Title'] for task in column['tasks']] for column in columns] == [['изменено'], ['t0']]
+    journal = client.get(f'/task_logs/project/{project_id}?action=task.delete', headers=headers).json
+    assert [entry['TaskID'] for entry in journal] == [third]
+
+
+def test_stale_version_is_409_and_nothing_changes(client, board):
+    headers, project_id, (todo, _) = board
+    task_id = batch(client, headers, [{'op': 'create', 'ColumnID': todo, 'Title': 't'}]).json['created'][0]
+    response = batch(client, headers, [{'op': 'delete', 'TaskID': task_id, 'Version': 99}])
+    assert response.status_code == 409
+    assert response.json['current'] == [{'TaskID': task_id, 'Version': 1}]
+    assert client.get(f'/tasks/{task_id}', headers=headers).status_code == 200
+
+
+def test_delete_of_task_changed_after_read_is_409(app, client, board, monkeypatch):
+    headers, _, (todo, _) = board
+    task_ids = batch(client, headers, [{'op': 'create', 'ColumnID': todo, 'Title': f't{i}'}
+                                       for i in range(2)]).json['created']
+
+    # Изменение задачи другим запросом между чтением версий и удалением
+    import routers.tasks
+    load = routers.tasks.FlowRecorder.load
+
+    def racing_load(recorder, ids):
+        load(recorder, ids)
+        db.session.execute(update(Task.__table__).where(Task.TaskID == task_ids[0])
+                           .values(Version=Task.__table__.c.Version + 1))
+    monkeypatch.setattr(routers.tasks.FlowRecorder, 'load', racing_load)
+
+    response = batch(client, headers, [{'op': 'delete', 'TaskID': task_id} for task_id in task_ids])
+    assert response.status_code == 409
+    with app.app_context():
+        assert db.session.query(Task).count() == 2
+
+
+def test_batch_into_deleted_column_is_404(client, board):
+    headers, _, (todo, done) = board
+    assert client.delete(f'/columns/{done}', headers=headers).status_code == 202
+    response = batch(client, headers, [{'op': 'create', 'ColumnID': done, 'Title': 't'}])
+    assert response.status_code == 404
@@ -0,0 +1,107 @@
+"""Ключи порядка (services/ranking.py) и пересчет группы (services/positions.py)"""
+import random
+
+import pytest
+from sqlalchemy import update
+
+from database import db
+from models import Project, Task
+from services import positions
+from services.ranking import DIGITS, evenly_spaced, needs_rebalance, rank_between
+
+
+@pytest.mark.parametrize('count', [0, 1, 2, 35, 36, 1000])
+def test_evenly_spaced_keys_are_sorted_and_valid(count):
+    keys = evenly_spaced(count)
+    assert keys == sorted(keys)
+    assert len(set(keys)) == count
+    assert all(not key.endswith(DIGITS[0]) for key in keys)
+
+
+@pytest.mark.parametrize('count', [10, 1000])
+def test_end_inserts_do_not_trigger_rebalance_for_many_appends(count):
+    keys = evenly_spaced(count)
+    first, last = keys[0], keys[-1]
+    for _ in range(count * 4):
+        last = rank_between(last, None)
+        first = rank_between(None, first)
+        assert not needs_rebalance(last) and not needs_rebalance(first)
+    # После пересчета ключи той же длины, что и до вставок
+    assert len(last) == len(keys[-1]) and len(first) == len(keys[0])
+
+
+def test_random_inserts_keep_order():
+    rng = random.Random(7)
+    keys = evenly_spaced(3)
+    for _ in range(500):
+        index = rng.randrange(len(keys) + 1)
+        before = keys[index - 1] if index else None
+        after = keys[index] if index < len(keys) else None
+        key = rank_between(before, after)
+        assert (before is None or before < key) and (after is None or key < after)
+        keys.insert(index, key)
+
+
+def test_rank_between_rejects_unordered_neighbours():
+    with pytest.raises(ValueError):
+        rank_between('b', 'b')
+
+
+def create_tasks(client, headers, column_id, count):
+    return [client.post(f'/tasks/column/{column_id}', headers=headers,
+                        json={'Title': f't{i}', 'Description': ''}).json['TaskID'] for i in range(count)]
+
+
+def titles(client, headers, project_id):
+    return [task['Title'] for task in client.get(f'/projects/{project_id}/board', headers=headers).json['columns'][0]['tasks']]
+
+
+def test_rebalance_keeps_order_and_shortens_keys(app, client, board):
+    headers, project_id, (todo, _) = board
+    task_ids = create_tasks(client, headers, todo, 4)
+    # Длинные ключи, как после многих вставок в одно место
+    with app.app_context():
+        for task_id, position in zip(task_ids, ('h', 'hzzzzzzz1', 'hzzzzzzz2', 'i')):
+            db.session.execute(update(Task).where(Task.TaskID == task_id).values(Position=position))
+        db.session.commit()
+    order = titles(client, headers, project_id)
+    with app.app_context():
+        assert max(len(key) for key, in db.session.query(Task.Position)) > 5
+        positions.rebalance(Task, todo)
+        assert max(len(key) for key, in db.session.query(Task.Position)) <= 2
+    assert titles(client, headers, project_id) == order
+
+
+def test_equal_neighbour_keys_are_respaced_in_place(app, client, board):
+    headers, project_id, (todo, _) = board
+    task_ids = create_tasks(client, headers, todo, 3)
+    # Две одновременные вставки в конец получили одинаковый ключ
+    with app.app_context():
+        position = db.session.get(Task, task_ids[1]).Position
+        db.session.execute(update(Task).where(Task.TaskID == task_ids[2]).values(Position=position))
+        db.session.commit()
+    response = client.put(f'/tasks/{task_ids[0]}/move', headers=headers,
+                          json={'after_id': task_ids[1], 'before_id': task_ids[2]})
+    assert response.status_code == 200
+    assert titles(client, headers, project_id) == ['t1', 't0', 't2']
+
+
+def test_rebalance_retries_when_revision_changes(app, board, monkeypatch):
+    _, project_id, (todo, _) = board
+    respace = positions._respace
+    calls = []
+
+    def racing_respace(model, parent_id):
+        respace(model, parent_id)
+        if not calls:
+            # Параллельное перемещение увеличило ревизию проекта
+            db.session.execute(update(Project).values(Revision=Project.Revision + 1))
+        calls.append(parent_id)
+    monkeypatch.setattr(positions, '_respace', racing_respace)
+
+    with app.app_context():
+        revision = db.session.get(Project, project_id).Revision
+        positions.rebalance(Task, todo)
+        # Первая попытка откатилась, вторая зафиксирована с новой ревизией
+        assert len(calls) == 2
+        assert db.session.get(Project, project_id).Revision == revision + 1
@@ -0,0 +1,57 @@
+"""Импорт проекта из NDJSON через API"""
+import json
+
+from database import db
+from models import Project
+
+
+def ndjson(*records):
+    return '\n'.join(json.dumps(record, ensure_ascii=False) for record in records)
+
+
+def test_import_gives_access_to_owner_and_members(client, login):
+    alice, bob = login('alice'), login('bob')
+    body = ndjson(
+        {'type': 'project', 'format': 1, 'Name': 'Импорт'},
+        {'type': 'user', 'UserID': 10, 'Username': 'bob'},
+        {'type': 'column', 'ColumnID': 1, 'Name': 'Сделать', 'OrderIndex': 0},
+        {'type': 'member', 'UserID': 10, 'Role': 'member'},
+        {'type': 'task', 'TaskID': 5, 'ColumnID': 1, 'Title': 'Задача'},
+        {'type': 'log', 'LogID': 1, 'TaskID': 5, 'UserID': 10, 'Action': 'create', 'Message': 'Задача создана'},
+    )
+    response = client.post('/projects/import?format=ndjson', headers=alice, data=body)
+    assert response.status_code == 201, response.json
+    assert response.json['members'] == 1 and response.json['tasks'] == 1 and response.json['logs'] == 1
+
+    # Токены выданы до импорта: их claims не знают о новом проекте
+    project_id = response.json['ProjectID']
+    for headers in (alice, bob):
+        board = client.get(f'/projects/{project_id}/board', headers=headers)
+        assert board.status_code == 200
+        assert [task['Title'] for task in board.json['columns'][0]['tasks']] == ['Задача']
+
+
+def test_export_and_import_round_trip(client, board):
+    headers, project_id, column_ids = board
+    client.post(f'/tasks/column/{column_ids[0]}', headers=headers, json={'Title': 'a', 'Description': ''})
+    client.post(f'/tasks/column/{column_ids[1]}', headers=headers, json={'Title': 'b', 'Description': ''})
+    exported = client.get(f'/projects/{project_id}/export?format=ndjson', headers=headers).get_data(as_text=True)
+
+    response = client.post('/projects/import?format=ndjson&name=Копия', headers=headers, data=exported)
+    assert response.status_code == 201, response.json
+    board_copy = client.get(f"/projects/{response.json['ProjectID']}/board", headers=headers).json
+    assert [[task['Title'] for task in column['tasks']] for column in board_copy['columns']] == [['a'], ['b']]
+
+
+def test_invalid_import_is_rolled_back(app, client, login):
+    headers = login('alice')
+    body = ndjson(
+        {'type': 'project', 'format': 1, 'Name': 'Сломанный'},
+        {'type': 'task', 'TaskID': 1, 'ColumnID': 99, 'Title': 'x'},
+    )
+    response = client.post('/projects/import?format=ndjson', headers=headers, data=body)
+    assert response.status_code == 400
+    # Частично созданный проект удаляет задание (JOBS_MODE=inline)
+    with app.app_context():
+        assert db.session.query(Project).count() == 0
+    assert client.get('/projects/', headers=headers).json == []